@@ -1,3 +1,3 @@
 from .orchestrator import Orchestrator, run
 from .node import Node
-from .message import Message
\ No newline at end of file
+from .message import Message, SchemaMessage
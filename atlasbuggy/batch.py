@@ -0,0 +1,186 @@
+import copy
+
+try:
+    import numpy as np
+
+    numpy_installed = True
+except ImportError:
+    numpy_installed = False
+
+from .codec import message_fields
+from .message import SchemaMessage, _missing, trace_attributes
+
+_column_types = {int: "int64", float: "float64", bool: "bool"}
+
+
+class MessageBatch:
+    """
+    Messages of one class stored as numpy columns: n, timestamp, and every int, float and bool field. Other fields
+    aren't stored. Columns are accessed by name (batch["x"] or batch.x) and only cover the appended messages, so
+    whole windows of messages can be processed with numpy instead of one message at a time:
+
+        batch = MessageBatch(PoseMessage)
+        batch.extend(messages)
+        window = batch.between(start_time, end_time)
+        speed = np.hypot(np.diff(window.x), np.diff(window.y)) / np.diff(window.timestamp)
+
+    Time slicing assumes messages are appended in timestamp order. Messages made from rows of a SchemaMessage class
+    skip __init__: fields that aren't columns get their schema defaults. Other classes are made with
+    message_class(n, timestamp) and then have their columns set, so their __init__ has to accept that.
+    """
+
+    def __init__(self, message_class, capacity=1024, fields=None):
+        if not numpy_installed:
+            raise RuntimeError("MessageBatch requires numpy")
+
+        if not issubclass(message_class, SchemaMessage) and not message_class.check_init_signature:
+            raise ValueError("%s can't be made from a row. Its __init__ doesn't take (n, timestamp)" %
+                             message_class.__name__)
+        self.message_class = message_class
+        if fields is None:
+            fields = [(name, field_type) for name, field_type in message_fields(message_class)
+                      if field_type in _column_types]
+        self.field_names = tuple(name for name, field_type in fields)
+        self.dtypes = [("n", "int64"), ("timestamp", "float64")]
+        for name, field_type in fields:
+            if field_type not in _column_types:
+                raise ValueError("Field '%s' of type %s can't be stored in a column" % (name, field_type))
+            self.dtypes.append((name, _column_types[field_type]))
+
+        # (name, type, default) of the schema fields rows don't have. None if rows are made with __init__
+        self._default_fields = None
+        if issubclass(message_class, SchemaMessage):
+            self._default_fields = [(name, field_type, default)
+                                    for name, (field_type, default) in message_class.schema_fields.items()
+                                    if name not in self.field_names]
+
+        self.length = 0
+        self._columns = {name: np.empty(max(capacity, 1), dtype) for name, dtype in self.dtypes}
+
+    @classmethod
+    def from_messages(cls, messages, message_class=None, fields=None):
+        messages = list(messages)
+        if message_class is None:
+            if len(messages) == 0:
+                raise ValueError("Can't tell the message class of an empty list. Pass message_class")
+            message_class = type(messages[0])
+        batch = cls(message_class, len(messages), fields)
+        batch.extend(messages)
+        return batch
+
+    @property
+    def capacity(self):
+        return len(self._columns["n"])
+
+    def _reserve(self, length):
+        if length <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < length:
+            capacity *= 2
+        for name, column in self._columns.items():
+            new_column = np.empty(capacity, column.dtype)
+            new_column[:self.length] = column[:self.length]
+            self._columns[name] = new_column
+
+    def append(self, message):
+        self._reserve(self.length + 1)
+        index = self.length
+        for name in self._columns:
+            self._columns[name][index] = getattr(message, name)
+        self.length += 1
+
+    def extend(self, messages):
+        if isinstance(messages, MessageBatch):
+            start, end = self.length, self.length + len(messages)
+            self._reserve(end)
+            for name, column in self._columns.items():
+                column[start:end] = messages[name]
+            self.length = end
+            return
+
+        messages = list(messages)
+        start, end = self.length, self.length + len(messages)
+        self._reserve(end)
+        for name, dtype in self.dtypes:
+            self._columns[name][start:end] = np.fromiter(
+                (getattr(message, name) for message in messages), dtype, len(messages))
+        self.length = end
+
+    def message(self, index):
+        """Make the message at this row. Fields that aren't columns get the message class's defaults"""
+        n = int(self._columns["n"][index])
+        timestamp = float(self._columns["timestamp"][index])
+        if self._default_fields is None:
+            message = self.message_class(n, timestamp)
+        else:
+            message = self.message_class.__new__(self.message_class)
+            message.n = n
+            message.timestamp = timestamp
+            for name in trace_attributes:
+                setattr(message, name, None)
+            for name, field_type, default in self._default_fields:
+                setattr(message, name, field_type() if default is _missing else copy.deepcopy(default))
+        for name in self.field_names:
+            setattr(message, name, self._columns[name][index].item())
+        return message
+
+    def to_messages(self):
+        return [self.message(index) for index in range(self.length)]
+
+    def between(self, start_time=None, end_time=None):
+        """Batch of the messages with start_time <= timestamp < end_time. Its columns are views of this batch's"""
+        timestamps = self["timestamp"]
+        start = 0 if start_time is None else int(np.searchsorted(timestamps, start_time, "left"))
+        end = self.length if end_time is None else int(np.searchsorted(timestamps, end_time, "left"))
+        return self[start:end]
+
+    def drop_before(self, timestamp):
+        """Remove messages older than timestamp. Keeps a sliding window of recent messages"""
+        start = int(np.searchsorted(self["timestamp"], timestamp, "left"))
+        if start == 0:
+            return
+        remaining = self.length - start
+        for column in self._columns.values():
+            column[:remaining] = column[start:self.length]
+        self.length = remaining
+
+    def clear(self):
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.message(index)
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            return self._columns[item][:self.length]
+        elif isinstance(item, slice):
+            start, stop, step = item.indices(self.length)
+            batch = MessageBatch.__new__(MessageBatch)
+            batch.message_class = self.message_class
+            batch.field_names = self.field_names
+            batch.dtypes = self.dtypes
+            batch._default_fields = self._default_fields
+            batch._columns = {name: column[start:stop:step] for name, column in self._columns.items()}
+            batch.length = len(range(start, stop, step))
+            return batch
+        else:
+            if item < 0:
+                item += self.length
+            if not (0 <= item < self.length):
+                raise IndexError("Message index %s out of range (%s messages)" % (item, self.length))
+            return self.message(item)
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("_columns")
+        if columns is not None and name in columns:
+            return columns[name][:self.length]
+        raise AttributeError("'%s' has no attribute or column '%s'" % (self.__class__.__name__, name))
+
+    def __str__(self):
+        return "%s<%s, %s messages, columns=%s>" % (
+            self.__class__.__name__, self.message_class.__name__, self.length, ", ".join(self._columns))
@@ -0,0 +1,7 @@
+"""
+Benchmarks of atlasbuggy's hot paths: broadcasting, message serialization, log parsing, and playback.
+Run them with "python -m atlasbuggy.benchmarks --help"
+"""
+
+from .suite import benchmark, benchmarks, run_benchmarks, compare_results, load_results, save_results
+from . import broadcast, messages, logs
@@ -0,0 +1,49 @@
+import sys
+import logging
+import argparse
+
+from ..orchestrator import Orchestrator
+from . import run_benchmarks, compare_results, load_results, save_results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m atlasbuggy.benchmarks",
+                                     description="Time atlasbuggy's hot paths in microseconds per operation")
+    parser.add_argument("-k", "--select", nargs="+", help="only run benchmarks whose names contain these strings")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="runs per benchmark. The best run is compared")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file (use it as a baseline later)")
+    parser.add_argument("-c", "--compare", help="baseline JSON file to check for regressions against")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.1,
+                        help="fraction slower than the baseline that counts as a regression (default 0.1)")
+    args = parser.parse_args()
+
+    Orchestrator.set_default(level=logging.WARNING)
+
+    def report(name, result):
+        print("%-32s best %10.3fus  median %10.3fus  %12.0f ops/s  (%s ops)" % (
+            name, result["best"], result["median"], 1e6 / result["best"], result["operations"]))
+
+    results = run_benchmarks(args.select, args.repeat, report)
+
+    if args.output is not None:
+        save_results(results, args.output)
+        print("results written to %s" % args.output)
+
+    if args.compare is not None:
+        baseline = load_results(args.compare)
+        comparisons = compare_results(baseline, results, args.tolerance)
+
+        print("\ncompared to %s (python %s):" % (args.compare, baseline["python"]))
+        num_regressions = 0
+        for name, baseline_time, current_time, ratio, status in comparisons:
+            print("%-32s %10.3fus -> %10.3fus  %5.2fx  %s" % (name, baseline_time, current_time, ratio, status))
+            if status == "regression":
+                num_regressions += 1
+
+        if num_regressions > 0:
+            print("%s regression(s) over %d%%" % (num_regressions, args.tolerance * 100))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import time
+import asyncio
+import logging
+
+from ..node import Node
+from ..message import Message
+from ..orchestrator import Orchestrator
+from .suite import benchmark
+
+logger = logging.getLogger("atlasbuggy.benchmarks")
+logger.setLevel(logging.WARNING)
+
+NUM_DELIVERIES = 100000
+
+
+class Producer(Node):
+    def __init__(self):
+        super(Producer, self).__init__(logger=logger)
+
+
+class Consumer(Node):
+    def __init__(self, use_callback=False):
+        super(Consumer, self).__init__(logger=logger)
+        self.num_received = 0
+
+        self.producer_tag = "producer"
+        if use_callback:
+            self.producer_sub = self.define_subscription(self.producer_tag, callback=self.receive)
+        else:
+            self.producer_sub = self.define_subscription(self.producer_tag)
+
+    def receive(self, message):
+        self.num_received += 1
+
+    @asyncio.coroutine
+    def receive_all(self, num_messages):
+        while self.num_received < num_messages:
+            yield from self.producer_sub.wait()
+            self.num_received += 1
+
+
+def connect(num_consumers, use_callback=False):
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    orchestrator = Orchestrator(event_loop, logger=logger)
+
+    producer = Producer()
+    consumers = [Consumer(use_callback) for _ in range(num_consumers)]
+    for consumer in consumers:
+        orchestrator.subscribe(producer, consumer, consumer.producer_tag)
+    return event_loop, producer, consumers
+
+
+@asyncio.coroutine
+def broadcast_all(producer, messages):
+    for message in messages:
+        yield from producer.broadcast(message)
+
+
+def time_broadcasts(num_consumers, use_callback=False):
+    event_loop, producer, consumers = connect(num_consumers, use_callback)
+    messages = [Message(n) for n in range(max(1000, NUM_DELIVERIES // num_consumers))]
+
+    start_time = time.perf_counter()
+    event_loop.run_until_complete(broadcast_all(producer, messages))
+    elapsed = time.perf_counter() - start_time
+
+    event_loop.close()
+    return len(messages), elapsed
+
+
+@benchmark("broadcast_to_1_queue")
+def broadcast_to_1_queue():
+    return time_broadcasts(1)
+
+
+@benchmark("broadcast_to_10_queues")
+def broadcast_to_10_queues():
+    return time_broadcasts(10)
+
+
+@benchmark("broadcast_to_100_queues")
+def broadcast_to_100_queues():
+    return time_broadcasts(100)
+
+
+@benchmark("deliver_by_callback")
+def deliver_by_callback():
+    return time_broadcasts(1, use_callback=True)
+
+
+@benchmark("deliver_by_queue")
+def deliver_by_queue():
+    """Broadcast and wait on the consumer's side, like a node's loop would"""
+    event_loop, producer, consumers = connect(1)
+    messages = [Message(n) for n in range(NUM_DELIVERIES // 10)]
+
+    start_time = time.perf_counter()
+    event_loop.run_until_complete(asyncio.gather(
+        broadcast_all(producer, messages), consumers[0].receive_all(len(messages))
+    ))
+    elapsed = time.perf_counter() - start_time
+
+    event_loop.close()
+    return len(messages), elapsed
+
+
+@benchmark("broadcast_many_to_10_queues")
+def broadcast_many_to_10_queues():
+    event_loop, producer, consumers = connect(10)
+    messages = [Message(n) for n in range(NUM_DELIVERIES // 10)]
+    batches = [messages[index: index + 10] for index in range(0, len(messages), 10)]
+
+    @asyncio.coroutine
+    def broadcast_batches():
+        for batch in batches:
+            yield from producer.broadcast_many(batch)
+
+    start_time = time.perf_counter()
+    event_loop.run_until_complete(broadcast_batches())
+    elapsed = time.perf_counter() - start_time
+
+    event_loop.close()
+    return len(messages), elapsed
@@ -0,0 +1,274 @@
+import os
+import time
+import shutil
+import logging
+import asyncio
+import tempfile
+import datetime
+
+from ..log.parser import LogParser, LogStream, MappedLog
+from ..log.index import index_suffix
+from ..log.session import SessionWriter, SessionReader
+from ..log.default import DefaultSettings, default_settings
+from ..log.factory import make_logger, get_log_writer
+from ..log.playback import PlaybackNode
+from ..orchestrator import Orchestrator
+from .suite import benchmark
+from .messages import PoseMessage, ImuMessage, make_messages, make_imu_messages
+from .broadcast import Consumer, logger
+
+NUM_LINES = 50000
+
+_log_contents = None
+
+
+def synthetic_log():
+    """A log of NUM_LINES PoseMessages 1ms apart in atlasbuggy's default format. Made once and reused"""
+    global _log_contents
+    if _log_contents is None:
+        lines = []
+        for message in make_messages(NUM_LINES):
+            date = datetime.datetime.fromtimestamp(message.timestamp)
+            lines.append("[PoseNode @ pose.py:42][INFO] %s,%03d: %s\n" % (
+                date.strftime("%Y-%m-%d %H:%M:%S"), date.microsecond // 1000, message))
+        _log_contents = "".join(lines)
+    return _log_contents
+
+
+@benchmark("log_parser")
+def log_parser():
+    contents = synthetic_log()
+
+    start_time = time.perf_counter()
+    parser = LogParser(contents)
+    elapsed = time.perf_counter() - start_time
+    return len(parser.lines), elapsed
+
+
+def write_synthetic_log():
+    """Write the synthetic log to a temporary file. Returns its path"""
+    file_descriptor, path = tempfile.mkstemp(suffix=".log")
+    with os.fdopen(file_descriptor, "w") as file:
+        file.write(synthetic_log())
+    return path
+
+
+@benchmark("log_stream")
+def log_stream():
+    """Parse the log file as a stream of lines"""
+    path = write_synthetic_log()
+    try:
+        start_time = time.perf_counter()
+        num_lines = sum(1 for _ in LogStream(path))
+        elapsed = time.perf_counter() - start_time
+    finally:
+        os.remove(path)
+    return num_lines, elapsed
+
+
+@benchmark("log_mapped")
+def log_mapped():
+    """Parse a memory mapped log file into LineRecords and decode each message"""
+    path = write_synthetic_log()
+    log = MappedLog(path)
+    try:
+        start_time = time.perf_counter()
+        num_lines = sum(1 for record in log if record.message)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        log.close()
+        os.remove(path)
+    return num_lines, elapsed
+
+
+@benchmark("log_seek")
+def log_seek():
+    """Seek to evenly spaced times in a mapped log using its index and read the line there"""
+    path = write_synthetic_log()
+    log = MappedLog(path)
+    try:
+        first_line = next(iter(log))
+        duration = NUM_LINES / 1000
+        log.index  # build it first so only seeking is timed
+
+        num_seeks = 1000
+        start_time = time.perf_counter()
+        for seek_num in range(num_seeks):
+            next(log.lines(first_line.timestamp + duration * seek_num / num_seeks))
+        elapsed = time.perf_counter() - start_time
+    finally:
+        log.close()
+        os.remove(path)
+        os.remove(path + index_suffix)
+    return num_seeks, elapsed
+
+
+@benchmark("log_stream_first_line")
+def log_stream_first_line():
+    """Time from opening a log until its first line is available. Doesn't depend on the log's length"""
+    path = write_synthetic_log()
+    try:
+        num_opens = 100
+        start_time = time.perf_counter()
+        for _ in range(num_opens):
+            stream = LogStream(path)
+            next(stream)
+            stream.close()
+        elapsed = time.perf_counter() - start_time
+    finally:
+        os.remove(path)
+    return num_opens, elapsed
+
+
+@benchmark("playback_replay")
+def playback_replay():
+    """
+    Open and replay a log as fast as possible (no pacing) to a callback consumer. Measures reading, parsing and
+    broadcasting per line
+    """
+    path = write_synthetic_log()
+
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    orchestrator = Orchestrator(event_loop, logger=logger)
+    try:
+        consumer = Consumer(use_callback=True)
+        start_time = time.perf_counter()
+        playback = PlaybackNode(path, update_rate=0.0, message_class=PoseMessage, logger=logger)
+        orchestrator.subscribe(playback, consumer, consumer.producer_tag)
+        event_loop.run_until_complete(playback.loop())
+        elapsed = time.perf_counter() - start_time
+    finally:
+        event_loop.close()
+        os.remove(path)
+
+    return consumer.num_received, elapsed
+
+
+NUM_RECORDED = 20000
+
+
+@benchmark("text_log_record")
+def text_log_record():
+    """Log ImuMessages to a file through a logging handler, the way nodes log messages they send"""
+    file_descriptor, path = tempfile.mkstemp(suffix=".log")
+    os.close(file_descriptor)
+    messages = make_imu_messages(NUM_RECORDED)
+
+    text_logger = logging.Logger("text_log_record")
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter(DefaultSettings.settings["log_format"]))
+    text_logger.addHandler(handler)
+    try:
+        start_time = time.perf_counter()
+        for message in messages:
+            text_logger.info(str(message))
+        handler.flush()
+        elapsed = time.perf_counter() - start_time
+    finally:
+        handler.close()
+        os.remove(path)
+    return len(messages), elapsed
+
+
+@benchmark("session_record")
+def session_record():
+    """Write ImuMessages to a binary session file"""
+    path = tempfile.mktemp(suffix=".session")
+    messages = make_imu_messages(NUM_RECORDED)
+
+    writer = SessionWriter(path)
+    try:
+        start_time = time.perf_counter()
+        for message in messages:
+            writer.write(message, "ImuNode")
+        writer.flush()
+        elapsed = time.perf_counter() - start_time
+    finally:
+        writer.close()
+        os.remove(path)
+    return len(messages), elapsed
+
+
+@benchmark("text_log_replay")
+def text_log_replay():
+    """Parse a text log of ImuMessages back into messages"""
+    file_descriptor, path = tempfile.mkstemp(suffix=".log")
+    with os.fdopen(file_descriptor, "w") as file:
+        for message in make_imu_messages(NUM_RECORDED):
+            file.write("[ImuNode @ imu.py:42][INFO] 2017-03-04 12:00:00,000: %s\n" % message)
+
+    log = MappedLog(path)
+    try:
+        start_time = time.perf_counter()
+        num_messages = sum(1 for record in log if ImuMessage.parse(record.message) is not None)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        log.close()
+        os.remove(path)
+    return num_messages, elapsed
+
+
+@benchmark("session_replay")
+def session_replay():
+    """Read a session file of ImuMessages back into messages"""
+    path = tempfile.mktemp(suffix=".session")
+    writer = SessionWriter(path)
+    for message in make_imu_messages(NUM_RECORDED):
+        writer.write(message, "ImuNode")
+    writer.close()
+
+    reader = SessionReader(path)
+    try:
+        start_time = time.perf_counter()
+        num_messages = sum(1 for record in reader if record.message is not None)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        reader.close()
+        os.remove(path)
+    return num_messages, elapsed
+
+
+def node_logging(async_logging):
+    """Time spent in logger.info by a logger writing to a file and the terminal (at WARNING so it stays quiet)"""
+    directory = tempfile.mkdtemp()
+    name = "node_logging_%s" % ("async" if async_logging else "sync")
+    node_logger, file_name, directory = make_logger(
+        name, default_settings, level=logging.WARNING, write=True, file_name=os.path.join(directory, "node.log"),
+        directory="", async_logging=async_logging)
+    num_records = 5000  # less than the log queue's size so it doesn't block
+
+    # hold the log writer off while timing (it waits for the file handler's lock) so only the time spent on the
+    # logging thread is measured. Otherwise the writer thread takes turns with it on a single core
+    held_handler = node_logger.handlers[0].handlers[-1] if async_logging else None
+    try:
+        if held_handler is not None:
+            held_handler.acquire()
+        start_time = time.perf_counter()
+        for record_num in range(num_records):
+            node_logger.info("sending: message %s" % record_num)
+        elapsed = time.perf_counter() - start_time
+        if held_handler is not None:
+            held_handler.release()
+            held_handler = None
+        get_log_writer().flush()
+    finally:
+        if held_handler is not None:
+            held_handler.release()
+        for handler in node_logger.handlers[:]:
+            node_logger.removeHandler(handler)
+            for target in getattr(handler, "handlers", [handler]):
+                target.close()
+        shutil.rmtree(os.path.dirname(file_name))
+    return num_records, elapsed
+
+
+@benchmark("node_logging_sync")
+def node_logging_sync():
+    return node_logging(False)
+
+
+@benchmark("node_logging_async")
+def node_logging_async():
+    """Formatting and writing happen on the log writer's thread. Only the logging thread is timed"""
+    return node_logging(True)
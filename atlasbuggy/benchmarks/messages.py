@@ -0,0 +1,200 @@
+import time
+import random
+
+from .. import codec
+from ..message import Message, SchemaMessage
+from .suite import benchmark
+
+NUM_MESSAGES = 20000
+
+
+class PoseMessage(Message):
+    def __init__(self, n, timestamp=None):
+        super(PoseMessage, self).__init__(n, timestamp)
+        self.x = 0.0
+        self.y = 0.0
+        self.z = 0.0
+
+        self.auto_serialize()
+
+
+class AutoPoseMessage(Message, auto_serialize=True):
+    """PoseMessage with the serialization generated once for the class instead of called in __init__"""
+
+    def __init__(self, n, timestamp=None):
+        super(AutoPoseMessage, self).__init__(n, timestamp)
+        self.x = 0.0
+        self.y = 0.0
+        self.z = 0.0
+
+
+class SchemaPoseMessage(SchemaMessage):
+    schema = dict(x=float, y=float, z=float)
+
+
+class ImuMessage(SchemaMessage):
+    """The size of the BNO055 example's message: 21 floats and 4 ints"""
+    schema = dict(
+        [("packet_time", float), ("arduino_time", float)] +
+        [("%s_%s" % (vector, axis), float) for vector in ("euler", "mag", "gyro", "accel", "linaccel") for axis in "xyz"] +
+        [("quat_%s" % axis, float) for axis in "xyzw"] +
+        [("%s_status" % sensor, int) for sensor in ("system", "accel", "gyro", "mag")]
+    )
+
+
+codec.register(ImuMessage, 1)
+
+
+def make_imu_messages(num_messages):
+    random.seed(0)
+    messages = []
+    for n in range(num_messages):
+        message = ImuMessage(n, 1500000000.0 + n * 0.001)
+        for name, (field_type, default) in ImuMessage.schema_fields.items():
+            setattr(message, name, field_type(random.random() * 100))
+        messages.append(message)
+    return messages
+
+
+def make_messages(num_messages, message_class=PoseMessage):
+    random.seed(0)
+    messages = []
+    for n in range(num_messages):
+        message = message_class(n, 1500000000.0 + n * 0.001)
+        message.x = random.random()
+        message.y = random.random()
+        message.z = random.random()
+        messages.append(message)
+    return messages
+
+
+@benchmark("message_init")
+def message_init():
+    start_time = time.perf_counter()
+    for n in range(NUM_MESSAGES):
+        PoseMessage(n, 0.0)
+    return NUM_MESSAGES, time.perf_counter() - start_time
+
+
+@benchmark("plain_message_init")
+def plain_message_init():
+    start_time = time.perf_counter()
+    for n in range(NUM_MESSAGES):
+        Message(n, 0.0)
+    return NUM_MESSAGES, time.perf_counter() - start_time
+
+
+@benchmark("message_str")
+def message_str():
+    messages = make_messages(NUM_MESSAGES)
+
+    start_time = time.perf_counter()
+    for message in messages:
+        str(message)
+    return len(messages), time.perf_counter() - start_time
+
+
+@benchmark("message_parse")
+def message_parse():
+    lines = [str(message) for message in make_messages(NUM_MESSAGES)]
+
+    start_time = time.perf_counter()
+    for line in lines:
+        PoseMessage.parse(line)
+    return len(lines), time.perf_counter() - start_time
+
+
+@benchmark("auto_message_init")
+def auto_message_init():
+    start_time = time.perf_counter()
+    for n in range(NUM_MESSAGES):
+        AutoPoseMessage(n, 0.0)
+    return NUM_MESSAGES, time.perf_counter() - start_time
+
+
+@benchmark("auto_message_parse")
+def auto_message_parse():
+    lines = [str(message) for message in make_messages(NUM_MESSAGES, AutoPoseMessage)]
+
+    start_time = time.perf_counter()
+    for line in lines:
+        AutoPoseMessage.parse(line)
+    return len(lines), time.perf_counter() - start_time
+
+
+@benchmark("schema_message_init")
+def schema_message_init():
+    start_time = time.perf_counter()
+    for n in range(NUM_MESSAGES):
+        SchemaPoseMessage(n, 0.0)
+    return NUM_MESSAGES, time.perf_counter() - start_time
+
+
+@benchmark("schema_message_str")
+def schema_message_str():
+    messages = make_messages(NUM_MESSAGES, SchemaPoseMessage)
+
+    start_time = time.perf_counter()
+    for message in messages:
+        str(message)
+    return len(messages), time.perf_counter() - start_time
+
+
+@benchmark("schema_message_parse")
+def schema_message_parse():
+    lines = [str(message) for message in make_messages(NUM_MESSAGES, SchemaPoseMessage)]
+
+    start_time = time.perf_counter()
+    for line in lines:
+        SchemaPoseMessage.parse(line)
+    return len(lines), time.perf_counter() - start_time
+
+
+@benchmark("schema_message_copy")
+def schema_message_copy():
+    messages = make_messages(NUM_MESSAGES, SchemaPoseMessage)
+
+    start_time = time.perf_counter()
+    for message in messages:
+        message.copy()
+    return len(messages), time.perf_counter() - start_time
+
+
+@benchmark("imu_message_str")
+def imu_message_str():
+    messages = make_imu_messages(NUM_MESSAGES)
+
+    start_time = time.perf_counter()
+    for message in messages:
+        str(message)
+    return len(messages), time.perf_counter() - start_time
+
+
+@benchmark("imu_message_parse")
+def imu_message_parse():
+    lines = [str(message) for message in make_imu_messages(NUM_MESSAGES)]
+
+    start_time = time.perf_counter()
+    for line in lines:
+        ImuMessage.parse(line)
+    return len(lines), time.perf_counter() - start_time
+
+
+@benchmark("imu_codec_encode")
+def imu_codec_encode():
+    messages = make_imu_messages(NUM_MESSAGES)
+
+    start_time = time.perf_counter()
+    for message in messages:
+        codec.encode(message)
+    return len(messages), time.perf_counter() - start_time
+
+
+@benchmark("imu_codec_decode")
+def imu_codec_decode():
+    encoded = [codec.encode(message) for message in make_imu_messages(NUM_MESSAGES)]
+
+    start_time = time.perf_counter()
+    for data in encoded:
+        codec.decode(data)
+    return len(encoded), time.perf_counter() - start_time
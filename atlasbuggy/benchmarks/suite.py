@@ -0,0 +1,84 @@
+import sys
+import json
+import time
+import platform
+import statistics
+import collections
+
+benchmarks = collections.OrderedDict()  # name -> function returning (number of operations, seconds taken)
+
+
+def benchmark(name):
+    """Register a benchmark. The function does its own setup and returns how many operations it timed and how long
+    they took in seconds so setup isn't counted"""
+
+    def decorator(function):
+        if name in benchmarks:
+            raise ValueError("Benchmark '%s' is already defined" % name)
+        benchmarks[name] = function
+        return function
+
+    return decorator
+
+
+def run_benchmarks(names=None, repeat=5, report=None):
+    """
+    Run each benchmark repeat times. Results are microseconds per operation, the best run and the median of all runs.
+    names is a list of substrings. Only benchmarks whose names contain one of them are run if it's given.
+    report is called with (name, result) after each benchmark finishes
+    """
+    results = collections.OrderedDict()
+    for name, function in benchmarks.items():
+        if names is not None and not any(substring in name for substring in names):
+            continue
+
+        times = []
+        num_operations = 0
+        for _ in range(repeat):
+            num_operations, elapsed = function()
+            times.append(elapsed / num_operations * 1E6)
+
+        results[name] = dict(best=min(times), median=statistics.median(times), operations=num_operations,
+                             repeat=repeat, unit="us")
+        if report is not None:
+            report(name, results[name])
+
+    return dict(
+        time=time.time(),
+        python=sys.version.split()[0],
+        implementation=platform.python_implementation(),
+        machine=platform.machine(),
+        results=results,
+    )
+
+
+def compare_results(baseline, current, tolerance=0.1):
+    """
+    Compare the best time of each benchmark in both results. Returns a list of (name, baseline us, current us, ratio,
+    status) where status is "regression" if it's more than tolerance (a fraction) slower, "improvement" if it's more
+    than tolerance faster, or "ok"
+    """
+    comparisons = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        baseline_time = baseline["results"][name]["best"]
+        ratio = result["best"] / baseline_time
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 - tolerance:
+            status = "improvement"
+        else:
+            status = "ok"
+        comparisons.append((name, baseline_time, result["best"], ratio, status))
+    return comparisons
+
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_results(results, path):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
@@ -0,0 +1,88 @@
+import time
+import asyncio
+
+
+class Clock:
+    """Wall clock time. Nodes read the time from their orchestrator's clock (node.clock) so it can be simulated"""
+
+    virtual = False
+
+    def time(self):
+        return time.time()
+
+
+class VirtualClock(Clock):
+    """Time on a VirtualTimeEventLoop: start_time (seconds since the epoch) plus however far the loop has advanced"""
+
+    virtual = True
+
+    def __init__(self, event_loop, start_time=None):
+        self.event_loop = event_loop
+        if start_time is None:
+            start_time = time.time()
+        self.start_time = start_time
+        self._loop_start_time = event_loop.time()
+
+    def time(self):
+        return self.start_time + self.event_loop.time() - self._loop_start_time
+
+
+_active_clock = Clock()
+
+
+def active_clock():
+    """The clock of the most recently created orchestrator. Messages made without a timestamp read it from here"""
+    return _active_clock
+
+
+def set_active_clock(clock):
+    global _active_clock
+    _active_clock = clock
+
+
+class _FastForwardSelector:
+    """
+    Wraps an event loop's selector. Instead of blocking until the next timer is due, it polls and, if nothing is
+    ready, jumps the loop's virtual time forward to that timer
+    """
+
+    def __init__(self, selector, event_loop):
+        self.selector = selector
+        self.event_loop = event_loop
+
+    def select(self, timeout=None):
+        events = self.selector.select(0)
+        if len(events) > 0 or timeout == 0:
+            return events
+        if timeout is None:
+            # no timers to jump to. Wait for real on sockets, threads or other processes (run_in_executor etc.)
+            return self.selector.select(None)
+
+        self.event_loop.advance(timeout)
+        return events
+
+    def __getattr__(self, name):
+        return getattr(self.selector, name)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """
+    An event loop with a simulated clock. Whenever every task is waiting on a timer (asyncio.sleep, wait_for's
+    timeout, call_later, ...), time jumps straight to the next one, so timed code runs as fast as the CPU allows while
+    events still happen in the same order. Give it to an orchestrator (or use run(..., virtual_time=True)) and
+    node.clock.time() follows it.
+
+    Only the event loop's time is simulated. Work done in other threads or processes and data arriving on sockets
+    happen in real time.
+    """
+
+    def __init__(self, selector=None):
+        self._virtual_time = 0.0
+        super(VirtualTimeEventLoop, self).__init__(selector)
+        self._selector = _FastForwardSelector(self._selector, self)
+
+    def time(self):
+        return self._virtual_time
+
+    def advance(self, seconds):
+        self._virtual_time += seconds
@@ -0,0 +1,231 @@
+"""
+Compact binary serialization for messages. Register a message class with a type ID and a version:
+
+    codec.register(ImuMessage, 10)
+    data = codec.encode(message)
+    message, offset = codec.decode(data)
+
+Each encoded message starts with its type ID (2 bytes) and version (1 byte), then n and timestamp. Next come the
+fixed size fields (int, float, bool) in one struct, then the variable size fields (str, bytes, numpy arrays and
+anything else, which is pickled) with length prefixes. Fields are encoded in alphabetical order. If a message's
+fields change, register the class again with a higher version. Register the old fields with the old version to keep
+decoding data written before the change.
+"""
+
+import struct
+import pickle
+
+try:
+    import numpy as np
+
+    numpy_installed = True
+except ImportError:
+    numpy_installed = False
+
+from .message import Message, SchemaMessage, trace_attributes
+
+header = struct.Struct("<HB")  # type ID, version
+length_prefix = struct.Struct("<I")
+PICKLE_TYPE_ID = 0  # dumps writes unregistered messages as this type ID followed by a pickle
+
+_scalar_formats = {int: "q", float: "d", bool: "?"}
+_codecs = {}  # (type ID, version) -> MessageCodec
+
+
+def _encode_str(value, chunks):
+    data = value.encode()
+    chunks.append(length_prefix.pack(len(data)))
+    chunks.append(data)
+
+
+def _decode_str(data, offset):
+    length, = length_prefix.unpack_from(data, offset)
+    offset += length_prefix.size
+    return str(data[offset:offset + length], "utf-8"), offset + length
+
+
+def _encode_bytes(value, chunks):
+    chunks.append(length_prefix.pack(len(value)))
+    chunks.append(value)
+
+
+def _decode_bytes(data, offset):
+    length, = length_prefix.unpack_from(data, offset)
+    offset += length_prefix.size
+    return bytes(data[offset:offset + length]), offset + length
+
+
+def _encode_array(value, chunks):
+    """dtype, shape, then the array's raw buffer"""
+    value = np.ascontiguousarray(value)
+    _encode_str(value.dtype.str, chunks)
+    chunks.append(struct.pack("<B%sI" % value.ndim, value.ndim, *value.shape))
+    _encode_bytes(value.tobytes(), chunks)
+
+
+def _decode_array(data, offset):
+    dtype, offset = _decode_str(data, offset)
+    ndim = data[offset]
+    shape = struct.unpack_from("<%sI" % ndim, data, offset + 1)
+    offset += 1 + 4 * ndim
+    length, = length_prefix.unpack_from(data, offset)
+    offset += length_prefix.size
+    array = np.frombuffer(data, dtype, count=length // np.dtype(dtype).itemsize, offset=offset).reshape(shape)
+    return array.copy(), offset + length
+
+
+def _encode_object(value, chunks):
+    _encode_bytes(pickle.dumps(value, pickle.HIGHEST_PROTOCOL), chunks)
+
+
+def _decode_object(data, offset):
+    value, offset = _decode_bytes(data, offset)
+    return pickle.loads(value), offset
+
+
+def _variable_coders(field_type):
+    if field_type == str:
+        return _encode_str, _decode_str
+    elif field_type == bytes:
+        return _encode_bytes, _decode_bytes
+    elif numpy_installed and field_type == np.ndarray:
+        return _encode_array, _decode_array
+    else:
+        return _encode_object, _decode_object
+
+
+def message_fields(message_class):
+    """Field names and types of a SchemaMessage or auto serialized Message class in alphabetical order"""
+    if issubclass(message_class, SchemaMessage):
+        return [(name, message_class.schema_fields[name][0]) for name in sorted(message_class.schema_fields)]
+
+    metadata = message_class._get_serialization_metadata()
+    if metadata.fields is None:
+        raise ValueError("Can't find the fields of %s. Define it with auto_serialize=True or pass fields to "
+                         "codec.register" % message_class.__name__)
+    return list(zip(metadata.fields, message_class.message_data_types))
+
+
+class MessageCodec:
+    """Encodes and decodes one version of a message class. Made by register"""
+
+    def __init__(self, message_class, type_id, version, fields):
+        self.message_class = message_class
+        self.type_id = type_id
+        self.version = version
+        self.fields = fields
+
+        for name, field_type in fields:
+            if not name.isidentifier():
+                raise ValueError("'%s' isn't a valid field name" % name)
+
+        scalar_names = [name for name, field_type in fields if field_type in _scalar_formats]
+        variable_fields = [(name, field_type) for name, field_type in fields if field_type not in _scalar_formats]
+        self.fixed = struct.Struct("<HBqd" + "".join(
+            _scalar_formats[field_type] for name, field_type in fields if field_type in _scalar_formats))
+
+        # schema messages covering every field can skip __init__ since every slot gets set
+        skip_init = (issubclass(message_class, SchemaMessage) and
+                     set(name for name, field_type in fields) == set(message_class.schema_fields))
+
+        # write encode and decode functions for these fields once instead of looping over them for every message
+        code_globals = {"pack": self.fixed.pack, "unpack_from": self.fixed.unpack_from, "cls": message_class,
+                        "type_id": type_id, "version": version}
+        encode_lines = ["def encode(message):",
+                        "    data = pack(type_id, version, message.n, message.timestamp%s)" % "".join(
+                            ", message.%s" % name for name in scalar_names)]
+        decode_lines = ["def decode(data, offset=0):",
+                        "    values = unpack_from(data, offset)",
+                        "    offset += %s" % self.fixed.size]
+        if skip_init:
+            decode_lines.append("    message = cls.__new__(cls)")
+            decode_lines.extend("    message.%s = None" % name for name in trace_attributes)
+            decode_lines.append("    _, _, message.n, message.timestamp%s, = values" % "".join(
+                ", message.%s" % name for name in scalar_names))
+        else:
+            decode_lines.append("    message = cls(values[2], values[3])")
+            if len(scalar_names) > 0:
+                decode_lines.append("    %s, = values[4:]" % ", ".join("message.%s" % name for name in scalar_names))
+
+        if len(variable_fields) == 0:
+            encode_lines.append("    return data")
+        else:
+            encode_lines.append("    chunks = [data]")
+            for name, field_type in variable_fields:
+                encode_field, decode_field = _variable_coders(field_type)
+                code_globals["encode_" + name] = encode_field
+                code_globals["decode_" + name] = decode_field
+                encode_lines.append("    encode_{0}(message.{0}, chunks)".format(name))
+                decode_lines.append("    message.{0}, offset = decode_{0}(data, offset)".format(name))
+            encode_lines.append("    return b''.join(chunks)")
+        decode_lines.append("    return message, offset")
+
+        exec("\n".join(encode_lines) + "\n\n" + "\n".join(decode_lines) + "\n", code_globals)
+        self.encode = code_globals["encode"]
+        self.decode = code_globals["decode"]  # returns the message starting at offset and the offset after it
+
+
+def register(message_class, type_id, version=1, fields=None):
+    """
+    Assign a message class a type ID (1 - 65535) and version (0 - 255). fields is a list of (name, type) and defaults
+    to the class's fields. The highest registered version is used for encoding. Returns the class
+    """
+    if not issubclass(message_class, Message):
+        raise ValueError("%s isn't a Message class" % message_class)
+    if not (0 < type_id < 2 ** 16) or not (0 <= version < 2 ** 8):
+        raise ValueError("Type IDs must be 1 - 65535 and versions 0 - 255. Got %s, %s" % (type_id, version))
+
+    registered = _codecs.get((type_id, version))
+    if registered is not None and registered.message_class is not message_class:
+        raise ValueError("Type ID %s version %s is already registered to %s" % (
+            type_id, version, registered.message_class.__name__))
+
+    if fields is None:
+        fields = message_fields(message_class)
+    message_codec = MessageCodec(message_class, type_id, version, list(fields))
+    _codecs[(type_id, version)] = message_codec
+
+    current = message_class.__dict__.get("_codec")
+    if current is None or current.type_id != type_id or current.version <= version:
+        message_class._codec = message_codec
+        frozen_class = message_class.__dict__.get("_frozen_class")  # see Message.freeze
+        if frozen_class is not None:
+            frozen_class._codec = message_codec
+    return message_class
+
+
+def get_codec(message_class):
+    """The codec encoding this class or None if it isn't registered. Subclasses need to be registered separately"""
+    return message_class.__dict__.get("_codec")
+
+
+def encode(message):
+    message_codec = message.__class__.__dict__.get("_codec")
+    if message_codec is None:
+        raise ValueError("%s isn't registered with the codec" % message.__class__.__name__)
+    return message_codec.encode(message)
+
+
+def decode(data, offset=0):
+    """Decode the message starting at offset. Returns the message and the offset of the byte after it"""
+    type_id, version = header.unpack_from(data, offset)
+    message_codec = _codecs.get((type_id, version))
+    if message_codec is None:
+        raise ValueError("Unknown message type ID %s version %s" % (type_id, version))
+    return message_codec.decode(data, offset)
+
+
+def dumps(message):
+    """Encode registered messages with their codec and pickle anything else"""
+    message_codec = message.__class__.__dict__.get("_codec")
+    if message_codec is None:
+        return header.pack(PICKLE_TYPE_ID, 0) + pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    return message_codec.encode(message)
+
+
+def loads(data):
+    """Reverse of dumps"""
+    type_id, version = header.unpack_from(data)
+    if type_id == PICKLE_TYPE_ID:
+        return pickle.loads(data[header.size:])
+    return decode(data)[0]
@@ -62,6 +62,8 @@ class Arduino(Generic):
         # all runtime protocol packets
         self.runtime_protocol_packets = [Arduino.time_response_header]
 
+        self.packets_received = self.metrics.counter("packets_received")
+
     @asyncio.coroutine
     def setup(self):
         self.configure_device()
@@ -178,34 +180,8 @@ class Arduino(Generic):
             self.logger.info("Device named '%s' at '%s' is now at baud rate '%s'" % (
                 self.device_port.whoiam, self.device_port.address, self.baud))
 
-        notif_prev_time = time.time()
-        notif_start_time = time.time()
-        num_received = 0
-        total_received = 0
-        notif_interval = 3
-
         current_pause_command = None
 
-        # keep track of interesting packet stats. This method is on a separate process and these values should
-        # not be accessed from outside this function.
-        def update_packet_stats(num_packets_received):
-            nonlocal notif_prev_time, notif_start_time, num_received, total_received, notif_interval
-            num_received += num_packets_received
-            total_received += num_packets_received
-            current_time = time.time()
-            if current_time - notif_prev_time > notif_interval:
-                self.logger.info(
-                    "found %s packets in %ss (avg=%0.1f packets/sec). "
-                    "%s received in total (avg=%0.1f packets/sec)" % (
-                        num_received,
-                        notif_interval,
-                        num_received / notif_interval,
-                        total_received,
-                        total_received / (current_time - notif_start_time))
-                )
-                num_received = 0
-                notif_prev_time = current_time
-
         self.logger.info("Device has started!")
         self.logger.info("init packet: %s" % self.first_packet)
 
@@ -226,7 +202,6 @@ class Arduino(Generic):
             if in_waiting > 0:
                 # get all possible data from the serial port
                 packet_time = self.get_all_in_waiting(in_waiting, sequence_nums, arduino_times, packets)
-                update_packet_stats(len(packets))
 
                 # put to the queue differently depending on if more timestamps or packets were received
                 if len(packets) > 0 or len(arduino_times) > 0:
@@ -284,6 +259,11 @@ class Arduino(Generic):
 
         self.logger.info("Device process stopped")
 
+    def read(self):
+        update = super(Arduino, self).read()
+        self.packets_received.inc(len(update[-1]))  # (packet_time, sequence_nums, arduino_times, packets)
+        return update
+
     def get_all_in_waiting(self, in_waiting, sequence_nums, arduino_times, packets):
         """
         Read every possible character available and split them into packets.
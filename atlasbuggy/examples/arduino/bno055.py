@@ -127,12 +127,16 @@ class BNO055(Arduino):
             while not self.empty():
                 packet_time, packets = self.read()
 
+                messages = []
                 for packet in packets:
                     message = self.parse_packet(packet_time, packet, counter)
                     self.log_to_buffer(packet_time, message)
-                    await self.broadcast(message)
+                    messages.append(message)
                     counter += 1
 
+                # deliver every packet from this read in one hop
+                await self.broadcast_many(messages)
+
             await asyncio.sleep(0.0)
 
     def parse_packet(self, packet_time, packet, packet_num):
@@ -199,14 +203,15 @@ class ConsumerNode(Node):
     async def loop(self):
         arduino_start_time = self.producer.start_time
         while True:
-            message = await self.producer_queue.get()
+            messages = await self.producer_sub.get_batch()
             consumer_time = time.time()
             delta_t = consumer_time - arduino_start_time
 
-            self.avg_time_sum += consumer_time - message.timestamp
-            self.avg_packet_time_sum += consumer_time - message.packet_time
-            self.avg_arduino_time_sum += message.arduino_time - delta_t
-            self.avg_count += 1
+            for message in messages:
+                self.avg_time_sum += consumer_time - message.timestamp
+                self.avg_packet_time_sum += consumer_time - message.packet_time
+                self.avg_arduino_time_sum += message.arduino_time - delta_t
+                self.avg_count += 1
 
     async def teardown(self):
         self.logger.info("average process delay: %s" % (self.avg_time_sum / self.avg_count))
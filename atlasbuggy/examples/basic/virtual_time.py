@@ -0,0 +1,68 @@
+import time
+import asyncio
+
+from atlasbuggy import Orchestrator, Node, Message, run
+
+
+class SensorNode(Node):
+    def __init__(self, name, rate, duration):
+        super(SensorNode, self).__init__(name=name)
+        self.rate = rate
+        self.duration = duration
+
+    async def loop(self):
+        start_time = self.clock.time()
+        counter = 0
+        while self.clock.time() - start_time < self.duration:
+            await self.broadcast(Message(counter, self.clock.time()))
+            counter += 1
+            await asyncio.sleep(1 / self.rate)
+
+
+class ConsumerNode(Node):
+    def __init__(self):
+        super(ConsumerNode, self).__init__()
+
+        self.imu_tag = "imu"
+        self.gps_tag = "gps"
+        self.define_subscription(self.imu_tag, callback=self.receive)
+        self.define_subscription(self.gps_tag, callback=self.receive)
+
+        self.num_received = 0
+        self.num_out_of_order = 0
+        self.prev_timestamp = 0.0
+
+    def receive(self, message):
+        self.num_received += 1
+        if message.timestamp < self.prev_timestamp:
+            self.num_out_of_order += 1
+        self.prev_timestamp = message.timestamp
+
+    async def teardown(self):
+        self.logger.info("received %s messages, %s out of order" % (self.num_received, self.num_out_of_order))
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        # an hour of sensor data. Nodes read self.clock instead of time.time() so they follow the simulated time
+        imu = SensorNode("imu", 100.0, 3600.0)
+        gps = SensorNode("gps", 10.0, 3600.0)
+        consumer = ConsumerNode()
+
+        self.add_nodes(imu, gps, consumer)
+        self.subscribe(imu, consumer, consumer.imu_tag)
+        self.subscribe(gps, consumer, consumer.gps_tag)
+
+        self.wall_start_time = time.time()
+        self.simulated_start_time = self.clock.time()
+
+    async def teardown(self):
+        wall_time = time.time() - self.wall_start_time
+        simulated_time = self.clock.time() - self.simulated_start_time
+        self.logger.info("simulated %0.1fs in %0.2fs of wall time (%0.0fx real time)" % (
+            simulated_time, wall_time, simulated_time / wall_time))
+
+
+run(MyOrchestrator, virtual_time=True)
@@ -0,0 +1,95 @@
+import time
+import asyncio
+import logging
+
+from atlasbuggy import Orchestrator, Node, Message
+
+RATE = 1000  # messages per second
+READS_PER_SECOND = 100  # Arduino.port_updates_per_second
+DURATION = 5.0  # seconds
+NUM_CONSUMERS = 4
+
+
+class SerialProducer(Node):
+    """Simulates an Arduino node that gets several packets from every serial read"""
+
+    def __init__(self, batched):
+        self.set_logger(write=False, level=logging.WARNING)
+        super(SerialProducer, self).__init__()
+        self.batched = batched
+
+    async def loop(self):
+        # messages are made once so only delivery is measured
+        messages = [Message(index) for index in range(RATE // READS_PER_SECOND)]
+        while True:
+            if self.batched:
+                await self.broadcast_many(messages)
+            else:
+                for message in messages:
+                    await self.broadcast(message)
+
+            await asyncio.sleep(1 / READS_PER_SECOND)
+
+
+class Consumer(Node):
+    def __init__(self, batched):
+        self.set_logger(write=False, level=logging.WARNING)
+        super(Consumer, self).__init__()
+        self.batched = batched
+        self.num_received = 0
+
+        self.producer_tag = "producer"
+        self.producer_sub = self.define_subscription(self.producer_tag)
+
+    async def loop(self):
+        if self.batched:
+            while True:
+                messages = await self.producer_sub.get_batch()
+                self.num_received += len(messages)
+        else:
+            while True:
+                await self.producer_sub.wait()
+                self.num_received += 1
+
+
+class BenchmarkOrchestrator(Orchestrator):
+    def __init__(self, event_loop, batched):
+        self.set_logger(write=False, level=logging.WARNING)
+        super(BenchmarkOrchestrator, self).__init__(event_loop)
+
+        self.producer = SerialProducer(batched)
+        self.consumers = [Consumer(batched) for _ in range(NUM_CONSUMERS)]
+        for consumer in self.consumers:
+            self.subscribe(self.producer, consumer, consumer.producer_tag)
+
+
+def measure(batched):
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    orchestrator = BenchmarkOrchestrator(event_loop, batched)
+
+    tasks = [asyncio.ensure_future(node.loop()) for node in orchestrator.nodes]
+    start_cpu = time.process_time()
+    event_loop.run_until_complete(asyncio.wait(tasks, timeout=DURATION))
+    cpu_time = time.process_time() - start_cpu
+
+    for task in tasks:
+        task.cancel()
+    event_loop.run_until_complete(asyncio.wait(tasks))
+    event_loop.close()
+
+    num_received = sum(consumer.num_received for consumer in orchestrator.consumers)
+    return cpu_time / DURATION, cpu_time / num_received
+
+
+def main():
+    print("%s messages/sec in reads of %s packets, %s consumers" % (RATE, RATE // READS_PER_SECOND, NUM_CONSUMERS))
+    for batched in (False, True):
+        cpu_usage, cpu_per_message = measure(batched)
+        print("%s: CPU %0.2f%%, %0.2fus of CPU per delivered message" % (
+            "broadcast_many" if batched else "broadcast", cpu_usage * 100, cpu_per_message * 1E6
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import time
+import asyncio
+import logging
+
+from atlasbuggy import Orchestrator, Node, Message
+
+NUM_MESSAGES = 20000
+NUM_CONSUMERS = 12
+
+
+class ImuMessage(Message):
+    def __init__(self, n, timestamp=None):
+        self.yaw = 0.0
+        super(ImuMessage, self).__init__(n, timestamp)
+
+
+class ProducerNode(Node):
+    def __init__(self):
+        self.set_logger(write=False, level=logging.WARNING)
+        super(ProducerNode, self).__init__()
+
+        self.define_service("imu", ImuMessage)
+        self.define_service("status", str)
+
+
+class LinearScanProducerNode(ProducerNode):
+    """Dispatches the way Node.broadcast did before the routing table: scan every subscription per message"""
+
+    def _find_matching_subscriptions(self, message, service):
+        results = []
+        for subscription in self._consumer_subs:
+            if not subscription.enabled:
+                continue
+
+            if service == subscription.requested_service:
+                if subscription.expected_message_types is not None:
+                    satisfied = False
+                    for expected_message_type in subscription.expected_message_types:
+                        if isinstance(message, expected_message_type):
+                            satisfied = True
+                            break
+                    if not satisfied:
+                        raise ValueError("Unexpected message type")
+                results.append((subscription, message))
+        return results
+
+
+class ConsumerNode(Node):
+    def __init__(self, service):
+        self.set_logger(write=False, level=logging.WARNING)
+        super(ConsumerNode, self).__init__()
+
+        self.num_received = 0
+        self.producer_tag = "producer"
+        if service == "imu":
+            message_type = ImuMessage
+        else:
+            message_type = str
+        self.producer_sub = self.define_subscription(self.producer_tag, service, message_type=message_type,
+                                                     callback=self.on_message)
+
+    def on_message(self, message):
+        self.num_received += 1
+
+
+class BenchmarkOrchestrator(Orchestrator):
+    def __init__(self, event_loop, producer_class):
+        self.set_logger(write=False, level=logging.WARNING)
+        super(BenchmarkOrchestrator, self).__init__(event_loop)
+
+        self.producer = producer_class()
+        self.consumers = []
+        for index in range(NUM_CONSUMERS):
+            # half of the consumers listen to a service the benchmark never broadcasts on
+            consumer = ConsumerNode("imu" if index % 2 == 0 else "status")
+            self.consumers.append(consumer)
+            self.subscribe(self.producer, consumer, consumer.producer_tag)
+
+
+def time_dispatch(producer_class):
+    event_loop = asyncio.new_event_loop()
+    orchestrator = BenchmarkOrchestrator(event_loop, producer_class)
+    messages = [ImuMessage(n, 0.0) for n in range(NUM_MESSAGES)]
+
+    start_time = time.perf_counter()
+    for message in messages:
+        orchestrator.producer.broadcast_nowait(message, "imu")
+    duration = time.perf_counter() - start_time
+
+    event_loop.close()
+    return duration / NUM_MESSAGES
+
+
+def main():
+    linear_scan_time = time_dispatch(LinearScanProducerNode)
+    routing_table_time = time_dispatch(ProducerNode)
+
+    print("%s messages, %s consumers" % (NUM_MESSAGES, NUM_CONSUMERS))
+    print("linear scan:   %0.2fus per message" % (linear_scan_time * 1E6))
+    print("routing table: %0.2fus per message" % (routing_table_time * 1E6))
+    print("speed up: %0.2fx" % (linear_scan_time / routing_table_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import time
+import asyncio
+import logging
+
+from atlasbuggy import Orchestrator, Node, Message
+
+FPS = 30.0
+DURATION = 5.0  # seconds per measurement
+NUM_CONSUMERS = 8
+
+
+class FrameProducer(Node):
+    def __init__(self, fps):
+        self.set_logger(write=False, level=logging.WARNING)
+        super(FrameProducer, self).__init__()
+        self.fps = fps
+
+    async def loop(self):
+        counter = 0
+        while True:
+            if self.fps is None:  # idle: nothing is ever broadcast
+                await asyncio.Event().wait()
+            await self.broadcast(Message(counter))
+            counter += 1
+            await asyncio.sleep(1 / self.fps)
+
+
+class FrameConsumer(Node):
+    def __init__(self):
+        self.set_logger(write=False, level=logging.WARNING)
+        super(FrameConsumer, self).__init__()
+
+        self.latency_sum = 0.0
+        self.num_frames = 0
+        self.capture = None
+        self.capture_queue = None
+        self.capture_tag = "capture"
+        self.capture_sub = self.define_subscription(self.capture_tag, queue_size=1)
+
+    def take(self):
+        self.capture = self.capture_sub.get_producer()
+        self.capture_queue = self.capture_sub.get_queue()
+
+    def record(self, message):
+        self.latency_sum += time.time() - message.timestamp
+        self.num_frames += 1
+
+
+class PollingConsumer(FrameConsumer):
+    """How the OpenCV nodes used to wait for frames"""
+
+    async def loop(self):
+        while True:
+            while not self.capture_queue.empty():
+                self.record(await self.capture_queue.get())
+            await asyncio.sleep(0.5 / FPS)
+
+
+class WaitingConsumer(FrameConsumer):
+    async def loop(self):
+        async for message in self.capture_sub:
+            self.record(message)
+
+
+class BenchmarkOrchestrator(Orchestrator):
+    def __init__(self, event_loop, consumer_class, fps):
+        self.set_logger(write=False, level=logging.WARNING)
+        super(BenchmarkOrchestrator, self).__init__(event_loop)
+
+        self.producer = FrameProducer(fps)
+        self.consumers = [consumer_class() for _ in range(NUM_CONSUMERS)]
+        for consumer in self.consumers:
+            self.subscribe(self.producer, consumer, consumer.capture_tag)
+
+
+def measure(consumer_class, fps):
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    orchestrator = BenchmarkOrchestrator(event_loop, consumer_class, fps)
+    for node in orchestrator.nodes:
+        node.take()
+
+    tasks = [asyncio.ensure_future(node.loop()) for node in orchestrator.nodes]
+    start_cpu = time.process_time()
+    event_loop.run_until_complete(asyncio.wait(tasks, timeout=DURATION))
+    cpu_usage = (time.process_time() - start_cpu) / DURATION
+
+    for task in tasks:
+        task.cancel()
+    event_loop.run_until_complete(asyncio.wait(tasks))
+    event_loop.close()
+
+    latency_sum = sum(consumer.latency_sum for consumer in orchestrator.consumers)
+    num_frames = sum(consumer.num_frames for consumer in orchestrator.consumers)
+    if num_frames == 0:
+        return cpu_usage, None
+    return cpu_usage, latency_sum / num_frames
+
+
+def main():
+    print("%s consumers, %ss per measurement" % (NUM_CONSUMERS, DURATION))
+    for consumer_class in (PollingConsumer, WaitingConsumer):
+        idle_cpu, _ = measure(consumer_class, None)
+        streaming_cpu, latency = measure(consumer_class, FPS)
+        print("%s: idle CPU %0.2f%%, CPU at %s fps %0.2f%%, avg frame latency %0.3fms" % (
+            consumer_class.__name__, idle_cpu * 100, FPS, streaming_cpu * 100, latency * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import cv2
+
+from atlasbuggy import Orchestrator, run
+from atlasbuggy.opencv import OpenCVCamera, OpenCVViewer, OpenCVPipeline, SharedFramePool
+
+
+class MyPipeline(OpenCVPipeline):
+    def __init__(self, enabled=True, logger=None, frame_pool=None):
+        super(MyPipeline, self).__init__(enabled, logger=logger, frame_pool=frame_pool)
+
+    async def pipeline(self, message):
+        # message.image maps the camera's frame in shared memory. It wasn't copied to get to this process
+        image = cv2.cvtColor(message.image, cv2.COLOR_BGR2GRAY)
+        threshold_value, image = cv2.threshold(image, 0, 255, cv2.THRESH_OTSU)
+        return image
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        # pools have to exist before the pipeline's process starts
+        self.camera_frames = SharedFramePool.for_frames(8, 1920, 1080)
+        self.pipeline_frames = SharedFramePool.for_frames(8, 1920, 1080, depth=1)
+
+        self.camera = OpenCVCamera(capture_number=0, frame_pool=self.camera_frames)
+        self.pipeline = MyPipeline(frame_pool=self.pipeline_frames)
+        self.viewer = OpenCVViewer()
+
+        self.add_nodes(self.camera, self.viewer)
+        self.add_nodes(self.pipeline, separate_process=True)
+
+        self.subscribe(self.camera, self.pipeline, self.pipeline.capture_tag)
+        self.subscribe(self.pipeline, self.viewer, self.viewer.capture_tag)
+
+    async def teardown(self):
+        self.camera_frames.unlink()
+        self.pipeline_frames.unlink()
+
+
+run(MyOrchestrator)
@@ -19,7 +19,7 @@ class MyMessage(Message):
         print("\n")
 
 
-class TestMessage1(Message):
+class TestMessage1(Message, auto_serialize=True):
     def __init__(self, n, timestamp=None):
         super(TestMessage1, self).__init__(n)
 
@@ -27,10 +27,8 @@ class TestMessage1(Message):
         self.prop2 = 0.0
         self.prop3 = ""
 
-        self.auto_serialize()
 
-
-class TestMessage2(Message):
+class TestMessage2(Message, auto_serialize=True):
     def __init__(self, n, timestamp=None):
         super(TestMessage2, self).__init__(n, timestamp)
 
@@ -39,8 +37,6 @@ class TestMessage2(Message):
         self.prop_c = ""
         self.prop_d = [0, 0, 0]
 
-        self.auto_serialize()
-
 
 if __name__ == '__main__':
     def test_message_equality():
@@ -1,9 +1,8 @@
 import time
-from atlasbuggy.log.parser import LogParser
+from atlasbuggy.log.parser import LogStream
 
 t0 = time.time()
-with open("../subscriptions/logs/converted_messages_demo/ImmutableConsumer/converted_messages_demo.log") as file:
-    parser = LogParser(file.read())
+parser = LogStream("../subscriptions/logs/converted_messages_demo/ImmutableConsumer/converted_messages_demo.log")
 t1 = time.time()
 
 print(t1 - t0)
@@ -0,0 +1,75 @@
+import os
+import asyncio
+
+from atlasbuggy import Orchestrator, Node, SchemaMessage, codec, run
+from atlasbuggy.log import PlaybackNode, RecorderNode
+
+
+class PoseMessage(SchemaMessage):
+    schema = dict(x=float, y=float, theta=float)
+
+
+# the type ID is how the session file says which class each record is. Use the same one when reading it back
+codec.register(PoseMessage, 10)
+
+session_path = "pose_demo.session"
+
+
+class PoseSensor(Node):
+    def __init__(self):
+        super(PoseSensor, self).__init__()
+
+    async def loop(self):
+        for counter in range(500):
+            await self.broadcast(PoseMessage(counter, self.clock.time(), x=counter * 0.1, y=counter * -0.1))
+            await asyncio.sleep(0.01)
+
+
+class PoseConsumer(Node):
+    def __init__(self):
+        super(PoseConsumer, self).__init__()
+
+        self.pose_tag = "pose"
+        self.define_subscription(self.pose_tag, message_type=PoseMessage, callback=self.receive)
+        self.last_message = None
+        self.num_received = 0
+
+    def receive(self, message):
+        self.last_message = message
+        self.num_received += 1
+
+    async def teardown(self):
+        self.logger.info("received %s messages. Last one: %s" % (self.num_received, self.last_message))
+
+
+class RecordingOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        self.set_default(write=False)
+        super(RecordingOrchestrator, self).__init__(event_loop)
+
+        sensor = PoseSensor()
+        recorder = RecorderNode(session_path)
+
+        self.add_nodes(sensor, recorder)
+        self.subscribe(sensor, recorder, recorder.record(sensor))
+
+
+class PlaybackOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        self.set_default(write=False)
+        super(PlaybackOrchestrator, self).__init__(event_loop)
+
+        # the messages are read back as they were recorded. No regular expressions involved
+        playback = PlaybackNode(session_path, sources=["PoseSensor"])
+        consumer = PoseConsumer()
+
+        self.add_nodes(playback, consumer)
+        self.subscribe(playback, consumer, consumer.pose_tag)
+
+
+if os.path.isfile(session_path):
+    os.remove(session_path)
+
+run(RecordingOrchestrator, virtual_time=True)
+run(PlaybackOrchestrator, virtual_time=True)
+os.remove(session_path)
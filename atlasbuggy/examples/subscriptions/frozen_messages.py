@@ -0,0 +1,66 @@
+import asyncio
+
+import numpy as np
+
+from atlasbuggy import Orchestrator, Node, SchemaMessage, run
+
+
+class ScanMessage(SchemaMessage):
+    schema = dict(ranges=(np.ndarray, np.zeros(360)))
+
+
+class LidarNode(Node):
+    def __init__(self, enabled=True):
+        super(LidarNode, self).__init__(enabled)
+        self.freeze_messages = True  # every consumer gets the same read-only scan. Nothing is copied to stay safe
+
+    async def loop(self):
+        counter = 0
+        while True:
+            await self.broadcast(ScanMessage(counter, ranges=np.random.uniform(0.1, 10.0, 360)))
+            counter += 1
+            await asyncio.sleep(0.1)
+
+
+class ObstacleNode(Node):
+    def __init__(self, enabled=True):
+        super(ObstacleNode, self).__init__(enabled)
+        self.lidar_tag = "lidar"
+        self.lidar_sub = self.define_subscription(self.lidar_tag, message_type=ScanMessage)
+
+    async def loop(self):
+        async for message in self.lidar_sub:
+            self.logger.info("closest obstacle: %0.2fm" % message.ranges.min())
+
+
+class FilterNode(Node):
+    def __init__(self, enabled=True):
+        super(FilterNode, self).__init__(enabled)
+        self.lidar_tag = "lidar"
+        self.lidar_sub = self.define_subscription(self.lidar_tag, message_type=ScanMessage)
+
+    async def loop(self):
+        async for message in self.lidar_sub:
+            try:
+                message.ranges[message.ranges > 5.0] = np.inf
+            except ValueError:
+                # frozen. Copy on write: thaw gives a copy sharing the data, then replace what gets modified
+                message = message.thaw()
+                message.ranges = np.where(message.ranges > 5.0, np.inf, message.ranges)
+            self.logger.info("%s ranges in view" % np.isfinite(message.ranges).sum())
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        lidar = LidarNode()
+        obstacles = ObstacleNode()
+        filter_node = FilterNode()
+
+        self.add_nodes(lidar, obstacles, filter_node)
+        self.subscribe(lidar, obstacles, obstacles.lidar_tag)
+        self.subscribe(lidar, filter_node, filter_node.lidar_tag)
+
+
+run(MyOrchestrator)
@@ -0,0 +1,54 @@
+import time
+import asyncio
+from atlasbuggy import Orchestrator, Node, run
+
+
+class ProducerNode(Node):
+    def __init__(self, enabled=True):
+        super(ProducerNode, self).__init__(enabled)
+
+    async def loop(self):
+        counter = 0
+        while True:
+            # the producer never blocks or logs "is full" even though the consumer is slower
+            await self.broadcast((counter, time.time()))
+            counter += 1
+            await asyncio.sleep(0.1)
+
+
+class ConsumerNode(Node):
+    def __init__(self, enabled=True):
+        super(ConsumerNode, self).__init__(enabled)
+
+        self.producer_tag = "producer"
+        self.producer_sub = self.define_subscription(self.producer_tag, mode="latest")
+        self.producer = None
+
+    def take(self):
+        self.producer = self.producer_sub.get_producer()
+
+        self.logger.info("Got producer named '%s'" % self.producer.name)
+
+    async def loop(self):
+        while True:
+            # waits for a message if there isn't one. Only the newest message is returned
+            index, producer_time = await self.producer_sub.get_latest()
+            consumer_time = time.time()
+
+            self.logger.info("index: %s, time diff: %s, messages skipped so far: %s" % (
+                index, consumer_time - producer_time, self.producer_sub.num_dropped))
+            await asyncio.sleep(1.0)
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        producer = ProducerNode()
+        consumer = ConsumerNode()
+
+        self.add_nodes(producer, consumer)
+        self.subscribe(producer, consumer, consumer.producer_tag)
+
+
+run(MyOrchestrator)
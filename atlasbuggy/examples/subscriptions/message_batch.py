@@ -0,0 +1,60 @@
+import math
+import asyncio
+
+import numpy as np
+
+from atlasbuggy import Orchestrator, Node, SchemaMessage, run
+from atlasbuggy.batch import MessageBatch
+
+
+class OdometryMessage(SchemaMessage):
+    schema = dict(x=float, y=float)
+
+
+class OdometryNode(Node):
+    def __init__(self, enabled=True):
+        super(OdometryNode, self).__init__(enabled)
+
+    async def loop(self):
+        counter = 0
+        while True:
+            angle = counter / 100
+            await self.broadcast(OdometryMessage(counter, x=math.cos(angle), y=math.sin(angle)))
+            counter += 1
+            await asyncio.sleep(0.01)
+
+
+class SpeedNode(Node):
+    def __init__(self, enabled=True):
+        super(SpeedNode, self).__init__(enabled)
+
+        self.odometry_tag = "odometry"
+        self.odometry_sub = self.define_subscription(self.odometry_tag, message_type=OdometryMessage)
+        self.window = MessageBatch(OdometryMessage)  # columns of the last second of messages
+
+    async def loop(self):
+        while True:
+            messages = await self.odometry_sub.get_batch(100)
+            self.window.extend(messages)
+            self.window.drop_before(self.window.timestamp[-1] - 1.0)
+
+            # numpy math over the whole window instead of looping over messages
+            distance = np.hypot(np.diff(self.window.x), np.diff(self.window.y)).sum()
+            duration = self.window.timestamp[-1] - self.window.timestamp[0]
+            if duration > 0.0:
+                self.logger.info("%s messages, average speed: %0.3f" % (len(self.window), distance / duration))
+            await asyncio.sleep(0.5)
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        odometry = OdometryNode()
+        speed = SpeedNode()
+
+        self.add_nodes(odometry, speed)
+        self.subscribe(odometry, speed, speed.odometry_tag)
+
+
+run(MyOrchestrator)
@@ -0,0 +1,45 @@
+import asyncio
+
+from atlasbuggy import Orchestrator, Node, Message, run
+
+
+class ImuNode(Node):
+    def __init__(self, enabled=True):
+        super(ImuNode, self).__init__(enabled)
+        self.metrics.gauge("temperature").set(35.0)
+
+    async def loop(self):
+        counter = 0
+        while True:
+            await self.broadcast(Message(counter))
+            counter += 1
+            await asyncio.sleep(0.002)
+
+
+class SlowConsumerNode(Node):
+    def __init__(self, enabled=True):
+        super(SlowConsumerNode, self).__init__(enabled)
+
+        self.imu_tag = "imu"
+        self.imu_sub = self.define_subscription(self.imu_tag, queue_size=50, queue_policy="drop_oldest")
+
+    async def loop(self):
+        async for message in self.imu_sub:
+            await asyncio.sleep(0.003)  # can't keep up. Watch messages_dropped and queue_depth grow
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        imu = ImuNode()
+        consumer = SlowConsumerNode()
+
+        self.add_nodes(imu, consumer)
+        self.subscribe(imu, consumer, consumer.imu_tag)
+
+        # try "curl localhost:9090" while this runs
+        self.publish_metrics(path="metrics.json", port=9090, interval=1.0)
+
+
+run(MyOrchestrator)
@@ -0,0 +1,67 @@
+import os
+import time
+import signal
+import asyncio
+
+from atlasbuggy import Orchestrator, Node, Message, run
+
+
+class BlockingCameraNode(Node):
+    def __init__(self, enabled=True):
+        super(BlockingCameraNode, self).__init__(enabled)
+
+    def read_frame(self):
+        time.sleep(0.08)  # like a synchronous capture.read(). Nothing else runs in the meantime
+
+    async def loop(self):
+        counter = 0
+        while True:
+            self.read_frame()
+            await self.broadcast(Message(counter))
+            counter += 1
+
+
+class ImuNode(Node):
+    def __init__(self, enabled=True):
+        super(ImuNode, self).__init__(enabled)
+
+    async def loop(self):
+        counter = 0
+        while True:
+            await self.broadcast(Message(counter))
+            counter += 1
+            await asyncio.sleep(0.005)  # wants 200 Hz but gets starved by the camera
+
+
+class LoggerNode(Node):
+    def __init__(self, enabled=True):
+        super(LoggerNode, self).__init__(enabled)
+
+        self.imu_tag = "imu"
+        self.imu_sub = self.define_subscription(self.imu_tag, callback=self.imu_callback)
+
+    def imu_callback(self, message):
+        pass
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        # profile_signal is optional. It lets "kill -USR1 <pid>" toggle profiling while the orchestrator is running
+        super(MyOrchestrator, self).__init__(event_loop, profile_signal=signal.SIGUSR1)
+
+        camera = BlockingCameraNode()
+        imu = ImuNode()
+        imu_logger = LoggerNode()
+
+        self.add_nodes(camera, imu, imu_logger)
+        self.subscribe(imu, imu_logger, imu_logger.imu_tag)
+
+        self.profiler.report_interval = 2.0
+
+    async def setup(self):
+        # or leave this out and toggle profiling with the signal
+        self.logger.info("pid: %s" % os.getpid())
+        self.start_profiling()
+
+
+run(MyOrchestrator)
@@ -0,0 +1,50 @@
+import time
+import asyncio
+from atlasbuggy import Orchestrator, Node, run
+
+# try "drop_newest", "block", or "raise" to see how each policy treats the burst
+QUEUE_POLICY = "drop_oldest"
+
+
+class BurstProducerNode(Node):
+    def __init__(self, enabled=True):
+        super(BurstProducerNode, self).__init__(enabled)
+
+    async def loop(self):
+        counter = 0
+        while True:
+            # a burst of 50 messages. With drop_oldest or drop_newest the producer is never held up
+            start_time = time.time()
+            for _ in range(50):
+                await self.broadcast((counter, time.time()))
+                counter += 1
+            self.logger.info("burst took %0.4fs" % (time.time() - start_time))
+            await asyncio.sleep(1.0)
+
+
+class SlowConsumerNode(Node):
+    def __init__(self, enabled=True):
+        super(SlowConsumerNode, self).__init__(enabled)
+
+        self.producer_tag = "producer"
+        self.producer_sub = self.define_subscription(self.producer_tag, queue_size=10, queue_policy=QUEUE_POLICY)
+
+    async def loop(self):
+        async for index, producer_time in self.producer_sub:
+            self.logger.info("index: %s, queue size: %s, dropped so far: %s" % (
+                index, self.producer_sub.get_queue().qsize(), self.producer_sub.num_dropped))
+            await asyncio.sleep(0.05)
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        producer = BurstProducerNode()
+        consumer = SlowConsumerNode()
+
+        self.add_nodes(producer, consumer)
+        self.subscribe(producer, consumer, consumer.producer_tag)
+
+
+run(MyOrchestrator)
@@ -0,0 +1,78 @@
+import sys
+import time
+import math
+import asyncio
+
+from atlasbuggy import Orchestrator, Node, SchemaMessage, run, codec
+from atlasbuggy.transport import SubscriptionServer, RemoteProducer
+
+# run "python remote_subscription.py vehicle" on one computer (or terminal)
+# and "python remote_subscription.py base_station" on another
+HOST = "localhost"
+PORT = 5810
+
+
+class PoseMessage(SchemaMessage):
+    schema = dict(x=float, y=float)
+
+
+codec.register(PoseMessage, 1)  # sent in the codec's binary format instead of pickled
+
+
+class PoseNode(Node):
+    def __init__(self, enabled=True):
+        super(PoseNode, self).__init__(enabled)
+        self.rate = 100.0
+        self.define_service(message_type=PoseMessage)
+
+    async def loop(self):
+        counter = 0
+        while True:
+            message = PoseMessage(counter, x=math.cos(counter / self.rate), y=math.sin(counter / self.rate))
+            await self.broadcast(message)
+
+            counter += 1
+            await asyncio.sleep(1 / self.rate)
+
+
+class PlotterNode(Node):
+    def __init__(self, enabled=True):
+        super(PlotterNode, self).__init__(enabled)
+
+        self.pose_tag = "pose"
+        self.pose_sub = self.define_subscription(self.pose_tag, message_type=PoseMessage,
+                                                 required_attributes=("rate",))
+
+    async def loop(self):
+        async for message in self.pose_sub:
+            if message.n % self.pose_sub.get_producer().rate == 0:
+                self.logger.info("x=%0.3f, y=%0.3f, delay: %0.2fms" % (
+                    message.x, message.y, (time.time() - message.timestamp) * 1000))
+
+
+class VehicleOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(VehicleOrchestrator, self).__init__(event_loop)
+
+        pose = PoseNode()
+        server = SubscriptionServer(HOST, PORT)
+
+        self.add_nodes(pose, server)
+        self.subscribe(pose, server, server.producer_tag)
+
+
+class BaseStationOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(BaseStationOrchestrator, self).__init__(event_loop)
+
+        pose = RemoteProducer(HOST, PORT)
+        plotter = PlotterNode()
+
+        self.add_nodes(pose, plotter)
+        self.subscribe(pose, plotter, plotter.pose_tag)
+
+
+if len(sys.argv) > 1 and sys.argv[1] == "base_station":
+    run(BaseStationOrchestrator)
+else:
+    run(VehicleOrchestrator)
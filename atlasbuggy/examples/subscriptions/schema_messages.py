@@ -0,0 +1,50 @@
+import random
+import asyncio
+from atlasbuggy import Orchestrator, Node, SchemaMessage, run
+
+
+class ImuMessage(SchemaMessage):
+    # properties are declared once on the class. They're slotted and their serialization is generated up front
+    schema = dict(yaw=float, pitch=float, roll=float, status=(str, "ok"))
+
+
+class ImuNode(Node):
+    def __init__(self, enabled=True):
+        super(ImuNode, self).__init__(enabled)
+
+    async def loop(self):
+        counter = 0
+        while True:
+            message = ImuMessage(counter, yaw=random.random(), pitch=random.random(), roll=random.random())
+            self.logger.info("sending: %s" % message)  # logs in the same format as an auto serialized Message
+            await self.broadcast(message)
+            counter += 1
+            await asyncio.sleep(0.1)
+
+
+class ConsumerNode(Node):
+    def __init__(self, enabled=True):
+        super(ConsumerNode, self).__init__(enabled)
+
+        self.imu_tag = "imu"
+        self.imu_sub = self.define_subscription(self.imu_tag, message_type=ImuMessage)
+
+    async def loop(self):
+        async for message in self.imu_sub:
+            parsed = ImuMessage.parse(str(message))
+            assert parsed == message, "%s != %s" % (parsed, message)
+            self.logger.info("n: %s, yaw: %0.4f, status: %s" % (message.n, message.yaw, message.status))
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        imu = ImuNode()
+        consumer = ConsumerNode()
+
+        self.add_nodes(imu, consumer)
+        self.subscribe(imu, consumer, consumer.imu_tag)
+
+
+run(MyOrchestrator)
@@ -0,0 +1,59 @@
+import os
+import time
+import asyncio
+
+from atlasbuggy import Orchestrator, Node, run
+
+
+class ProcessorHeavyNode(Node):
+    def __init__(self, enabled=True):
+        super(ProcessorHeavyNode, self).__init__(enabled)
+
+    async def loop(self):
+        while True:
+            counter = 0
+
+            # would stall every other node if this node wasn't in its own process
+            t0 = time.time()
+            while time.time() - t0 < 1:
+                counter += 1
+            await self.broadcast((time.time(), counter, os.getpid()))
+
+
+class HeartbeatNode(Node):
+    def __init__(self, enabled=True):
+        super(HeartbeatNode, self).__init__(enabled)
+
+    async def loop(self):
+        while True:
+            self.logger.info("still responsive (pid=%s)" % os.getpid())
+            await asyncio.sleep(0.25)
+
+
+class ConsumerNode(Node):
+    def __init__(self, enabled=True):
+        super(ConsumerNode, self).__init__(enabled)
+
+        self.producer_tag = "producer"
+        self.producer_sub = self.define_subscription(self.producer_tag)
+
+    async def loop(self):
+        async for producer_time, counter, producer_pid in self.producer_sub:
+            self.logger.info("counted to %s in process %s. time diff: %s" % (
+                counter, producer_pid, time.time() - producer_time))
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        producer = ProcessorHeavyNode()
+        heartbeat = HeartbeatNode()
+        consumer = ConsumerNode()
+
+        self.add_nodes(producer, separate_process=True)
+        self.add_nodes(heartbeat, consumer)
+        self.subscribe(producer, consumer, consumer.producer_tag)
+
+
+run(MyOrchestrator)
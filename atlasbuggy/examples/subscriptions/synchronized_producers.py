@@ -0,0 +1,50 @@
+import time
+import asyncio
+
+from atlasbuggy import Orchestrator, Node, Message, run
+from atlasbuggy.synchronizer import Synchronizer
+
+
+class SensorNode(Node):
+    def __init__(self, rate, name):
+        super(SensorNode, self).__init__(name=name)
+        self.rate = rate
+
+    async def loop(self):
+        counter = 0
+        while True:
+            await self.broadcast(Message(counter, time.time()))
+            counter += 1
+            await asyncio.sleep(1 / self.rate)
+
+
+class FusionNode(Node):
+    def __init__(self, enabled=True):
+        super(FusionNode, self).__init__(enabled)
+
+        self.synchronizer_tag = "synchronizer"
+        self.synchronizer_sub = self.define_subscription(self.synchronizer_tag)
+
+    async def loop(self):
+        async for imu_message, gps_message in self.synchronizer_sub:
+            self.logger.info("imu #%s and gps #%s are %0.2fms apart" % (
+                imu_message.n, gps_message.n, abs(imu_message.timestamp - gps_message.timestamp) * 1000))
+
+
+class MyOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        super(MyOrchestrator, self).__init__(event_loop)
+
+        imu = SensorNode(500, "imu")
+        gps = SensorNode(10, "gps")
+        synchronizer = Synchronizer(("imu", "gps"), tolerance=0.002)
+        fusion = FusionNode()
+
+        self.add_nodes(imu, gps, synchronizer, fusion)
+
+        self.subscribe(imu, synchronizer, "imu")
+        self.subscribe(gps, synchronizer, "gps")
+        self.subscribe(synchronizer, fusion, fusion.synchronizer_tag)
+
+
+run(MyOrchestrator)
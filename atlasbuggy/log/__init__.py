@@ -1,3 +1,4 @@
 from .playback import PlaybackNode
+from .recorder import RecorderNode
 from .default import DefaultSettings
 from .factory import make_logger
@@ -15,7 +15,8 @@ class DefaultSettings:
         write=False, level=logging.INFO,
         log_format="[%(name)s @ %(filename)s:%(lineno)d][%(levelname)s] %(asctime)s: %(message)s",
         file_name="%H_%M_%S.log", directory=os.path.join("logs", "%Y_%b_%d", "%(name)s"),
-        custom_fields_fn=None
+        custom_fields_fn=None,
+        async_logging=True, log_queue_size=10000, log_overflow_policy="drop_oldest"
     )
 
     @staticmethod
@@ -1,27 +1,190 @@
 import os
 import time
 import logging
+import threading
+import collections
+
+_writer_logger = logging.getLogger("atlasbuggy.log")
+
+
+class BackgroundLogWriter:
+    """
+    Formats and writes log records on a background thread so logging doesn't block the event loop. Loggers made by
+    make_logger put their records on its queue with a QueueingHandler. Records that arrive while a batch is being
+    written make up the next batch and stream handlers are flushed once per batch. When max_size records are waiting,
+    the policy decides what happens:
+        drop_oldest - discard the oldest waiting record
+        drop_newest - discard the new record
+        block - wait for the writer to catch up. Logging on an event loop's thread then stalls every node
+    Discarded records are counted in num_dropped and reported with a warning. Errors in handlers are reported with
+    Handler.handleError like logging does and don't stop the thread
+    """
+
+    policies = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, max_size=10000, policy="drop_oldest"):
+        self.max_size = 0
+        self.policy = None
+        self.configure(max_size, policy)
+
+        self.num_dropped = 0
+        self._num_reported = 0
+        self._pid = None
+        self._start()
+
+    def configure(self, max_size, policy):
+        if policy not in self.policies:
+            raise ValueError("Log overflow policy '%s' isn't one of %s" % (policy, self.policies))
+        self.max_size = max_size
+        self.policy = policy
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._records = collections.deque()
+        self._num_pending = 0  # records that were put but aren't written yet
+        self._condition = threading.Condition(threading.Lock())  # a Lock is faster than the default RLock
+        self._thread = threading.Thread(target=self._run, name="log writer", daemon=True)
+        self._thread.start()
+
+    def _check_process(self):
+        # the writer thread doesn't exist in forked processes. Start a new one and forget the parent's records
+        if self._pid != os.getpid():
+            self._start()
+
+    def put(self, handlers, record):
+        self._check_process()
+        with self._condition:
+            if self.max_size > 0 and len(self._records) >= self.max_size:
+                if self.policy == "drop_newest":
+                    self.num_dropped += 1
+                    return
+                elif self.policy == "drop_oldest":
+                    self._records.popleft()
+                    self._num_pending -= 1
+                    self.num_dropped += 1
+                else:
+                    while len(self._records) >= self.max_size:
+                        self._condition.wait()
+
+            self._records.append((handlers, record))
+            self._num_pending += 1
+            if len(self._records) == 1:
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every record put so far is written"""
+        self._check_process()
+        if threading.current_thread() is self._thread:
+            return
+        with self._condition:
+            self._condition.wait_for(lambda: self._num_pending == 0, timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while len(self._records) == 0:
+                    self._condition.wait()
+                batch = self._records
+                self._records = collections.deque()
+                self._condition.notify_all()
+
+            try:
+                self._write(batch)
+            except Exception:
+                _writer_logger.exception("Failed to write %s log records" % len(batch))
+            finally:
+                with self._condition:
+                    self._num_pending -= len(batch)
+                    self._condition.notify_all()
+
+    def _write(self, batch):
+        unflushed = {}
+        for handlers, record in batch:
+            for handler in handlers:
+                if record.levelno < handler.level:
+                    continue
+                try:
+                    if isinstance(handler, logging.StreamHandler) and handler.stream is not None:
+                        # write without StreamHandler.emit's flush. Flushed after the batch
+                        if handler.filter(record):
+                            handler.acquire()
+                            try:
+                                handler.stream.write(handler.format(record) + handler.terminator)
+                            finally:
+                                handler.release()
+                            unflushed[id(handler)] = handler
+                    else:
+                        handler.handle(record)
+                except Exception:
+                    handler.handleError(record)
+
+        for handler in unflushed.values():
+            handler.flush()
+
+        if self.num_dropped > self._num_reported:
+            _writer_logger.warning("%s log records were dropped because the log queue was full (%s total)" % (
+                self.num_dropped - self._num_reported, self.num_dropped))
+            self._num_reported = self.num_dropped
+
+
+class QueueingHandler(logging.Handler):
+    """Passes records to a BackgroundLogWriter to be written by handlers on its thread"""
+
+    def __init__(self, writer, handlers):
+        super(QueueingHandler, self).__init__(min(handler.level for handler in handlers))
+        self.writer = writer
+        self.handlers = handlers
+
+    def handle(self, record):
+        # the writer's queue has its own lock. Skip the handler's lock
+        if self.filter(record):
+            self.emit(record)
+        return record
+
+    def emit(self, record):
+        # only the message is formatted here in case its arguments change before the writer gets to it.
+        # Exceptions are formatted so their tracebacks aren't kept around
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.writer.put(self.handlers, record)
+
+    def flush(self):
+        self.writer.flush()
+
+
+_log_writer = None
+
+
+def get_log_writer(max_size=10000, policy="drop_oldest"):
+    """The writer shared by every logger make_logger creates. Changes its queue settings if it exists"""
+    global _log_writer
+    if _log_writer is None:
+        _log_writer = BackgroundLogWriter(max_size, policy)
+    else:
+        _log_writer.configure(max_size, policy)
+    return _log_writer
 
 
 def make_logger(name, default_settings, level=None,
                 write=None, log_format=None, file_name=None, directory=None, custom_fields_fn=None,
-                logger=None):
-    # log_queue = queue.Queue(-1)  # no limit on size
-    # queue_handler = handlers.QueueHandler(log_queue)
-
+                logger=None, async_logging=None):
     if level is None:
         level = default_settings["level"]
 
     print_handle = logging.StreamHandler()
     print_handle.setLevel(level)
-
-    # listener = handlers.QueueListener(log_queue, print_handle)
+    handlers = [print_handle]
 
     if logger is None:
         logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)
 
-    # logger.addHandler(queue_handler)
+    if async_logging is None:
+        async_logging = default_settings["async_logging"]
 
     if log_format is None:
         log_format = default_settings["log_format"]
@@ -32,7 +195,6 @@ def make_logger(name, default_settings, level=None,
     # give the string format to the logger to use for formatting messages
     formatter = logging.Formatter(log_format)
     print_handle.setFormatter(formatter)
-    logger.addHandler(print_handle)
 
     if custom_fields_fn is None:
         custom_fields_fn = default_settings["custom_fields_fn"]
@@ -70,9 +232,10 @@ def make_logger(name, default_settings, level=None,
     directory = os.path.join(*directory_parts)
 
     # make directory if writing a log, if directory evaluates True, and if the directory doesn't exist
+    made_directory = False
     if write and directory and not os.path.isdir(directory):
         os.makedirs(directory)
-        logger.debug("Creating log directory: %s" % directory)
+        made_directory = True
 
     # if writing a log, initialize the logging file handle
     if write:
@@ -80,9 +243,19 @@ def make_logger(name, default_settings, level=None,
         file_handle = logging.FileHandler(log_path, "w+")
         file_handle.setLevel(logging.DEBUG)
         file_handle.setFormatter(formatter)
-        logger.addHandler(file_handle)
+        handlers.append(file_handle)
+
+    if async_logging:
+        # records are formatted and written on the log writer's thread instead of the event loop's
+        writer = get_log_writer(default_settings["log_queue_size"], default_settings["log_overflow_policy"])
+        logger.addHandler(QueueingHandler(writer, handlers))
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
+    if made_directory:
+        logger.debug("Creating log directory: %s" % directory)
+    if write:
         logger.debug("Logging to: %s" % log_path)
 
-    # listener.start()
     return logger, file_name, directory
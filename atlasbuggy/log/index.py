@@ -0,0 +1,180 @@
+"""
+Time indexes of log files. An index records the byte offset of every stride-th line of a log, and of every stride-th
+line of each node name, so a MappedLog can binary search for a time instead of parsing from the start. Indexes are
+saved next to their log (log_path + index_suffix) and extended when the log grows.
+"""
+
+import os
+import zlib
+import array
+import struct
+import bisect
+
+index_suffix = ".index"
+
+_magic = b"ABLX"
+_version = 1
+_header = struct.Struct("<4sBQQIIH")  # magic, version, indexed end, prefix length, prefix crc, stride, number of names
+_entries_header = struct.Struct("<QdI")  # lines seen, latest timestamp, number of entries
+_name_length = struct.Struct("<H")
+
+_prefix_size = 4096  # bytes at the start of a log checked to tell if the index belongs to it
+
+
+class IndexEntries:
+    """
+    Timestamps, offsets and line numbers of every stride-th line. Timestamps are the latest time up to each line so
+    they can be binary searched even if lines aren't written in order
+    """
+
+    def __init__(self):
+        self.timestamps = array.array("d")
+        self.offsets = array.array("Q")
+        self.line_numbers = array.array("Q")
+        self.num_lines = 0
+        self.latest_time = float("-inf")
+
+    def add(self, stride, offset, timestamp, line_number):
+        if timestamp > self.latest_time:
+            self.latest_time = timestamp
+        if self.num_lines % stride == 0:
+            self.timestamps.append(self.latest_time)
+            self.offsets.append(offset)
+            self.line_numbers.append(line_number)
+        self.num_lines += 1
+
+    def find(self, timestamp):
+        """Offset and line number of an indexed line at or before the first line at timestamp or later"""
+        index = bisect.bisect_left(self.timestamps, timestamp) - 1
+        if index < 0:
+            if len(self.offsets) == 0:
+                return None
+            index = 0
+        return self.offsets[index], self.line_numbers[index]
+
+    def write(self, file):
+        file.write(_entries_header.pack(self.num_lines, self.latest_time, len(self.offsets)))
+        self.timestamps.tofile(file)
+        self.offsets.tofile(file)
+        self.line_numbers.tofile(file)
+
+    @classmethod
+    def read(cls, file):
+        entries = cls()
+        entries.num_lines, entries.latest_time, length = _entries_header.unpack(file.read(_entries_header.size))
+        entries.timestamps.fromfile(file, length)
+        entries.offsets.fromfile(file, length)
+        entries.line_numbers.fromfile(file, length)
+        return entries
+
+
+class LogIndex:
+    """
+    Index of a MappedLog. Use LogIndex.load to read the saved index and add any lines written since it was saved.
+    Offsets point at line headers so parsing can start from them
+    """
+
+    def __init__(self, path, stride=64):
+        self.path = path  # where the index is saved
+        self.stride = stride
+        self.indexed_end = 0  # the log has been indexed up to here
+        self.prefix_length = 0
+        self.prefix_crc = 0
+        self.num_lines = 0
+        self.lines = IndexEntries()
+        self.names = {}  # node name -> IndexEntries
+
+    @classmethod
+    def load(cls, log, path=None, stride=64):
+        """Load log's index, index new lines in the log and save it if anything changed"""
+        if path is None:
+            path = log.path + index_suffix
+
+        index = None
+        if os.path.isfile(path):
+            try:
+                index = cls.read(path)
+            except (OSError, ValueError, EOFError, struct.error):
+                index = None
+            if index is not None and not index.matches(log):
+                index = None
+        if index is None:
+            index = cls(path, stride)
+
+        if index.update(log):
+            index.save()
+        return index
+
+    def matches(self, log):
+        """Whether this index was made from the start of this log"""
+        if log.size < self.indexed_end:
+            return False
+        return zlib.crc32(log.data[:self.prefix_length]) == self.prefix_crc
+
+    def update(self, log):
+        """Index lines past indexed_end. Returns True if there were any"""
+        start = self.indexed_end
+        for offset, end, timestamp, name in log.headers(start):
+            self.lines.add(self.stride, offset, timestamp, self.num_lines)
+            entries = self.names.get(name)
+            if entries is None:
+                entries = self.names[name] = IndexEntries()
+            entries.add(self.stride, offset, timestamp, self.num_lines)
+            self.num_lines += 1
+            self.indexed_end = end
+
+        if self.prefix_length < _prefix_size and self.prefix_length < log.size:
+            self.prefix_length = min(log.size, _prefix_size)
+            self.prefix_crc = zlib.crc32(log.data[:self.prefix_length])
+            return True
+        return self.indexed_end != start
+
+    def find(self, timestamp=None, name=None):
+        """
+        Offset and line number to start parsing from to find the first line at timestamp or later (of this node
+        name if given). None if there are no lines of that name
+        """
+        entries = self.lines if name is None else self.names.get(name)
+        if entries is None:
+            return None
+        if timestamp is None:
+            timestamp = float("-inf")
+        return entries.find(timestamp)
+
+    def save(self):
+        temporary_path = self.path + ".tmp"
+        try:
+            with open(temporary_path, "wb") as file:
+                file.write(_header.pack(_magic, _version, self.indexed_end, self.prefix_length, self.prefix_crc,
+                                        self.stride, len(self.names)))
+                file.write(struct.pack("<Q", self.num_lines))
+                self.lines.write(file)
+                for name, entries in self.names.items():
+                    encoded_name = name.encode()
+                    file.write(_name_length.pack(len(encoded_name)))
+                    file.write(encoded_name)
+                    entries.write(file)
+            os.replace(temporary_path, self.path)
+        except OSError:
+            # the log's directory may not be writable. The index still works, it just isn't saved
+            pass
+
+    @classmethod
+    def read(cls, path):
+        with open(path, "rb") as file:
+            magic, version, indexed_end, prefix_length, prefix_crc, stride, num_names = _header.unpack(
+                file.read(_header.size))
+            if magic != _magic or version != _version:
+                raise ValueError("%s isn't a version %s log index" % (path, _version))
+
+            index = cls(path, stride)
+            index.indexed_end = indexed_end
+            index.prefix_length = prefix_length
+            index.prefix_crc = prefix_crc
+            index.num_lines, = struct.unpack("<Q", file.read(8))
+            index.lines = IndexEntries.read(file)
+            for _ in range(num_names):
+                name_length, = _name_length.unpack(file.read(_name_length.size))
+                name = file.read(name_length).decode()
+                index.names[name] = IndexEntries.read(file)
+        return index
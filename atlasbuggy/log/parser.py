@@ -1,10 +1,24 @@
+import io
+import os
 import re
+import mmap
 import copy
 import time
+import heapq
 import logging
 import datetime
+import operator
+import collections
 
 from . import default
+from .index import LogIndex
+from .session import SessionReader, is_session_file
+
+header_regex = re.compile(
+    r"\[(\w*) @ (\w.*):([0-9]*)\]\[(\w*)\] ([0-9]*)-([0-9]*)-([0-9]*) ([0-9]*):([0-9]*):([0-9]*),([0-9]*): ")
+buffer_regex = re.compile(r"\[(\S*), (\d.*)\]: ")
+
+default_chunk_size = 2 ** 16  # characters read from the log file at a time
 
 
 class Line:
@@ -67,131 +81,350 @@ class Line:
         return copy.copy(self, other)
 
 
-class LogParser:
-    def __init__(self, log_contents: str):
+def _header_line(line_number, match, offset):
+    line = Line()
+    groups = match.groups()
+    line.name = groups[0]
+    line.file_name = groups[1]
+    line.log_level_str = groups[3]
+    line.year, line.month, line.day, line.hour, line.minute, line.second, line.microsecond = map(int, groups[4:])
 
-        regex = r"\[(\w*) @ (\w.*):([0-9]*)\]\[(\w*)\] ([0-9]*)-([0-9]*)-([0-9]*) ([0-9]*):([0-9]*):([0-9]*),([0-9]*): "
-        self.buffer_regex = r"\[(\S*), (\d.*)\]: "
+    line.header_start = offset + match.start()
+    line.header_end = offset + match.end()
+    line.log_level = logging.getLevelName(line.log_level_str)
+    line.line_number = line_number
+    line.full = match.group()
 
-        self.matches = re.finditer(regex, log_contents)
-        self.lines = []
-        self.start_time = None
-        self.current_index = 0
-
-        self._resort_by_time = False
-
-        for match_num, match in enumerate(self.matches):
-            line = self.parse_line(match_num, match)
-            self.lines.append(line)
-
-        all_buffer_lines = []
-        extracted_lines = []
-        for index in range(0, len(self.lines) - 1):
-            buffer_lines = self.extract_message(
-                log_contents, self.lines[index],
-                self.lines[index].header_end,
-                self.lines[index + 1].header_start - 1
-            )
-            if len(buffer_lines) > 0:
-                all_buffer_lines.extend(buffer_lines)
-            else:
-                extracted_lines.append(self.lines[index])
-        self.lines = extracted_lines
-
-        buffer_lines = self.extract_message(
-            log_contents, self.lines[-1],
-            self.lines[-1].header_end,
-            len(log_contents) - 1
-        )
-        if len(buffer_lines):
-            all_buffer_lines.extend(buffer_lines)
+    return line
 
-        self.lines.extend(all_buffer_lines)
 
-        if self._resort_by_time:
-            self.sort()
+def _buffer_line(line, match, offset):
+    buffer_line = copy.copy(line)
 
-    def parse_line(self, match_num, match):
-        line = Line()
-        for group_num in range(len(match.groups())):
-            # using the default value for the line attribute, convert the matched group to the correct type
-            line[group_num] = type(line[group_num])(match.group(group_num + 1))
+    buffer_line.log_level_str = match.group(1)
+    buffer_line.log_level = logging.getLevelName(match.group(1))
+    buffer_line.timestamp = float(match.group(2))
 
-        line.header_start = match.start()
-        line.header_end = match.end()
-        line.log_level = logging.getLevelName(line.log_level_str)
-        line.line_number = match_num
-        line.full = match.group()
+    date = datetime.datetime.fromtimestamp(buffer_line.timestamp)
 
-        return line
+    buffer_line.year = date.year
+    buffer_line.month = date.month
+    buffer_line.day = date.day
+    buffer_line.hour = date.hour
+    buffer_line.minute = date.minute
+    buffer_line.second = date.second
+    buffer_line.microsecond = date.microsecond
 
-    def parse_buffer_line(self, line, match):
-        buffer_line = copy.copy(line)
+    buffer_line.header_start = offset + match.start()
+    buffer_line.header_end = offset + match.end()
+    buffer_line.full = match.group()
 
-        buffer_line.log_level_str = match.group(1)
-        buffer_line.log_level = logging.getLevelName(match.group(1))
-        buffer_line.timestamp = float(match.group(2))
+    buffer_line.is_part_of_buffer = True
 
-        date = datetime.datetime.fromtimestamp(buffer_line.timestamp)
+    return buffer_line
 
-        buffer_line.year = date.year
-        buffer_line.month = date.month
-        buffer_line.day = date.day
-        buffer_line.hour = date.hour
-        buffer_line.minute = date.minute
-        buffer_line.second = date.second
-        buffer_line.microsecond = date.microsecond
 
-        buffer_line.header_start = match.start()
-        buffer_line.header_end = match.end()
-        buffer_line.full = match.group()
+def _strip_newline(message):
+    if message.endswith("\n"):
+        return message[:-1]
+    return message
 
-        buffer_line.is_part_of_buffer = True
 
-        return buffer_line
+def _finish_line(line, message):
+    """Give a line its message. A dumped log buffer becomes one line per buffered entry. Returns the lines"""
+    line.calculate_timestamp()
+    line.message = message
 
-    def extract_buffer_message(self, buffer_contents, buffer_line, start_index, end_index):
-        message = buffer_contents[start_index: end_index]
-        buffer_line.message = message
-        buffer_line.full += message
+    if message.startswith(default.log_buffer_start):
+        body = message[len(default.log_buffer_start):]
+        if body.endswith(default.log_buffer_end):
+            body = body[:-len(default.log_buffer_end)]
+        body_offset = line.header_end + len(default.log_buffer_start)
 
-    def extract_message(self, log_contents, line, start_index, end_index):
-        message = log_contents[start_index: end_index]
-        line.calculate_timestamp()
-        if self.start_time is None:
-            self.start_time = line.timestamp
-        line.message = message
+        matches = list(buffer_regex.finditer(body))
+        if len(matches) > 0:
+            buffer_lines = []
+            for index, match in enumerate(matches):
+                end = matches[index + 1].start() if index + 1 < len(matches) else len(body)
+                buffer_line = _buffer_line(line, match, body_offset)
+                buffer_line.message = _strip_newline(body[match.end():end])
+                buffer_line.full += buffer_line.message
+                buffer_lines.append(buffer_line)
+            return buffer_lines
+
+    line.full += message
+    return (line,)
+
+
+def iter_lines(log_file, chunk_size=default_chunk_size):
+    """
+    Parse a log file object chunk by chunk, yielding Lines in the order they were written. Only the line being
+    parsed is kept in memory. A line's message runs until the next header, so each line is yielded once the header
+    after it is read. Headers are only searched for in complete lines of text so one split between chunks is found
+    when the rest of it arrives. Entries of dumped log buffers are yielded in place of the line containing them.
+    header_start and header_end are positions in the file
+    """
+    text = ""
+    offset = 0  # position of text[0] in the file
+    searched = 0  # text before this has been searched for headers
+    pending = None  # the last header found. Its message isn't complete until the next header is found
+    line_number = 0
+
+    while True:
+        chunk = log_file.read(chunk_size)
+        if chunk:
+            text += chunk
+            end = text.rfind("\n", searched) + 1
+            if end == 0:
+                continue
+        else:
+            end = len(text)
+
+        for match in header_regex.finditer(text, searched, end):
+            if pending is not None:
+                yield from _finish_line(pending, _strip_newline(text[pending.header_end - offset: match.start()]))
+            pending = _header_line(line_number, match, offset)
+            line_number += 1
+        searched = end
+
+        if not chunk:
+            break
+
+        # drop the text of finished lines
+        keep = searched if pending is None else pending.header_start - offset
+        if keep > 0:
+            text = text[keep:]
+            offset += keep
+            searched -= keep
+
+    if pending is not None:
+        yield from _finish_line(pending, _strip_newline(text[pending.header_end - offset:]))
+
+
+class LineRecord:
+    """
+    A line of a MappedLog. Only positions in the file are stored. name, message and full are decoded from the file
+    when they're accessed so they aren't kept in memory
+    """
+    __slots__ = ("log", "line_number", "header_start", "header_end", "end", "timestamp", "name_id", "level_id",
+                 "is_part_of_buffer")
+
+    @property
+    def name(self):
+        return self.log.names[self.name_id]
+
+    @property
+    def log_level_str(self):
+        return self.log.levels[self.level_id]
+
+    @property
+    def log_level(self):
+        return self.log.level_numbers[self.level_id]
+
+    @property
+    def message(self):
+        return self.log.text(self.header_end, self.end)
+
+    @property
+    def full(self):
+        return self.log.text(self.header_start, self.end)
+
+    def __str__(self):
+        return self.full
+
+
+_header_bytes_regex = re.compile(header_regex.pattern.encode())
+_buffer_bytes_regex = re.compile(buffer_regex.pattern.encode())
+_buffer_start_bytes = default.log_buffer_start.encode()
+_buffer_end_bytes = default.log_buffer_end.encode()
+
+
+class MappedLog:
+    """
+    A log file mapped into memory. Iterating over it parses it in place and yields a LineRecord for each line, so
+    opening a log costs almost nothing and the text is only read from the OS's page cache. Lines come in the order
+    they were written with buffered entries in place of their dumped buffer like iter_lines. Records can't be
+    decoded after the log is closed. Positions are in bytes. lines() starts from any time using the log's index
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._map = b""  # empty files can't be mapped
+
+        # names and levels are stored once and referred to by index
+        self.names = []
+        self.levels = []
+        self.level_numbers = []
+        self._name_ids = {}
+        self._level_ids = {}
+
+        # lines are logged many times per second so the time of the last second is reused
+        self._second_key = None
+        self._second_time = 0.0
+
+        self._index = None
+
+    @property
+    def data(self):
+        return self._map
+
+    @property
+    def size(self):
+        return len(self._map)
+
+    @property
+    def index(self):
+        """The log's LogIndex. It's loaded (or made) the first time it's used"""
+        if self._index is None:
+            self._index = LogIndex.load(self)
+        return self._index
+
+    def text(self, start, end):
+        return self._map[start:end].decode(errors="replace")
+
+    def _name_id(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(name.decode())
+            self._name_ids[name] = name_id
+        return name_id
+
+    def _level_id(self, level):
+        level_id = self._level_ids.get(level)
+        if level_id is None:
+            level_id = len(self.levels)
+            self.levels.append(level.decode())
+            self.level_numbers.append(logging.getLevelName(self.levels[-1]))
+            self._level_ids[level] = level_id
+        return level_id
+
+    def _header_record(self, line_number, match):
+        record = LineRecord()
+        record.log = self
+        record.line_number = line_number
+        record.header_start = match.start()
+        record.header_end = match.end()
+        record.name_id = self._name_id(match.group(1))
+        record.level_id = self._level_id(match.group(4))
+        record.is_part_of_buffer = False
+        record.timestamp = self._timestamp(match)
+        return record
+
+    def _timestamp(self, match):
+        second_key = match.group(5, 6, 7, 8, 9, 10)
+        if second_key != self._second_key:
+            self._second_key = second_key
+            self._second_time = time.mktime(datetime.datetime(*map(int, second_key)).timetuple())
+        return self._second_time + int(match.group(11)) / 1e3
+
+    def headers(self, start=0):
+        """Offset, end, timestamp and name of each line's header after start. Faster than parsing whole lines"""
+        for match in _header_bytes_regex.finditer(self._map, start):
+            yield match.start(), match.end(), self._timestamp(match), match.group(1).decode()
+
+    def _end_of(self, start, end):
+        """Where the message between start and end ends without its newline"""
+        if end > start and self._map[end - 1] == ord("\n"):
+            return end - 1
+        return end
+
+    def _finish_record(self, record, end):
+        data = self._map
+        record.end = self._end_of(record.header_end, end)
+
+        body_start = record.header_end + len(_buffer_start_bytes)
+        if data[record.header_end: body_start] != _buffer_start_bytes:
+            return (record,)
+
+        body_end = record.end
+        if data[body_end - len(_buffer_end_bytes): body_end] == _buffer_end_bytes:
+            body_end -= len(_buffer_end_bytes)
+
+        matches = list(_buffer_bytes_regex.finditer(data, body_start, body_end))
+        if len(matches) == 0:
+            return (record,)
+
+        buffer_records = []
+        for index, match in enumerate(matches):
+            buffer_record = LineRecord()
+            buffer_record.log = self
+            buffer_record.line_number = record.line_number
+            buffer_record.header_start = match.start()
+            buffer_record.header_end = match.end()
+            buffer_record.end = self._end_of(
+                match.end(), matches[index + 1].start() if index + 1 < len(matches) else body_end)
+            buffer_record.timestamp = float(match.group(2))
+            buffer_record.name_id = record.name_id
+            buffer_record.level_id = self._level_id(match.group(1))
+            buffer_record.is_part_of_buffer = True
+            buffer_records.append(buffer_record)
+        return buffer_records
+
+    def _records(self, start=0, line_number=0):
+        """Parse lines starting at the header at start. line_number is that line's number"""
+        pending = None
+        for match in _header_bytes_regex.finditer(self._map, start):
+            if pending is not None:
+                yield from self._finish_record(pending, match.start())
+            pending = self._header_record(line_number, match)
+            line_number += 1
+
+        if pending is not None:
+            yield from self._finish_record(pending, len(self._map))
 
-        buffer_lines = []
-        if default.log_buffer_start in message:
-            message = message[len(default.log_buffer_start):]
-            self._resort_by_time = True
+    def __iter__(self):
+        return self._records()
+
+    def lines(self, start_time=None, end_time=None, name=None):
+        """
+        Lines with start_time <= timestamp <= end_time, optionally only those of one node name. Parsing starts near
+        start_time or the first line of name by binary searching the index instead of at the start of the log
+        """
+        if start_time is None and name is None:
+            records = self._records()
+        else:
+            position = self.index.find(start_time, name)
+            if position is None:
+                return
+            records = self._records(*position)
+
+        for record in records:
+            if end_time is not None and record.timestamp > end_time and not record.is_part_of_buffer:
+                return
+            if start_time is not None and record.timestamp < start_time:
+                continue
+            if name is not None and self.names[record.name_id] != name:
+                continue
+            yield record
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
 
-            buffer_matches = re.finditer(self.buffer_regex, message)
 
-            for match in buffer_matches:
-                buffer_line = self.parse_buffer_line(line, match)
+class LogParser:
+    def __init__(self, log_contents: str):
+        self.lines = []
+        self.start_time = None
+        self.current_index = 0
 
-                buffer_lines.append(buffer_line)
+        self._resort_by_time = False
 
-            for index in range(len(buffer_lines) - 1):
-                self.extract_buffer_message(
-                    message,
-                    buffer_lines[index],
-                    buffer_lines[index].header_end,
-                    buffer_lines[index + 1].header_start - 1
-                )
-
-            self.extract_buffer_message(
-                message,
-                buffer_lines[-1],
-                buffer_lines[-1].header_end,
-                len(message) - 1
-            )
-        else:
-            line.full += message
+        for line in iter_lines(io.StringIO(log_contents), max(len(log_contents), 1)):
+            if self.start_time is None:
+                self.start_time = line.timestamp
+            if line.is_part_of_buffer:
+                self._resort_by_time = True
+            self.lines.append(line)
 
-        return buffer_lines
+        if self._resort_by_time:
+            self.sort()
 
     def append_log(self, parser, sort=True):
         if parser is not None:
@@ -237,3 +470,115 @@ class LogParser:
             return next_t - current_t
         else:
             return 0
+
+
+class LogStream:
+    """
+    Iterates over the lines of one or more log files while they're being parsed instead of after loading them. Each
+    file is read default_chunk_size characters at a time so memory doesn't grow with the file size. If mapped is True,
+    paths are opened as MappedLogs and LineRecords are yielded instead. Session files (see log.session) yield their
+    SessionRecords whether or not mapped is True. sources limits them to the records of those node names. Lines of multiple files are merged by
+    timestamp. log_files are paths or open text files. Has the same timing methods as LogParser. Buffered log entries
+    are yielded where their buffer was dumped instead of being sorted into the rest of the log
+    """
+
+    def __init__(self, *log_files, chunk_size=default_chunk_size, mapped=False, sources=None):
+        if len(log_files) == 0:
+            raise ValueError("No log files given!!")
+
+        self._opened_files = []
+        self._mapped_logs = []
+        streams = []
+        for log_file in log_files:
+            if isinstance(log_file, str) and is_session_file(log_file):
+                log_file = SessionReader(log_file, sources)
+                self._opened_files.append(log_file)
+                streams.append(iter(log_file))
+                continue
+            if isinstance(log_file, str) and mapped:
+                log_file = MappedLog(log_file)
+                self._opened_files.append(log_file)
+            if isinstance(log_file, MappedLog):
+                self._mapped_logs.append(log_file)
+                streams.append(iter(log_file))
+                continue
+            if isinstance(log_file, str):
+                log_file = open(log_file)
+                self._opened_files.append(log_file)
+            streams.append(iter_lines(log_file, chunk_size))
+        self._num_logs = len(streams)
+
+        self._lines = self._merge(streams)
+        self._upcoming = collections.deque()  # lines read ahead of the current line
+        self.current_line = None
+        self.current_index = 0  # number of lines returned so far
+
+        first_line = self._peek()
+        self.start_time = None if first_line is None else first_line.timestamp
+
+    @staticmethod
+    def _merge(streams):
+        if len(streams) == 1:
+            return streams[0]
+        return heapq.merge(*streams, key=operator.attrgetter("timestamp"))
+
+    def seek(self, start=None, end=None):
+        """
+        Continue from the first line start seconds after the log's first line and stop after end seconds. Either
+        can be None. Only mapped logs can seek. Their indexes are used so it doesn't matter how far into the log it is
+        """
+        if len(self._mapped_logs) != self._num_logs:
+            raise ValueError("Only mapped logs can seek. Open the logs with mapped=True")
+        if self.start_time is None:
+            return
+
+        start_time = None if start is None else self.start_time + start
+        end_time = None if end is None else self.start_time + end
+        self._lines = self._merge([log.lines(start_time, end_time) for log in self._mapped_logs])
+        self._upcoming.clear()
+        self.current_line = None
+
+    def _peek(self):
+        if len(self._upcoming) == 0:
+            line = next(self._lines, None)
+            if line is None:
+                return None
+            self._upcoming.append(line)
+        return self._upcoming[0]
+
+    def __next__(self):
+        if self._peek() is None:
+            self.close()
+            raise StopIteration
+
+        self.current_line = self._upcoming.popleft()
+        self.current_index += 1
+        return self.current_line
+
+    def __iter__(self):
+        return self
+
+    def skip(self):
+        """Return the current line again on the next iteration"""
+        if self.current_line is not None:
+            self._upcoming.appendleft(self.current_line)
+            self.current_index -= 1
+
+    def current_time(self):
+        line = self._peek()
+        if line is None:
+            line = self.current_line
+        if line is None:
+            return 0.0
+        return line.timestamp - self.start_time
+
+    def delta_t(self):
+        next_line = self._peek()
+        if self.current_line is None or next_line is None:
+            return 0
+        return next_line.timestamp - self.current_line.timestamp
+
+    def close(self):
+        for log_file in self._opened_files:
+            log_file.close()
+        self._opened_files = []
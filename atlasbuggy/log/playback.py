@@ -1,38 +1,37 @@
 import os
-import time
 import inspect
 import asyncio
 
 from ..node import Node
-from .parser import LogParser
+from .parser import LogStream
+from .session import SessionRecord
 from ..message import Message
 
 
 class PlaybackNode(Node):
     def __init__(self, *file_names, directory=None, update_rate=None, enabled=True, logger=None, name=None, message_class=None,
-                 message_parse_fn=None, parse_field_fn=None):
+                 message_parse_fn=None, parse_field_fn=None, mapped=False, time_range=None, sources=None):
         self.set_logger(write=False,
                         log_format="[Playback Node][%(name)s][%(levelname)s] %(asctime)s: %(message)s")
         super(PlaybackNode, self).__init__(enabled, name, logger)
 
         self.update_rate = update_rate
 
-        self.parser = None
         if len(file_names) == 0:
             raise ValueError("No file names given!!")
-        for file_name in file_names:
-            if directory is not None:
-                path = os.path.join(directory, file_name)
-            else:
-                path = file_name
-            with open(path) as log_file:
-                new_parser = LogParser(log_file.read())
-            if self.parser is None:
-                self.parser = new_parser
-            else:
-                self.parser.append_log(new_parser)
+        if directory is not None:
+            file_names = [os.path.join(directory, file_name) for file_name in file_names]
 
-        self.logger.info("Found %s lines in directory: %s, files: %s" % (len(self.parser.lines), directory, file_names))
+        # lines are parsed as they're played back so large logs start right away. Mapped logs yield LineRecords
+        # time_range is (start, end) in seconds from the start of the log. Either can be None. It needs mapped logs
+        # sources picks which nodes' messages to play from session files
+        if time_range is not None:
+            mapped = True
+        self.parser = LogStream(*file_names, mapped=mapped, sources=sources)
+        if time_range is not None:
+            self.parser.seek(*time_range)
+
+        self.logger.info("Streaming lines from directory: %s, files: %s" % (directory, file_names))
 
         self.message_class = message_class
         if message_class is not None:
@@ -47,19 +46,21 @@ class PlaybackNode(Node):
 
     @asyncio.coroutine
     def loop(self):
-        self.start_time = time.time()
+        # if the log was seeked into, start playing from there instead of waiting until then
+        self.start_time = self.clock.time() - self.current_time()
 
         for line in self.parser:
             if self.update_rate is None:
-                parser_time = time.time() - self.start_time
-                if parser_time > self.current_time():
-                    yield from self.parse(line)
-                else:
-                    yield from asyncio.sleep(0.0)
-                    self.parser.skip()
+                # sleep until the line is due instead of checking the time on every pass of the event loop
+                parser_time = self.clock.time() - self.start_time
+                wait_time = self.current_time() - parser_time
+                if wait_time > 0.0:
+                    yield from asyncio.sleep(wait_time)
+                yield from self.parse(line)
             else:
                 yield from self.parse(line)
                 yield from asyncio.sleep(self.update_rate)
+        self.parser.close()
         self.logger.info("Playback node complete.")
         yield from self.completed()
 
@@ -72,6 +73,14 @@ class PlaybackNode(Node):
         if self.message_parse_fn is not None:
             yield from self.message_parse_fn(line)
 
+        elif isinstance(line, SessionRecord):
+            # session files store the messages themselves so there's nothing to parse
+            message = line.message
+            if self.message_class is None or isinstance(message, self.message_class):
+                yield from self.broadcast(message)
+            else:
+                yield from asyncio.sleep(0.0)
+
         elif self.is_type_message:
             message = self.message_class.parse(line.message)
 
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import collections
+
+from .. import codec
+from ..node import Node
+from .session import SessionWriter, default_sync_interval
+
+
+class BackgroundSessionWriter:
+    """
+    Writes messages to a session file on a background thread so recording doesn't block the event loop. Messages are
+    encoded when they're put (later changes to them aren't recorded) and written in batches. When max_size messages
+    are waiting, the policy decides what happens:
+        drop_oldest - discard the oldest waiting message
+        drop_newest - discard the new message
+        block - wait for the writer to catch up. Don't block on an event loop's thread: it stalls every node
+    Discarded messages are counted in num_dropped. If writing fails, the error is stored in error and put raises
+    RuntimeError
+    """
+
+    policies = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, path, sync_interval=default_sync_interval, max_size=10000, policy="drop_oldest"):
+        if policy not in self.policies:
+            raise ValueError("Recorder overflow policy '%s' isn't one of %s" % (policy, self.policies))
+        self.max_size = max_size
+        self.policy = policy
+        self.num_dropped = 0
+        self.error = None  # the exception that stopped the writer thread
+
+        self.writer = SessionWriter(path, sync_interval)  # opened here so a bad path raises right away
+
+        self._records = collections.deque()
+        self._num_pending = 0  # messages that were put but aren't written yet
+        self._closed = False
+        self._condition = threading.Condition(threading.Lock())
+        self._thread = threading.Thread(target=self._run, name="session writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self):
+        return self.writer.path
+
+    @property
+    def num_records(self):
+        return self.writer.num_records
+
+    def put(self, message, source=""):
+        if self.error is not None:
+            raise RuntimeError("Recording to '%s' failed: %s" % (self.path, self.error))
+        record = (message.timestamp, codec.dumps(message), source)
+
+        with self._condition:
+            if self.max_size > 0 and len(self._records) >= self.max_size:
+                if self.policy == "drop_newest":
+                    self.num_dropped += 1
+                    return
+                elif self.policy == "drop_oldest":
+                    self._records.popleft()
+                    self._num_pending -= 1
+                    self.num_dropped += 1
+                else:
+                    while len(self._records) >= self.max_size and self.error is None:
+                        self._condition.wait()
+
+            self._records.append(record)
+            self._num_pending += 1
+            if len(self._records) == 1:
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every message put so far is written"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._num_pending == 0 or self.error is not None, timeout)
+
+    def close(self):
+        """Write the remaining messages and close the file. Blocks until they're written"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.writer.close()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while len(self._records) == 0 and not self._closed:
+                    self._condition.wait()
+                if len(self._records) == 0:
+                    return
+                batch = self._records
+                self._records = collections.deque()
+                self._condition.notify_all()
+
+            try:
+                for timestamp, payload, source in batch:
+                    self.writer.write_payload(timestamp, payload, source)
+                self.writer.flush()
+            except Exception as error:
+                self.error = error
+
+            with self._condition:
+                self._num_pending -= len(batch)
+                self._condition.notify_all()
+            if self.error is not None:
+                return
+
+
+class RecorderNode(Node):
+    """
+    Records every message its producers broadcast to a binary session file. Play it back by giving the file to a
+    PlaybackNode. Subscribe it to a producer with the tag from record:
+
+        orchestrator.subscribe(imu, recorder, recorder.record(imu))
+
+    Messages are written on a background thread. See BackgroundSessionWriter for queue_size and queue_policy. If
+    writing fails, the error is logged and the rest of the messages aren't recorded
+    """
+
+    def __init__(self, path, enabled=True, name=None, logger=None, sync_interval=default_sync_interval,
+                 queue_size=10000, queue_policy="drop_oldest"):
+        super(RecorderNode, self).__init__(enabled, name, logger)
+        self.path = path
+        self.sync_interval = sync_interval
+        self.queue_size = queue_size
+        self.queue_policy = queue_policy
+        self.writer = None
+        self.stopped = False  # writing failed
+
+    def record(self, producer, service="default"):
+        """Define a subscription recording producer's messages. Returns its tag"""
+        tag = "record %s %s" % (producer.name, service)
+        self.define_subscription(tag, service=service, callback=self.write, callback_args=(producer.name,))
+        return tag
+
+    def write(self, message, source=""):
+        if self.writer is None:
+            self.writer = BackgroundSessionWriter(self.path, self.sync_interval, self.queue_size, self.queue_policy)
+        elif self.stopped:
+            return
+        try:
+            self.writer.put(message, source)
+        except RuntimeError as error:
+            self.logger.error("%s. Recording stopped" % error)
+            self.stopped = True
+
+    @asyncio.coroutine
+    def teardown(self):
+        if self.writer is not None:
+            yield from self.event_loop.run_in_executor(None, self.writer.close)
+            self.logger.info("Recorded %s messages to %s" % (self.writer.num_records, self.path))
+            if self.writer.num_dropped > 0:
+                self.logger.warning("%s messages weren't recorded because the recorder's queue was full" %
+                                    self.writer.num_dropped)
+            if self.writer.error is not None and not self.stopped:
+                self.logger.error("Recording stopped early: %s" % self.writer.error)
@@ -0,0 +1,195 @@
+"""
+Binary session logs. Messages are recorded as they are instead of being formatted into text and parsed with regexes
+later. A session file is a header followed by records:
+
+    kind (1 byte), timestamp (8), source ID (2), message type ID (2), payload length (4), CRC32 (4), payload
+
+Record payloads are messages encoded with codec.dumps, so registered message classes are written in their compact
+binary form and anything else is pickled. Source records map source IDs to node names. The file is only appended to.
+Every sync_interval bytes the writer adds a sync marker and repeats the source records, so after a crash or a
+corrupted record, reading continues from the next sync marker.
+"""
+
+import os
+import mmap
+import zlib
+import struct
+
+from .. import codec
+
+file_magic = b"ABSESS"
+file_version = 1
+file_header = struct.Struct("<6sB")  # magic, version
+record_header = struct.Struct("<BdHHII")  # kind, timestamp, source ID, message type ID, payload length, CRC32
+_record_fields = struct.Struct("<BdHHI")  # the header without its CRC
+_crc_field = struct.Struct("<I")
+sync_marker = b"\xa5\x5a\xc3SYNC\x3c"
+
+RECORD = 1
+SOURCE = 2
+
+default_sync_interval = 2 ** 16  # bytes between sync markers
+
+
+def is_session_file(path):
+    with open(path, "rb") as file:
+        return file.read(len(file_magic)) == file_magic
+
+
+def _crc(header, payload):
+    """CRC of the header (without the CRC field) and the payload"""
+    return zlib.crc32(payload, zlib.crc32(header[:record_header.size - 4]))
+
+
+class SessionWriter:
+    """
+    Appends messages to a session file. Sources are node names. Writes are buffered. Call flush to make sure
+    records are on disk and close when done
+    """
+
+    def __init__(self, path, sync_interval=default_sync_interval):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.sources = {}  # node name -> source ID
+        self.num_records = 0
+
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(file_header.pack(file_magic, file_version))
+        elif not is_session_file(path):
+            self._file.close()
+            raise ValueError("Can't append to '%s'. It isn't a session file" % path)
+        self._position = self._file.tell()
+        self._next_sync = 0
+        self._sync()  # the end of the file may be a torn record from a crash. Start over after a sync marker
+
+    def _write_record(self, kind, timestamp, source_id, type_id, payload):
+        fields = _record_fields.pack(kind, timestamp, source_id, type_id, len(payload))
+        self._file.write(fields + _crc_field.pack(zlib.crc32(payload, zlib.crc32(fields))) + payload)
+        self._position += record_header.size + len(payload)
+
+    def _write_source(self, name, source_id):
+        self._write_record(SOURCE, 0.0, source_id, 0, name.encode())
+
+    def _sync(self):
+        self._file.write(sync_marker)
+        self._position += len(sync_marker)
+        for name, source_id in self.sources.items():
+            self._write_source(name, source_id)
+        self._next_sync = self._position + self.sync_interval
+
+    def source_id(self, source):
+        source_id = self.sources.get(source)
+        if source_id is None:
+            source_id = len(self.sources)
+            if source_id >= 2 ** 16:
+                raise ValueError("Sessions are limited to %s sources" % 2 ** 16)
+            self.sources[source] = source_id
+            self._write_source(source, source_id)
+        return source_id
+
+    def write(self, message, source=""):
+        """Record a message from the node named source"""
+        self.write_payload(message.timestamp, codec.dumps(message), source)
+
+    def write_payload(self, timestamp, payload, source=""):
+        """Record a message that's already encoded with codec.dumps"""
+        source_id = self.source_id(source)
+        type_id, version = codec.header.unpack_from(payload)
+        self._write_record(RECORD, timestamp, source_id, type_id, payload)
+        self.num_records += 1
+
+        if self._position >= self._next_sync:
+            self._sync()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class SessionRecord:
+    """A message from a session file. The message is decoded when it's first accessed"""
+    __slots__ = ("reader", "timestamp", "source_id", "type_id", "payload", "_message")
+
+    def __init__(self, reader, timestamp, source_id, type_id, payload):
+        self.reader = reader
+        self.timestamp = timestamp
+        self.source_id = source_id
+        self.type_id = type_id
+        self.payload = payload
+        self._message = None
+
+    @property
+    def source(self):
+        return self.reader.sources.get(self.source_id, "source %s" % self.source_id)
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = codec.loads(self.payload)
+        return self._message
+
+    def __str__(self):
+        return "[%s] %s" % (self.source, self.message)
+
+
+class SessionReader:
+    """
+    Reads records from a session file in the order they were written. The file is memory mapped. Records that
+    are cut off or fail their CRC are skipped up to the next sync marker and counted in num_corrupted. Message classes
+    need to be registered with the codec under the same type IDs as when the session was recorded
+    """
+
+    def __init__(self, path, sources=None):
+        self.path = path
+        self.sources = {}  # source ID -> node name
+        self.num_corrupted = 0
+        self.source_names = None if sources is None else set(sources)  # only read records of these nodes
+
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._map = b""
+        if self._map[:len(file_magic)] != file_magic:
+            self.close()
+            raise ValueError("'%s' isn't a session file" % path)
+
+    def __iter__(self):
+        data = self._map
+        size = len(data)
+        offset = file_header.size
+        source_names = self.source_names
+
+        while offset < size:
+            if data[offset: offset + len(sync_marker)] == sync_marker:
+                offset += len(sync_marker)
+                continue
+
+            start = offset + record_header.size
+            if start <= size:
+                kind, timestamp, source_id, type_id, length, crc = record_header.unpack_from(data, offset)
+                end = start + length
+                payload = data[start:end]
+            if (start > size or end > size or kind not in (RECORD, SOURCE) or
+                    _crc(data[offset:start], payload) != crc):
+                # a torn or corrupted record. Skip to the next sync marker
+                self.num_corrupted += 1
+                offset = data.find(sync_marker, offset + 1)
+                if offset == -1:
+                    return
+                continue
+
+            offset = end
+            if kind == SOURCE:
+                self.sources[source_id] = payload.decode()
+            elif source_names is None or self.sources.get(source_id) in source_names:
+                yield SessionRecord(self, timestamp, source_id, type_id, payload)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
@@ -1,7 +1,114 @@
 import re
 import copy
-import time
 import inspect
+import operator
+
+from .clock import active_clock
+
+# stamped on broadcast messages when latency tracing is on (see atlasbuggy.tracing). Messages copied, decoded or
+# made from a batch start without a trace
+trace_attributes = ("trace_broadcast", "trace_origin")
+
+
+def _values_equal(value, other_value):
+    """Equality that also works for numpy arrays (same shape and equal element-wise)"""
+    if value is other_value:
+        return True
+    if getattr(value, "shape", None) != getattr(other_value, "shape", None):
+        return False
+    result = value == other_value
+    if isinstance(result, bool) or not hasattr(result, "all"):
+        return bool(result)
+    return bool(result.all())
+
+
+def _properties_equal(properties, other_properties):
+    """Compare dicts or tuples of property values"""
+    try:
+        if properties == other_properties:
+            return True
+    except (ValueError, DeprecationWarning):  # "truth value of an array is ambiguous" (a warning if it's empty)
+        pass
+
+    # compare values one by one. Arrays with fewer than two elements don't raise above but may still be equal
+    if isinstance(properties, dict):
+        if properties.keys() != other_properties.keys():
+            return False
+        return all(_values_equal(value, other_properties[name]) for name, value in properties.items())
+    if len(properties) != len(other_properties):
+        return False
+    return all(_values_equal(value, other_value) for value, other_value in zip(properties, other_properties))
+
+
+class MessageMetadata:
+    """
+    Computed once per Message class: the init signature check, the compiled message_regex and, for auto serialized
+    classes, the field list with a format string, value getter and parse function generated for those fields
+    """
+
+    def __init__(self):
+        self.init_checked = False
+        self.regex = None
+        self.pattern = None
+        self.fields = None  # names of the auto serialized properties in serialization (alphabetical) order
+        self.str_format = None  # str_serialization with the class and field names filled in
+        self.get_values = None  # message -> (n, timestamp, *field values)
+        self.parser = None  # line -> message or None
+
+    def check_init(self, message):
+        if not message.check_init_signature:
+            self.init_checked = True
+            return
+        init_signature = tuple(inspect.signature(message.__init__).parameters.keys())
+        if init_signature != ("n", "timestamp"):
+            raise ValueError("Message classes must have init parameters (n, timestamp=None)! "
+                             "This message has the signature: %s" % str(init_signature))
+        self.init_checked = True
+
+    def compile(self, regex):
+        """Compile message_regex, recompiling only if the class's regex was changed"""
+        if regex != self.regex:
+            self.pattern = re.compile(regex)
+            self.regex = regex
+        return self.pattern
+
+    def set_fields(self, message_class, fields, data_types, keyword_init=False):
+        """
+        Generate the serialization of these fields for message_class (after its message_regex is set).
+        If keyword_init is True, parsed fields are passed to __init__ as keywords instead of set afterwards
+        """
+        self.fields = tuple(fields)
+        self.str_format = "%s(n=%%s, t=%%s%s)" % (
+            message_class.__name__, "".join(", %s='%%s'" % name for name in fields))
+        self.get_values = operator.attrgetter("n", "timestamp", *fields)
+
+        # regex groups are n, t, then a name and a value group for each field
+        values = []
+        for index, (name, data_type) in enumerate(zip(fields, data_types)):
+            group = "groups[%s]" % (3 + 2 * index)
+            if data_type in (int, float):
+                values.append("%s(%s)" % (data_type.__name__, group))
+            elif data_type == str:
+                values.append(group)
+            else:
+                values.append("cls.parse_field(%r, %s)" % (name, group))
+
+        lines = ["def parse(line):",
+                 "    match = match_line(line)",
+                 "    if match is None:",
+                 "        return None",
+                 "    groups = match.groups()"]
+        if keyword_init:
+            lines.append("    return cls(int(groups[0]), float(groups[1])%s)" % "".join(
+                ", %s=%s" % (name, value) for name, value in zip(fields, values)))
+        else:
+            lines.append("    message = cls(int(groups[0]), float(groups[1]))")
+            lines.extend("    message.%s = %s" % (name, value) for name, value in zip(fields, values))
+            lines.append("    return message")
+
+        parser_globals = {"cls": message_class, "match_line": self.compile(message_class.message_regex).match}
+        exec("\n".join(lines) + "\n", parser_globals)
+        self.parser = parser_globals["parse"]
 
 
 class Message:
@@ -11,40 +118,83 @@ class Message:
     float_regex = r"([-+]?(?:(?:\d*\.\d+)|(?:\d+\.?))(?:[Ee][+-]?\d+)?)"
     int_regex = r"([-+]?[0-9]+)"
     str_regex = r"\'(.*?)\'"
+    is_auto_serialized = False  # class Name(Message, auto_serialize=True) serializes every property. See auto_serialize
+    frozen = False  # see freeze
+    check_init_signature = True  # classes with their own parse that are never made with cls(n, timestamp) can opt out
 
     def __init__(self, n, timestamp=None):
         if timestamp is None:
-            self.timestamp = time.time()
+            self.timestamp = active_clock().time()  # virtual time when replaying or simulating
         else:
             self.timestamp = timestamp
         self.n = n
-        self.is_auto_serialized = False
 
-        init_signature = tuple(inspect.signature(self.__init__).parameters.keys())
-        if init_signature != ("n", "timestamp"):
-            raise ValueError("Message classes must have init parameters (n, timestamp=None)! "
-                             "This message has the signature: %s" % str(init_signature))
+        metadata = self._get_metadata()
+        if not metadata.init_checked:
+            metadata.check_init(self)
 
         self.ignored_properties = ["n", "timestamp", "is_auto_serialized", "ignored_properties"]
+        self.ignored_properties.extend(trace_attributes)
+
+    def __init_subclass__(cls, auto_serialize=None, **kwargs):
+        super(Message, cls).__init_subclass__(**kwargs)
+        if auto_serialize is not None:
+            cls.is_auto_serialized = auto_serialize
+
+    @classmethod
+    def _get_metadata(cls):
+        metadata = cls.__dict__.get("_metadata")  # not inherited. Each subclass gets its own
+        if metadata is None:
+            metadata = MessageMetadata()
+            cls._metadata = metadata
+        return metadata
+
+    @classmethod
+    def _get_serialization_metadata(cls):
+        """Metadata of an auto serialized class. The first call derives the fields from a new instance"""
+        metadata = cls._get_metadata()
+        if metadata.fields is None:
+            message = cls(0, 0.0)  # auto_serialize may be called in the constructor
+            if metadata.fields is None and cls.is_auto_serialized:
+                cls._derive_serialization(message)
+        return metadata
+
+    @classmethod
+    def _derive_serialization(cls, message):
+        """Generate the class's serialization from an instance's properties (in alphabetical order)"""
+        ignored_properties = message.ignored_properties
+        fields = tuple(sorted(name for name in message.__dict__ if name not in ignored_properties))
+        data_types = [type(getattr(message, name)) for name in fields]
+        cls.str_serialization, cls.message_regex, cls.message_data_types = cls.make_serialization(fields, data_types)
+        cls._get_metadata().set_fields(cls, fields, cls.message_data_types)
 
     @classmethod
     def parse(cls, message):
-        match = re.match(cls.message_regex, message)
-        if match is None or len(match.groups()) == 0:
+        metadata = cls._get_metadata()
+        if metadata.parser is None and cls.is_auto_serialized:
+            metadata = cls._get_serialization_metadata()
+        if metadata.parser is not None:
+            return metadata.parser(message)
+
+        # classes with their own message_regex
+        match = metadata.compile(cls.message_regex).match(message)
+        if match is None:
+            return None
+        groups = match.groups()
+        if len(groups) == 0:
             return None
         else:
-            n = int(match.group(1))
-            message_time = float(match.group(2))
+            n = int(groups[0])
+            message_time = float(groups[1])
             new_message = cls(n, message_time)
 
-            groups = match.groups()[2:]
-
-            for index in range(0, len(groups), 2):
+            message_data_types = cls.message_data_types
+            for index in range(2, len(groups), 2):
                 group_name = groups[index]
                 group_value = groups[index + 1]
-                group_type = cls.message_data_types[index // 2]
+                group_type = message_data_types[(index - 2) // 2]
 
-                if group_type in [int, float, str]:
+                if group_type in (int, float, str):
                     value = group_type(group_value)
                 else:
                     value = cls.parse_field(group_name, group_value)
@@ -61,77 +211,294 @@ class Message:
         self.ignored_properties.extend(property_names)
 
     def get_message_props(self):
-        properties_table = copy.deepcopy(self.__dict__)
-        for ignored_property in self.ignored_properties:
-            properties_table.pop(ignored_property)
+        """Copies of the message's properties. Use properties() to read them without copying"""
+        return copy.deepcopy(self.properties())
 
-        return properties_table
+    def properties(self):
+        """The message's properties (except n and timestamp) by name. The values aren't copied"""
+        ignored_properties = self.ignored_properties
+        return {name: value for name, value in self.__dict__.items() if name not in ignored_properties}
 
     def get_serialization(self):
-        serialization_props = [self.name, self.n, self.timestamp]
         if self.is_auto_serialized:
-            properties_table = self.get_message_props()
-            properties_table = list(properties_table.items())
-            properties_table.sort(key=lambda p: p[0])
-            properties_table = [str(item) for sublist in properties_table for item in sublist]
-            serialization_props.extend(properties_table)
+            metadata = self._get_metadata()
+            if metadata.fields is None:
+                metadata = self._get_serialization_metadata()
+            return metadata.str_format % metadata.get_values(self)
 
-        return self.__class__.str_serialization % tuple(serialization_props)
+        return self.__class__.str_serialization % (self.name, self.n, self.timestamp)
 
     def auto_serialize(self):
+        """
+        Serialize every property of this message's class. The serialization is generated from the first instance that
+        calls this (usually at the end of __init__). Defining the class with
+        class Name(Message, auto_serialize=True) does the same without a call in every constructor
+        """
         self.is_auto_serialized = True
-        str_serialization = "%s(n=%s, t=%s"
-        regex_serialization = r"%s\(n=%s, t=%s" % (self.name, self.int_regex, self.float_regex)
-
-        properties_table = self.get_message_props()
+        cls = self.__class__
+        if self._get_metadata().fields is None:
+            cls._derive_serialization(self)
+        return cls.str_serialization, cls.message_regex, cls.message_data_types
 
-        properties_table = list(properties_table.items())
-        properties_table.sort(key=lambda p: p[0])  # properties will always be in alphabetical order
+    @classmethod
+    def make_serialization(cls, fields, data_types):
+        """str_serialization, message_regex and message_data_types for properties with these names and types"""
+        str_serialization = "%s(n=%s, t=%s"
+        regex_serialization = r"%s\(n=%s, t=%s" % (cls.__name__, cls.int_regex, cls.float_regex)
 
         message_data_types = []
 
-        for index, (name, value) in enumerate(properties_table):
+        for name, data_type in zip(fields, data_types):
             str_serialization += ", %s='%s'"
             regex_serialization += r", (%s)=" % name
-            if type(value) == int:
-                regex_serialization += r"\'%s\'" % self.int_regex
+            if data_type == int:
+                regex_serialization += r"\'%s\'" % cls.int_regex
                 message_data_types.append(int)
 
-            elif type(value) == float:
-                regex_serialization += r"\'%s\'" % self.float_regex
+            elif data_type == float:
+                regex_serialization += r"\'%s\'" % cls.float_regex
                 message_data_types.append(float)
 
             else:
                 # if this is the last item, match the string until ")" instead of ","
-                regex_serialization += r"%s" % self.str_regex
-                message_data_types.append(type(value))
+                regex_serialization += r"%s" % cls.str_regex
+                message_data_types.append(data_type)
 
         str_serialization += ")"
         regex_serialization += r"\)"
-        message_data_types = tuple(message_data_types)
-
-        self.__class__.str_serialization = str_serialization
-        self.__class__.message_regex = regex_serialization
-        self.__class__.message_data_types = message_data_types
-
-        return str_serialization, regex_serialization, message_data_types
+        return str_serialization, regex_serialization, tuple(message_data_types)
 
     @property
     def name(self):
         return self.__class__.__name__
 
-    def copy(self):
-        new_message = self.__class__(self.n, self.timestamp)
-        for name, value in self.get_message_props().items():
-            new_message.__dict__[name] = copy.deepcopy(value)
+    def copy(self, deep=True):
+        """A writable copy of the message. If deep is False, the copy shares the property values"""
+        new_message = self.thawed_class(self.n, self.timestamp)
+        for name, value in self.properties().items():
+            new_message.__dict__[name] = copy.deepcopy(value) if deep else value
 
         return new_message
 
+    def freeze(self):
+        """
+        Make the message read-only so every consumer can share it without copying. Setting or deleting a property
+        raises AttributeError and numpy arrays (anything with setflags) it holds become read-only. Lists and other
+        containers aren't frozen. Call thaw to get a copy that can be modified. Returns the message
+        """
+        if not self.frozen:
+            for value in self.properties().values():
+                if hasattr(value, "setflags"):
+                    value.setflags(write=False)
+            self.__class__ = self._get_frozen_class()
+        return self
+
+    def thaw(self):
+        """
+        Copy on write: the message itself if it isn't frozen, otherwise a writable shallow copy. The copy shares
+        the property values, so frozen arrays stay read-only until replaced (message.image = message.image.copy())
+        """
+        if self.frozen:
+            return self.copy(deep=False)
+        return self
+
+    @property
+    def thawed_class(self):
+        """The message's class, even when it's frozen"""
+        return self.__class__
+
+    @classmethod
+    def _get_frozen_class(cls):
+        """
+        Frozen messages switch to a subclass that refuses to set attributes. Only frozen messages pay for the check.
+        It has the same name, metadata and codec as the original class and pickles as the original class
+        """
+        frozen_class = cls.__dict__.get("_frozen_class")
+        if frozen_class is None:
+            namespace = dict(
+                __slots__=(), __module__=cls.__module__, __qualname__=cls.__qualname__, __doc__=cls.__doc__,
+                __setattr__=_frozen_setattr, __delattr__=_frozen_delattr, __reduce_ex__=_frozen_reduce_ex,
+                frozen=True, thawed_class=cls, _metadata=cls._get_metadata(),
+            )
+            if "_codec" in cls.__dict__:
+                namespace["_codec"] = cls.__dict__["_codec"]
+            frozen_class = type(cls)(cls.__name__, (cls,), namespace)
+            cls._frozen_class = frozen_class
+        return frozen_class
+
     def __eq__(self, other):
-        if isinstance(other, type(self)):
-            return other.get_message_props() == self.get_message_props()
+        if isinstance(other, self.thawed_class):
+            return _properties_equal(self.properties(), other.properties())
         else:
             return False
 
     def __str__(self):
         return self.get_serialization()
+
+
+# messages only get their own trace attributes once they're stamped
+for _name in trace_attributes:
+    setattr(Message, _name, None)
+del _name
+
+_writable_when_frozen = trace_attributes  # latency tracing stamps every broadcast message
+
+
+def _frozen_setattr(message, name, value):
+    if name not in _writable_when_frozen:
+        raise AttributeError("Can't set '%s', %s is frozen. Modify a copy from message.thaw()" % (name, message.name))
+    object.__setattr__(message, name, value)
+
+
+def _frozen_delattr(message, name):
+    raise AttributeError("Can't delete '%s', %s is frozen. Modify a copy from message.thaw()" % (name, message.name))
+
+
+def _new_message(message_class):
+    return message_class.__new__(message_class)
+
+
+def _frozen_reduce_ex(message, protocol):
+    """Pickle and deep copy frozen messages as their original class. The copies are writable"""
+    reduced = object.__reduce_ex__(message, max(protocol, 2))
+    return (_new_message, (message.thawed_class,)) + tuple(reduced[2:])
+
+
+_immutable_types = (int, float, bool, str, bytes, type(None))
+_missing = object()
+_message_slots = ("n", "timestamp") + trace_attributes
+
+
+class MessageSchema(type):
+    """
+    Metaclass of SchemaMessage. When a class is defined, turns its schema (property name -> type, or
+    name -> (type, default)) into __slots__ and generates __init__, serialization and parsing once for the class
+    """
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        if "thawed_class" in namespace:  # frozen variant (see Message.freeze). Everything is inherited
+            return super(MessageSchema, mcs).__new__(mcs, name, bases, namespace, **kwargs)
+
+        if kwargs.get("auto_serialize", True) is False:
+            raise ValueError("%s serializes exactly the properties in its schema. auto_serialize can't be False" % name)
+
+        fields = {}  # name -> (type, default value)
+        for base in reversed(bases):
+            fields.update(getattr(base, "schema_fields", {}))
+
+        for field_name, field_type in namespace.get("schema", {}).items():
+            if field_name in _message_slots:
+                raise ValueError("'%s' is reserved and can't be a schema field of %s" % (field_name, name))
+            if type(field_type) == tuple:
+                field_type, default = field_type
+            else:
+                default = _missing
+            fields[field_name] = (field_type, default)
+
+        if "__slots__" not in namespace:
+            namespace["__slots__"] = tuple(field_name for field_name in namespace.get("schema", {}))
+        namespace["schema_fields"] = fields
+
+        cls = super(MessageSchema, mcs).__new__(mcs, name, bases, namespace, **kwargs)  # e.g. auto_serialize
+
+        if "__init__" not in namespace:
+            cls.__init__ = mcs.make_init(cls, fields)
+
+        names = tuple(sorted(fields))  # serialized in alphabetical order like auto_serialize
+        data_types = [fields[field_name][0] for field_name in names]
+        cls.str_serialization, cls.message_regex, cls.message_data_types = cls.make_serialization(names, data_types)
+
+        metadata = cls._get_metadata()
+        metadata.init_checked = "__init__" not in namespace  # a hand written __init__ is checked like Message's
+        metadata.set_fields(cls, names, cls.message_data_types, keyword_init="__init__" not in namespace)
+
+        if len(names) == 0:
+            cls._fields_getter = lambda message: ()
+        else:
+            cls._fields_getter = operator.attrgetter(*names)
+        cls._copied_fields = tuple(field_name for field_name in names if fields[field_name][0] in _immutable_types)
+        cls._deep_copied_fields = tuple(field_name for field_name in names if field_name not in cls._copied_fields)
+
+        return cls
+
+    @staticmethod
+    def make_init(cls, fields):
+        """
+        Write an __init__ that sets each property directly: __init__(self, n, timestamp=None, <fields>=<default>)
+        Fields that aren't given get their default, or field type() if there's no default
+        """
+        arguments = ["self", "n", "timestamp=None"]
+        lines = [
+            "    self.n = n",
+            "    self.timestamp = _active_clock().time() if timestamp is None else timestamp",
+        ]
+        lines.extend("    self.%s = None" % name for name in trace_attributes)
+        init_globals = {"_active_clock": active_clock, "_missing": _missing, "_deepcopy": copy.deepcopy}
+
+        for field_name, (field_type, default) in fields.items():
+            arguments.append("%s=_missing" % field_name)
+            if default is _missing:
+                default = field_type()
+            init_globals["_default_" + field_name] = default
+
+            if type(default) in _immutable_types:
+                default_code = "_default_%s" % field_name
+            else:
+                default_code = "_deepcopy(_default_%s)" % field_name  # don't share mutable defaults
+            lines.append("    self.{0} = {1} if {0} is _missing else {0}".format(field_name, default_code))
+
+        source = "def __init__(%s):\n%s\n" % (", ".join(arguments), "\n".join(lines))
+        exec(source, init_globals)
+        init = init_globals["__init__"]
+        init.__qualname__ = "%s.__init__" % cls.__qualname__
+        return init
+
+
+class SchemaMessage(Message, metaclass=MessageSchema):
+    """
+    A message whose properties are declared on the class:
+
+        class ImuMessage(SchemaMessage):
+            schema = dict(yaw=float, pitch=float, roll=float, status=(str, "ok"))
+
+        ImuMessage(n, timestamp, yaw=0.5)
+
+    Properties are stored in __slots__ instead of a __dict__, and __init__, equality, copy, serialization and parsing
+    are generated once per class. Messages serialize the same way as an auto serialized Message with the same name
+    and properties, so logs recorded with one can be parsed with the other.
+    """
+
+    __slots__ = _message_slots
+    schema = {}
+
+    is_auto_serialized = True
+    ignored_properties = _message_slots
+
+    def properties(self):
+        return {field_name: getattr(self, field_name) for field_name in self._get_metadata().fields}
+
+    def auto_serialize(self):
+        return self.str_serialization, self.message_regex, self.message_data_types
+
+    def ignore_properties(self, *property_names):
+        raise ValueError("%s serializes exactly the properties in its schema" % self.name)
+
+    def copy(self, deep=True):
+        cls = self.thawed_class
+        new_message = cls.__new__(cls)
+        new_message.n = self.n
+        new_message.timestamp = self.timestamp
+        for name in trace_attributes:
+            setattr(new_message, name, None)
+        for field_name in self._copied_fields:
+            setattr(new_message, field_name, getattr(self, field_name))
+        for field_name in self._deep_copied_fields:
+            value = getattr(self, field_name)
+            setattr(new_message, field_name, copy.deepcopy(value) if deep else value)
+        return new_message
+
+    def __eq__(self, other):
+        if isinstance(other, self.thawed_class):
+            return _properties_equal(self._fields_getter(self), self._fields_getter(other))
+        else:
+            return False
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import bisect
+import asyncio
+import tempfile
+
+
+class Counter:
+    """A number that only goes up. inc is all the hot path pays for"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """A number that goes up and down. If function is given, it's called for the value when a snapshot is taken"""
+
+    __slots__ = ("value", "function")
+
+    def __init__(self, function=None):
+        self.value = 0
+        self.function = function
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        if self.function is not None:
+            return self.function()
+        return self.value
+
+
+class Histogram:
+    """Counts observations in buckets with the given upper bounds. The last bucket counts everything larger"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    # seconds. Suits latencies and loop step times
+    default_bounds = (1E-5, 2.5E-5, 5E-5, 1E-4, 2.5E-4, 5E-4, 1E-3, 2.5E-3, 5E-3, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                      1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, bounds=None):
+        if bounds is None:
+            bounds = self.default_bounds
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return dict(
+            bounds=list(self.bounds),
+            counts=list(self.counts),
+            sum=self.sum,
+            count=self.count,
+        )
+
+
+class MetricsRegistry:
+    """Named counters, gauges and histograms. Asking for a metric that exists returns the existing one"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def _get(self, name, metric_class, *args):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = metric_class(*args)
+            self.metrics[name] = metric
+        elif not isinstance(metric, metric_class):
+            raise ValueError("Metric '%s' is a %s, not a %s" % (
+                name, metric.__class__.__name__, metric_class.__name__))
+        return metric
+
+    def counter(self, name):
+        return self._get(name, Counter)
+
+    def gauge(self, name, function=None):
+        gauge = self._get(name, Gauge)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, bounds=None):
+        return self._get(name, Histogram, bounds)
+
+    def __getitem__(self, name):
+        return self.metrics[name]
+
+    def __contains__(self, name):
+        return name in self.metrics
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+
+class MeteredCoroutine:
+    """
+    Wraps a coroutine and observes how long each step (the time between awaits) holds the event loop.
+    Steps are also attributed to label in profiler (see atlasbuggy.profiler.LoopProfiler) while it's enabled
+    """
+
+    def __init__(self, coroutine, histogram=None, profiler=None, label=None):
+        self.coroutine = coroutine
+        self.histogram = histogram
+        self.profiler = profiler
+        self.label = label
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def _step(self, method, *args):
+        profiler = self.profiler
+        profiling = profiler is not None and profiler.enabled
+        if profiling:
+            previous = profiler.enter(self.label)
+        start_time = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self.histogram is not None:
+                self.histogram.observe(time.perf_counter() - start_time)
+            if profiling:
+                profiler.exit(previous)
+
+    def send(self, value):
+        return self._step(self.coroutine.send, value)
+
+    def throw(self, *exception_info):
+        return self._step(self.coroutine.throw, *exception_info)
+
+    def close(self):
+        return self.coroutine.close()
+
+
+def write_snapshot(snapshot, path):
+    """Write a snapshot as JSON. The file is replaced all at once so readers never see a partial snapshot"""
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(file_descriptor, "w") as file:
+        json.dump(snapshot, file, indent=2, sort_keys=True)
+    os.replace(temporary_path, path)
+
+
+class MetricsServer:
+    """Answers every HTTP request on host:port with the latest snapshot as JSON"""
+
+    def __init__(self, get_snapshot, host="localhost", port=9090):
+        self.get_snapshot = get_snapshot
+        self.host = host
+        self.port = port
+        self.server = None
+
+    @asyncio.coroutine
+    def start(self):
+        self.server = yield from asyncio.start_server(self.handle_request, self.host, self.port)
+
+    @asyncio.coroutine
+    def handle_request(self, reader, writer):
+        try:
+            # the request doesn't matter, but read its headers so the client isn't reset
+            while True:
+                line = yield from reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            body = json.dumps(self.get_snapshot(), sort_keys=True).encode()
+            writer.write(b"HTTP/1.0 200 OK\r\n"
+                         b"Content-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n" % len(body))
+            writer.write(body)
+            yield from writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @asyncio.coroutine
+    def stop(self):
+        if self.server is not None:
+            self.server.close()
+            yield from self.server.wait_closed()
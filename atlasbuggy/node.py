@@ -4,6 +4,10 @@ import asyncio
 import logging
 import traceback
 
+from .clock import Clock
+from .message import Message
+from .queues import RingBufferQueue
+from .metrics import MetricsRegistry
 from .subscription import Subscription
 from .log.factory import make_logger
 from .log import default
@@ -22,22 +26,32 @@ class Node:
 
         self._producer_subs = []
         self._consumer_subs = []
+        self._routing_table = {}  # service -> enabled subscriptions. Rebuilt by update_routing_table
         self._subscription_tags = set()
         self.services = {
             "default": None
         }
 
         self.event_loop = None  # assigned by the orchestrator when orchestrator.add_nodes is called
+        self.clock = Clock()  # replaced by the orchestrator's clock. Read the time from here so it can be simulated
 
         self._log_buffer = default.log_buffer_start
         self._max_log_buf_size = 16384
+
         self._buffer_check_acquisition_rate = 3  # seconds
         self._buffer_check_prev_t = time.time()
         self._buffer_check_prev_len = 0
 
+        self.metrics = MetricsRegistry()
+        self.messages_broadcast = self.metrics.counter("messages_broadcast")
+
         self.start_time = time.time()
 
         self.enable_loop_fn = True
+        self.freeze_messages = False  # freeze broadcast messages so consumers can share them safely. See Message.freeze
+
+        self.trace = None  # NodeTrace assigned by the orchestrator if latency tracing is on
+        self.profiler = None  # the orchestrator's LoopProfiler. Times subscription callbacks while it's enabled
 
     @property
     def name(self):
@@ -65,6 +79,12 @@ class Node:
             self.dump_log_buffer()
 
     def check_buffer(self, num_messages_received, log_level=20):
+        """
+        Record a total message count in the messages_received gauge (see Orchestrator.metrics_snapshot) and log the
+        receive rate at log_level every few seconds
+        """
+        self.metrics.gauge("messages_received").set(num_messages_received)
+
         current_time = time.time()
         if (current_time - self._buffer_check_prev_t) > self._buffer_check_acquisition_rate:
             self.logger.log(log_level,
@@ -126,70 +146,188 @@ class Node:
 
         return True
 
+    def update_routing_table(self):
+        """Rebuild the service -> subscriptions table broadcast uses to find its consumers"""
+        routing_table = {}
+        for subscription in self._consumer_subs:
+            if subscription.enabled:
+                if subscription.requested_service not in routing_table:
+                    routing_table[subscription.requested_service] = []
+                routing_table[subscription.requested_service].append(subscription)
+
+        self._routing_table = routing_table
+
+    @staticmethod
+    def _unexpected_message_error(subscription, message):
+        return ValueError(
+            "Consumer node '%s' expects message type '%s' from producer '%s'. Got type '%s'" % (
+                subscription.consumer_node, subscription.expected_message_types,
+                subscription.producer_node, type(message)))
+
+    def _check_message(self, subscription, message):
+        """Apply the subscription's message converter and make sure the result is of an expected type"""
+        if subscription.message_converter is not None:
+            message = subscription.message_converter(message)
+
+        if not subscription.is_expected_message(message):
+            raise self._unexpected_message_error(subscription, message)
+        return message
+
+    def _check_messages(self, subscription, messages):
+        """_check_message for a batch. The converter is looked up once and each message class is checked once"""
+        converter = subscription.message_converter
+        if converter is not None:
+            messages = [converter(message) for message in messages]
+
+        if subscription.expected_message_types is not None:
+            for message in {message.__class__: message for message in messages}.values():
+                if not subscription.is_expected_message(message):
+                    raise self._unexpected_message_error(subscription, message)
+        return messages
+
     def _find_matching_subscriptions(self, message, service):
+        subscriptions = self._routing_table.get(service)
+        if subscriptions is None:
+            # self.logger.warning("Broadcasting to no one!")
+            return ()
+
         results = []
-        for subscription in self._consumer_subs:
-            if not subscription.enabled:
-                continue
-
-            if service == subscription.requested_service:
-                if subscription.message_converter is not None:
-                    message = subscription.message_converter(message)
-
-                if subscription.expected_message_types is not None:
-                    satisfied = False
-                    for expected_message_type in subscription.expected_message_types:
-                        if isinstance(message, expected_message_type):
-                            satisfied = True
-                            break
-                    if not satisfied:
-                        raise ValueError(
-                            "Consumer node '%s' expects message type '%s' from producer '%s'. Got type '%s'" % (
-                                subscription.consumer_node, subscription.expected_message_types,
-                                subscription.producer_node, type(message)))
-                results.append((subscription, message))
-
-        # if len(results) == 0:
-        #     self.logger.warning("Broadcasting to no one!")
+        for subscription in subscriptions:
+            results.append((subscription, self._check_message(subscription, message)))
+
         return results
 
+    def _reject_message(self, subscription):
+        """Count a message that didn't fit on a full queue. Only log when the count reaches a power of ten"""
+        subscription.num_rejected += 1
+        num_rejected = subscription.num_rejected
+        while num_rejected % 10 == 0:
+            num_rejected //= 10
+        if num_rejected == 1:
+            self.logger.info(
+                "Producer '%s' is trying to put a message on consumer '%s's queue, but it is full "
+                "(%s messages dropped)" % (
+                    subscription.producer_node, subscription.consumer_node, subscription.num_rejected
+                )
+            )
+
+    def _run_callback(self, subscription, message):
+        subscription.messages_delivered.inc()
+        subscription.messages_received.inc()
+        if subscription.trace is not None:
+            subscription.trace.dequeued(message)
+
+        profiler = self.profiler
+        profiling = profiler is not None and profiler.enabled
+        if profiling:
+            previous = profiler.enter("%s.%s" % (
+                subscription.consumer_node, getattr(subscription.callback, "__name__", "callback")))
+        try:
+            if subscription.callback_args is None:
+                subscription.callback(message)
+            else:
+                subscription.callback(message, *subscription.callback_args)
+        finally:
+            if profiling:
+                profiler.exit(previous)
+
+    @asyncio.coroutine
+    def _deliver(self, subscription, message):
+        if subscription.callback is not None:
+            self._run_callback(subscription, message)
+
+        elif subscription.queue is not None:
+            if subscription.error_on_full_queue:
+                yield from subscription.queue.put(message)
+            else:
+                try:
+                    yield from subscription.queue.put(message)
+                except asyncio.QueueFull:
+                    self._reject_message(subscription)
+                    return
+            subscription.messages_delivered.inc()
+            if subscription.trace is not None:
+                subscription.trace.enqueued(message)
+
+    @asyncio.coroutine
+    def _deliver_many(self, subscription, messages):
+        if subscription.callback is not None:
+            for message in messages:
+                self._run_callback(subscription, message)
+            return
+
+        queue = subscription.queue
+        if queue is None:
+            return
+        if isinstance(queue, RingBufferQueue):
+            num_put = yield from queue.put_many(messages)
+        else:
+            for message in messages:
+                yield from queue.put(message)
+            num_put = len(messages)
+
+        subscription.messages_delivered.inc(num_put)
+        if subscription.trace is not None:
+            for message in messages[:num_put]:
+                subscription.trace.enqueued(message)
+        if num_put < len(messages):
+            if subscription.error_on_full_queue:
+                raise asyncio.QueueFull
+            for _ in range(len(messages) - num_put):
+                self._reject_message(subscription)
+
     @asyncio.coroutine
     def broadcast(self, message, service="default"):
+        self.messages_broadcast.inc()
+        if self.freeze_messages and isinstance(message, Message):
+            message.freeze()
+        if self.trace is not None:
+            self.trace.broadcasting(message)
         results = self._find_matching_subscriptions(message, service)
 
         for matched_subscription, message in results:
-            if matched_subscription.callback is not None:
-                if matched_subscription.callback_args is None:
-                    matched_subscription.callback(message)
-                else:
-                    matched_subscription.callback(message, *matched_subscription.callback_args)
-
-            elif matched_subscription.queue is not None:
-                if matched_subscription.error_on_full_queue:
-                    yield from matched_subscription.queue.put(message)
-                else:
-                    try:
-                        yield from matched_subscription.queue.put(message)
-                    except asyncio.QueueFull:
-                        self.logger.info(
-                            "Producer '%s' is trying to put a message on consumer '%s's queue, but it is full" % (
-                                matched_subscription.producer_node, matched_subscription.consumer_node
-                            )
-                        )
+            yield from self._deliver(matched_subscription, message)
 
         yield from asyncio.sleep(0.0)
         return len(results)
 
+    @asyncio.coroutine
+    def broadcast_many(self, messages, service="default"):
+        """
+        Broadcast a sequence of messages (every packet from a serial read for example) in one hop.
+        Subscriptions are looked up once and control is only given back to the event loop after the last message.
+        Each consumer receives the messages in order. Messages are checked and put on each consumer's queue as a batch
+        """
+        subscriptions = self._routing_table.get(service, ())
+        if not isinstance(messages, (list, tuple)):
+            messages = list(messages)
+        self.messages_broadcast.inc(len(messages))
+        if self.freeze_messages:
+            for message in messages:
+                if isinstance(message, Message):
+                    message.freeze()
+        if self.trace is not None:
+            for message in messages:
+                self.trace.broadcasting(message)
+
+        for subscription in subscriptions:
+            yield from self._deliver_many(subscription, self._check_messages(subscription, messages))
+
+        yield from asyncio.sleep(0.0)
+        return len(subscriptions)
+
     def broadcast_nowait(self, message, service="default"):
+        self.messages_broadcast.inc()
+        if self.freeze_messages and isinstance(message, Message):
+            message.freeze()
+        if self.trace is not None:
+            self.trace.broadcasting(message)
         results = self._find_matching_subscriptions(message, service)
 
         if len(results) != 0:
             for matched_subscription, message in results:
                 if matched_subscription.callback is not None:
-                    if matched_subscription.callback_args is None:
-                        matched_subscription.callback(message)
-                    else:
-                        matched_subscription.callback(message, *matched_subscription.callback_args)
+                    self._run_callback(matched_subscription, message)
 
                 elif matched_subscription.queue is not None:
                     if matched_subscription.error_on_full_queue:
@@ -198,11 +336,11 @@ class Node:
                         try:
                             matched_subscription.queue.put_nowait(message)
                         except asyncio.QueueFull:
-                            self.logger.info(
-                                "Producer '%s' is trying to put a message on consumer '%s's queue, but it is full" % (
-                                    matched_subscription.producer_node, matched_subscription.consumer_node
-                                )
-                            )
+                            self._reject_message(matched_subscription)
+                            continue
+                    matched_subscription.messages_delivered.inc()
+                    if matched_subscription.trace is not None:
+                        matched_subscription.trace.enqueued(message)
         return len(results)
 
     def define_subscription(self, tag, service="default",
@@ -213,7 +351,7 @@ class Node:
                             error_on_full_queue=False,
                             required_attributes=None,
                             required_methods=None,
-                            callback=None, callback_args=None):
+                            callback=None, callback_args=None, mode="queue", queue_policy=None):
         if queue_size == 0 and callback is not None:
             queue_size = None  # disable queues by default if a callback function is enabled
 
@@ -225,7 +363,7 @@ class Node:
             tag, service, is_required, message_type, producer_type, queue_size,
             error_on_full_queue,
             required_attributes, required_methods,
-            callback, callback_args
+            callback, callback_args, mode, queue_policy
         )
         self._producer_subs.append(subscription)
 
@@ -237,8 +375,13 @@ class Node:
     def define_service(self, service="default", message_type=None):
         self.services[service] = message_type
 
+    def accept_subscription(self, subscription, consumer):
+        """Called by the orchestrator when consumer subscribes to this node. Raises ValueError if it can't"""
+        subscription.check_producer(self, consumer)
+
     def append_subscription(self, subscription):
         self._consumer_subs.append(subscription)
+        self.update_routing_table()
 
     def __str__(self):
         return self.name
@@ -14,4 +14,5 @@ if opencv_installed:
 else:
     print("Warning! Using the OpenCV module without OpenCV installed!")
 from .pipeline import OpenCVPipeline
-from .messages import ImageMessage
+from .messages import ImageMessage, StereoImageMessage
+from .frame_pool import SharedFramePool, FrameHandle
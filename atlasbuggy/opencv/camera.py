@@ -14,7 +14,8 @@ class OpenCVCamera(Node):
     min_cap_num = 0
     max_cap_num = None
 
-    def __init__(self, width=None, height=None, capture_number=None, enabled=True, logger=None, skip_count=0):
+    def __init__(self, width=None, height=None, capture_number=None, enabled=True, logger=None, skip_count=0,
+                 frame_pool=None):
         super(OpenCVCamera, self).__init__(enabled, logger)
         self.capture_number = capture_number
         self.capture = None
@@ -37,6 +38,9 @@ class OpenCVCamera(Node):
 
         self.skip_count = skip_count
 
+        # if a SharedFramePool is given, frames are put in shared memory so out of process consumers don't copy them
+        self.frame_pool = frame_pool
+
         self.key = -1
         platform = OpenCVCamera.get_platform()
         if platform == "linux":
@@ -239,10 +243,11 @@ class OpenCVCamera(Node):
             self.poll_for_fps()
 
             message = ImageMessage(self.frame, counter)
+            if self.frame_pool is not None:
+                message.share(self.frame_pool)
             counter += 1
 
             self.log_to_buffer(time.time(), message)
-            self.check_buffer(counter)
 
             yield from self.broadcast(message)
 
@@ -0,0 +1,167 @@
+import os
+import weakref
+import collections
+import multiprocessing
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+
+    shared_memory_available = True
+except ImportError:
+    shared_memory_available = False
+
+
+class FrameHandle:
+    """Refers to a frame stored in a SharedFramePool slot. This is what gets pickled instead of the frame"""
+
+    __slots__ = ("pool_name", "slot", "shape", "dtype")
+
+    def __init__(self, pool_name, slot, shape, dtype):
+        self.pool_name = pool_name
+        self.slot = slot
+        self.shape = shape
+        self.dtype = dtype
+
+    def __str__(self):
+        return "%s<pool=%s, slot=%s, shape=%s, dtype=%s>" % (
+            self.__class__.__name__, self.pool_name, self.slot, self.shape, self.dtype
+        )
+
+
+class SharedFramePool:
+    """
+    A fixed number of frame sized slots in shared memory. Frames stored in a slot are handed to other processes as
+    FrameHandles and mapped there as numpy arrays without copying.
+
+    Every slot has a reference count. Storing a frame takes one reference, each copy of a message sent to another
+    process takes another. A mapped array gives its reference back once it and every view of it are garbage
+    collected, so slots are recycled when every consumer is done with the frame. If the pool's lock is busy when an
+    array is collected, its reference is given back by the pool's next operation in that process.
+
+    Make pools before the orchestrator starts any worker processes so every process knows about them.
+    """
+
+    pools = {}  # pool name -> pool made (or inherited) by this process
+
+    def __init__(self, num_slots, slot_size, context=None):
+        if not shared_memory_available:
+            raise ImportError("multiprocessing.shared_memory isn't available. Python 3.8 or higher is required")
+        if context is None:
+            context = multiprocessing
+
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self._slots_offset = num_slots * np.dtype(np.int32).itemsize
+
+        self.memory = shared_memory.SharedMemory(create=True, size=self._slots_offset + num_slots * slot_size)
+        self.refcounts = np.ndarray((num_slots,), dtype=np.int32, buffer=self.memory.buf)
+        self.refcounts[:] = 0
+        self.lock = context.Lock()
+
+        self._released = collections.deque()  # (slot, pid) of collected arrays waiting for the lock
+        self._next_slot = 0
+        self.num_exhausted = 0  # frames that couldn't be stored because every slot was in use
+
+        SharedFramePool.pools[self.name] = self
+
+    @classmethod
+    def for_frames(cls, num_slots, width, height, depth=3, dtype=np.uint8, context=None):
+        return cls(num_slots, width * height * depth * np.dtype(dtype).itemsize, context)
+
+    @classmethod
+    def map_handle(cls, handle):
+        if handle.pool_name not in cls.pools:
+            raise ValueError("Frame pool '%s' isn't known to this process. "
+                             "Was it made after worker processes started?" % handle.pool_name)
+        return cls.pools[handle.pool_name].view(handle)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def _acquire_slot(self):
+        with self.lock:
+            self._apply_releases()
+            for offset in range(self.num_slots):
+                slot = (self._next_slot + offset) % self.num_slots
+                if self.refcounts[slot] == 0:
+                    self.refcounts[slot] = 1
+                    self._next_slot = slot + 1
+                    return slot
+        return None
+
+    def retain(self, handle):
+        with self.lock:
+            self._apply_releases()
+            self.refcounts[handle.slot] += 1
+
+    def release(self, handle):
+        self._release_slot(handle.slot)
+
+    def _release_slot(self, slot, mapping_pid=None):
+        # called by finalizers, which can run during garbage collection while this thread holds the lock. Never wait
+        # for it. Whoever holds it next gives the reference back
+        pid = os.getpid()
+        if mapping_pid is not None and mapping_pid != pid:
+            return  # an array inherited from the process that mapped it. That process gives the reference back
+        self._released.append((slot, pid))
+        self._try_apply_releases()
+
+    def _try_apply_releases(self):
+        if self.lock.acquire(False):
+            try:
+                self._apply_releases()
+            finally:
+                self.lock.release()
+
+    def _apply_releases(self):
+        """Give back the references of released slots. Call this with the lock held"""
+        pid = os.getpid()
+        while True:
+            try:
+                slot, release_pid = self._released.popleft()
+            except IndexError:
+                return
+            if release_pid == pid:  # forked processes inherit their parent's queue. The parent applies those
+                self.refcounts[slot] -= 1
+
+    def _map(self, handle):
+        offset = self._slots_offset + handle.slot * self.slot_size
+        array = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=self.memory.buf, offset=offset)
+        weakref.finalize(array, self._release_slot, handle.slot, os.getpid())
+        return array
+
+    def store(self, image):
+        """
+        Copy an image into a free slot. Returns the shared array (use it in place of image) and its handle.
+        Returns None if the image is too large or every slot is in use.
+        """
+        if image.nbytes > self.slot_size:
+            return None
+        slot = self._acquire_slot()
+        if slot is None:
+            self.num_exhausted += 1
+            return None
+
+        handle = FrameHandle(self.name, slot, image.shape, image.dtype.str)
+        shared_image = self._map(handle)
+        shared_image[...] = image
+        return shared_image, handle
+
+    def view(self, handle):
+        """Map a frame sent from another process. The sender already took the reference this array holds"""
+        if len(self._released) > 0:
+            self._try_apply_releases()
+        return self._map(handle)
+
+    def close(self):
+        try:
+            self.memory.close()
+        except BufferError:
+            pass  # arrays still map the pool. The memory is unmapped when they're collected
+
+    def unlink(self):
+        """Free the shared memory. Call this from one process once the pool is no longer needed"""
+        SharedFramePool.pools.pop(self.name, None)
+        self.memory.unlink()
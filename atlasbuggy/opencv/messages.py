@@ -1,3 +1,4 @@
+import re
 import numpy as np
 
 try:
@@ -9,9 +10,13 @@ except ImportError:
 
 from atlasbuggy.message import Message
 
+from .frame_pool import SharedFramePool
+
 
 class ImageMessage(Message):
     message_regex = r"ImageMessage\(t=(\d.*), n=(\d*)\)"
+    frame_attributes = ("image",)  # numpy arrays that share() moves into shared memory
+    check_init_signature = False  # the image comes first. parse makes these with keywords
 
     def __init__(self, image=None, n=None, width=None, height=None, depth=3, timestamp=None):
         assert type(n) == int
@@ -26,7 +31,10 @@ class ImageMessage(Message):
         self.height = height
         self.depth = depth
 
-        super(ImageMessage, self).__init__(timestamp, n)
+        self.frame_handles = {}  # frame attribute name -> FrameHandle of frames in shared memory
+
+        super(ImageMessage, self).__init__(n, timestamp)
+        self.ignore_properties("frame_handles")
 
     def get_image_dimensions(self, image):
         height, width, = image.shape[:2]
@@ -36,6 +44,45 @@ class ImageMessage(Message):
             depth = 1
         return width, height, depth
 
+    def share(self, pool):
+        """
+        Move this message's frames into a SharedFramePool. Consumers in other processes then map the frames instead of
+        receiving pickled copies. Returns False if the pool couldn't take every frame (those are sent as copies).
+        """
+        stored = {}  # id of the original array -> (shared array, handle). Attributes can refer to the same frame
+        for name in self.frame_attributes:
+            image = getattr(self, name)
+            if image is None or name in self.frame_handles:
+                continue
+            if id(image) not in stored:
+                result = pool.store(image)
+                if result is None:
+                    return False
+                stored[id(image)] = result
+
+            shared_image, handle = stored[id(image)]
+            setattr(self, name, shared_image)
+            self.frame_handles[name] = handle
+        return True
+
+    def release_frames(self):
+        """Give back the references a serialized copy took if the copy is never unpickled"""
+        for handle in self.frame_handles.values():
+            SharedFramePool.pools[handle.pool_name].release(handle)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name, handle in self.frame_handles.items():
+            # the copy maps the frame from shared memory and holds its own reference to it
+            SharedFramePool.pools[handle.pool_name].retain(handle)
+            state[name] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name, handle in self.frame_handles.items():
+            setattr(self, name, SharedFramePool.map_handle(handle))
+
     def __str__(self):
         return "%s(t=%s, n=%s)" % (self.__class__.__name__, self.timestamp, self.n)
 
@@ -66,6 +113,7 @@ class ImageMessage(Message):
 
 class StereoImageMessage(ImageMessage):
     message_regex = r"StereoImageMessage\(t=(\d.*), n=(\d*), dist=([-\d.e]*), lt=(\d.*), rt=(\d.*), diff=([-\d.e]*)\)"
+    frame_attributes = ("image", "left_image", "right_image")
 
     def __init__(self, left_image, right_image, n, separation_dist, width=None, height=None, depth=3, timestamp=None,
                  left_timestamp=None, right_timestamp=None):
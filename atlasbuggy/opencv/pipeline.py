@@ -1,5 +1,4 @@
 
-import time
 import asyncio
 
 from atlasbuggy import Node
@@ -8,15 +7,18 @@ from .messages import ImageMessage
 
 
 class OpenCVPipeline(Node):
-    def __init__(self, enabled=True, logger=None):
+    def __init__(self, enabled=True, logger=None, frame_pool=None):
         super(OpenCVPipeline, self).__init__(enabled, logger)
 
+        # if a SharedFramePool is given, output frames are put in shared memory for out of process consumers
+        self.frame_pool = frame_pool
+
         self.paused = False
 
         self.capture = None
         self.capture_queue = None
         self.capture_tag = "capture"
-        self.capture_sub = self.define_subscription(self.capture_tag, queue_size=1, message_type=ImageMessage,
+        self.capture_sub = self.define_subscription(self.capture_tag, mode="latest", message_type=ImageMessage,
                                                     required_attributes=("fps",))
         self.has_attributes = False
         self.has_methods = False
@@ -47,26 +49,26 @@ class OpenCVPipeline(Node):
 
     @property
     def fps(self):
+        if self.capture is None:
+            return None  # not subscribed to a capture yet. Consumers check this attribute exists when subscribing
         return self.capture.fps
 
     @asyncio.coroutine
     def loop(self):
         while True:
-            while not self.capture_queue.empty():
-                message = yield from self.capture_queue.get()
-                self.logger.debug("pipeline_message image received: %s" % message)
-                self.logger.debug("receive delay: %ss" % (time.time() - message.timestamp))
+            message = yield from self.capture_sub.wait()
+            self.logger.debug("pipeline_message image received: %s" % message)
 
-                image = yield from self.pipeline(message)
-                if image is None:
-                    image = message.image
-                pipeline_message = ImageMessage(image, n=message.n)
-                self.logger.debug("pipeline delay: %ss" % (pipeline_message.timestamp - message.timestamp))
+            image = yield from self.pipeline(message)
+            if image is None:
+                image = message.image
+            pipeline_message = ImageMessage(image, n=message.n)
+            if self.frame_pool is not None:
+                pipeline_message.share(self.frame_pool)
 
-                self._num_frames = message.n
+            self._num_frames = message.n
 
-                yield from self.broadcast(pipeline_message)
-            yield from asyncio.sleep(0.5 / self.capture.fps)
+            yield from self.broadcast(pipeline_message)
 
     @asyncio.coroutine
     def pipeline(self, message):
@@ -152,14 +152,10 @@ class OpenCVRecorder(Node):
     @asyncio.coroutine
     def loop(self):
         while True:
-            while not self.capture_queue.empty():
-                message = yield from self.capture_queue.get()
-                self.log_to_buffer(time.time(), "Recording frame #%s. Delay: %s" % (message.n, time.time() - message.timestamp))
-                self.check_buffer(message.n)
-                self.record(message.image)
-                self.poll_for_fps()
-
-            yield from asyncio.sleep(0.5 / self.capture.fps)  # operate faster than the camera
+            message = yield from self.capture_sub.wait()
+            self.log_to_buffer(time.time(), "Recording frame #%s. Delay: %s" % (message.n, time.time() - message.timestamp))
+            self.record(message.image)
+            self.poll_for_fps()
 
     @asyncio.coroutine
     def teardown(self):
@@ -1,6 +1,5 @@
 import cv2
 import sys
-import time
 import asyncio
 import numpy as np
 
@@ -46,6 +45,7 @@ class OpenCVViewer(Node):
             self.key_codes = {}
 
         self.key = 255
+        self.key_poll_interval = 0.05  # seconds
 
         if enable_trackbar:
             self.capture_required_attributes = "num_frames", "fps"
@@ -58,7 +58,7 @@ class OpenCVViewer(Node):
         self.capture = None
         self.capture_queue = None
         self.capture_sub = self.define_subscription(
-            self.capture_tag, producer_service, message_type=ImageMessage, queue_size=1,
+            self.capture_tag, producer_service, message_type=ImageMessage, mode="latest",
             required_attributes=self.capture_required_attributes,
             required_methods=self.capture_required_methods)
 
@@ -111,22 +111,16 @@ class OpenCVViewer(Node):
             if self.key_pressed() is False:
                 return
 
-            if type(self.capture.fps) == float or type(self.capture.fps) == int:
-                yield from asyncio.sleep(0.5 / self.capture.fps)  # operate faster than the camera
-            else:
-                yield from asyncio.sleep(0.01)
-
-            # self.logger.debug("getting frame")
-            if self.capture_queue.empty():
+            # stop waiting for a frame every so often so key presses are still handled while no frames arrive
+            try:
+                message = yield from self.capture_sub.wait(self.key_poll_interval)
+            except asyncio.TimeoutError:
                 continue
-            else:
-                self.increment_slider()
-                message = yield from self.capture_queue.get()
-                self.logger.debug("viewer delay: %ss" % (time.time() - message.timestamp))
-                self.logger.debug("viewer image received: %s" % message)
 
-                frame = self.draw(message.image)
+            self.increment_slider()
+            self.logger.debug("viewer image received: %s" % message)
 
+            frame = self.draw(message.image)
             if frame is None:
                 continue
 
@@ -3,16 +3,28 @@ import time
 import signal
 import asyncio
 import traceback
+import multiprocessing
 
 from .log.factory import make_logger
 from .log import default
+from .clock import Clock, VirtualClock, VirtualTimeEventLoop, set_active_clock
+from .tracing import LatencyTracer
+from .profiler import LoopProfiler
+from .metrics import MetricsRegistry, MeteredCoroutine, MetricsServer, write_snapshot
+from .transport import NodeProcess, SubscriptionChannel, shared_memory_available
 
 
 class Orchestrator:
-    def __init__(self, event_loop, name=None, logger=None, return_when=asyncio.FIRST_COMPLETED):
+    def __init__(self, event_loop, name=None, logger=None, return_when=asyncio.FIRST_COMPLETED, profile_signal=None):
         self.event_loop = event_loop
         self._name = name
 
+        if isinstance(event_loop, VirtualTimeEventLoop):
+            self.clock = VirtualClock(event_loop)
+        else:
+            self.clock = Clock()
+        set_active_clock(self.clock)
+
         if not self.is_logger_created():
             if logger is None:
                 self.logger, self.file_name, self.directory = make_logger(self.name, default.default_settings)
@@ -21,13 +33,28 @@ class Orchestrator:
                 self.file_name = self.directory = ""
 
         self.nodes = []
+        self.node_processes = {}  # node -> NodeProcess for nodes running in a worker process
+        self.channels = []  # subscriptions crossing a process boundary
         self.loop_tasks = []
         self.teardown_tasks = []
         self.exit_event = asyncio.Event(loop=event_loop)
         self.return_when = return_when
+        self.tracer = None
+
+        self.metrics = MetricsRegistry()
+        self.metrics.gauge("num_nodes", lambda: len(self.nodes))
+        self.metrics.gauge("num_process_nodes", lambda: len(self.node_processes))
+        self.metrics_path = None
+        self.metrics_interval = None
+        self.metrics_server = None
+        self.loop_lag_interval = None
+
+        self.profiler = LoopProfiler(self.logger)
 
         if sys.platform != "win32":
             self.event_loop.add_signal_handler(signal.SIGINT, self.cancel_loop_tasks, self.event_loop)
+            if profile_signal is not None:
+                self.event_loop.add_signal_handler(profile_signal, self.toggle_profiling)
 
         self.start_time = time.time()
 
@@ -55,12 +82,154 @@ class Orchestrator:
     def is_logger_created(self):
         return hasattr(self, "logger")
 
-    def add_nodes(self, *nodes):
-        """Add the tasks associated with each node to the event loop"""
+    def add_nodes(self, *nodes, separate_process=False):
+        """
+        Add the tasks associated with each node to the event loop.
+        If separate_process is True, each node runs on its own event loop in a worker process. Subscriptions to and
+        from these nodes work the same way but carry messages through shared memory.
+        """
         for node in nodes:
             if node.enabled:
                 node.event_loop = self.event_loop
                 self.nodes.append(node)
+                if separate_process:
+                    self.node_processes[node] = NodeProcess(node, self._process_context())
+                else:
+                    node.clock = self.clock
+
+    @staticmethod
+    def _process_context():
+        if not shared_memory_available:
+            raise RuntimeError("Running nodes in separate processes requires Python 3.8 or higher")
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Running nodes in separate processes requires the 'fork' start method "
+                               "which isn't available on %s" % sys.platform)
+        return multiprocessing.get_context("fork")
+
+    def trace_latency(self, report_interval=10.0, window=1024):
+        """
+        Measure how long messages take to get from node to node. p50, p95, and p99 latencies of the last window
+        messages on each subscription are logged every report_interval seconds (never if None) and when the
+        orchestrator halts. See atlasbuggy.tracing.LatencyTracer
+        """
+        self.tracer = LatencyTracer(self.logger, report_interval, window)
+
+    def start_profiling(self):
+        """
+        Start attributing event loop time to node coroutines and callbacks. Reports are logged every
+        profiler.report_interval seconds and when profiling stops. To toggle profiling without restarting, create the
+        orchestrator with profile_signal (signal.SIGUSR1 for example) and send it that signal.
+        See atlasbuggy.profiler.LoopProfiler
+        """
+        self.logger.info("profiling started")
+        self.profiler.start()
+
+    def stop_profiling(self):
+        if self.profiler.enabled:
+            self.profiler.stop()
+            self.profiler.log_report()
+            self.logger.info("profiling stopped")
+
+    @asyncio.coroutine
+    def _stop_profiling_after(self, tasks):
+        yield from asyncio.wait(tasks)
+        self.stop_profiling()
+
+    def toggle_profiling(self):
+        if self.profiler.enabled:
+            self.stop_profiling()
+        else:
+            self.start_profiling()
+
+    def publish_metrics(self, path=None, port=None, host="localhost", interval=5.0, loop_lag_interval=0.25):
+        """
+        Write metrics_snapshot to a JSON file at path every interval seconds and/or serve it over HTTP on host:port.
+        Snapshots can be taken any time with metrics_snapshot. While metrics are published, the event loop's lag
+        (how late a timer set loop_lag_interval seconds ahead fires) is recorded in the loop_lag histogram
+        """
+        self.metrics_path = path
+        self.metrics_interval = interval
+        self.loop_lag_interval = loop_lag_interval
+        if port is not None:
+            self.metrics_server = MetricsServer(self.metrics_snapshot, host, port)
+
+    def metrics_snapshot(self):
+        """The current value of every metric of this orchestrator, its local nodes, and their subscriptions"""
+        nodes = {}
+        subscriptions = {}
+        for node in self.local_nodes:
+            nodes[node.name] = node.metrics.snapshot()
+            for subscription in node._consumer_subs:
+                subscriptions[subscription.name] = subscription.metrics.snapshot()
+
+        return dict(
+            time=time.time(),
+            orchestrator=self.metrics.snapshot(),
+            nodes=nodes,
+            subscriptions=subscriptions,
+        )
+
+    @asyncio.coroutine
+    def _write_metrics_forever(self):
+        while True:
+            yield from asyncio.sleep(self.metrics_interval)
+            write_snapshot(self.metrics_snapshot(), self.metrics_path)
+
+    @asyncio.coroutine
+    def _measure_loop_lag_forever(self):
+        loop_lag = self.metrics.histogram("loop_lag")
+        latest_loop_lag = self.metrics.gauge("latest_loop_lag")
+        while True:
+            start_time = self.event_loop.time()
+            yield from asyncio.sleep(self.loop_lag_interval)
+            lag = max(self.event_loop.time() - start_time - self.loop_lag_interval, 0.0)
+            loop_lag.observe(lag)
+            latest_loop_lag.set(lag)
+
+    @property
+    def local_nodes(self):
+        """Nodes that run on this orchestrator's event loop"""
+        return [node for node in self.nodes if node not in self.node_processes]
+
+    def _start_node_processes(self):
+        if len(self.node_processes) == 0:
+            return
+
+        context = self._process_context()
+        self.channels = []
+        for producer in self.nodes:
+            for subscription in producer._consumer_subs:
+                if self.node_processes.get(producer) is not self.node_processes.get(subscription.consumer_node):
+                    self.channels.append(SubscriptionChannel(subscription, context))
+
+        for node_process in self.node_processes.values():
+            self.logger.debug("Starting %s in a separate process" % node_process.node)
+            node_process.start(self.channels)
+
+        # workers have their copies of the subscriptions now. Connect this process's side of each channel
+        for channel in self.channels:
+            if channel.subscription.producer_node not in self.node_processes:
+                channel.attach_producer()
+            if channel.subscription.consumer_node not in self.node_processes:
+                channel.attach_consumer(self.event_loop)
+
+    @asyncio.coroutine
+    def _wait_for_process(self, node_process):
+        yield from self.event_loop.run_in_executor(None, node_process.join)
+        if node_process.exitcode != 0:
+            raise RuntimeError("Node '%s' exited with code %s" % (node_process.node, node_process.exitcode))
+
+    @asyncio.coroutine
+    def _stop_node_processes(self):
+        for node_process in self.node_processes.values():
+            node_process.stop()
+        for node_process in self.node_processes.values():
+            yield from self.event_loop.run_in_executor(None, node_process.join)
+
+        for channel in self.channels:
+            channel.close()
+            channel.unlink()
+        self.channels = []
 
     # ----- event order methods -----
 
@@ -92,12 +261,23 @@ class Orchestrator:
 
         end_time = time.time()
         self.logger.info("Session took %ss to complete" % (end_time - self.start_time))
+        if self.tracer is not None:
+            self.tracer.log_report()
+        if self.metrics_path is not None:
+            write_snapshot(self.metrics_snapshot(), self.metrics_path)
 
         if len(self.nodes) > 0:
             self.teardown_tasks = [asyncio.ensure_future(self.teardown())]
-            for node in self.nodes:
-                self.teardown_tasks.append(asyncio.ensure_future(node.teardown()))
+            for node in self.local_nodes:
+                self.teardown_tasks.append(asyncio.ensure_future(
+                    MeteredCoroutine(node.teardown(), None, self.profiler, "%s.teardown" % node)))
                 node._internal_teardown()
+            if len(self.node_processes) > 0:
+                self.teardown_tasks.append(asyncio.ensure_future(self._stop_node_processes()))
+            if self.metrics_server is not None:
+                self.teardown_tasks.append(asyncio.ensure_future(self.metrics_server.stop()))
+            if self.profiler.enabled:
+                self.teardown_tasks.append(asyncio.ensure_future(self._stop_profiling_after(self.teardown_tasks[:])))
 
             return asyncio.wait(self.teardown_tasks, return_when=asyncio.ALL_COMPLETED)
 
@@ -107,14 +287,23 @@ class Orchestrator:
         """First call each node's startup task then return the collected node coroutines to run indefinitely"""
         self.exit_event.clear()
 
+        self._start_node_processes()
+
         self.logger.debug("Applying subscriptions")
-        for node in self.nodes:
+        for node in self.local_nodes:
             node.take()
+            node.profiler = self.profiler
+
+        if self.tracer is not None:
+            self.tracer.attach(self.local_nodes)
 
         self.logger.debug("Adding setup tasks")
         setup_tasks = [asyncio.ensure_future(self.setup())]
-        for node in self.nodes:
-            setup_tasks.append(asyncio.ensure_future(node.setup()))
+        if self.metrics_server is not None:
+            setup_tasks.append(asyncio.ensure_future(self.metrics_server.start()))
+        for node in self.local_nodes:
+            setup_tasks.append(asyncio.ensure_future(
+                MeteredCoroutine(node.setup(), None, self.profiler, "%s.setup" % node)))
 
         self.logger.debug("Running set up tasks (%s). %s and orchestrator setup" % (len(setup_tasks), self.nodes))
         self.event_loop.run_until_complete(asyncio.wait(setup_tasks, return_when=asyncio.ALL_COMPLETED))
@@ -136,10 +325,20 @@ class Orchestrator:
 
         self.logger.debug("Adding loop tasks")
         self.loop_tasks.append(asyncio.ensure_future(self.loop()))
-        for node in self.nodes:
+        if self.tracer is not None and self.tracer.report_interval is not None:
+            self.loop_tasks.append(asyncio.ensure_future(self.tracer.report_forever()))
+        if self.metrics_path is not None:
+            self.loop_tasks.append(asyncio.ensure_future(self._write_metrics_forever()))
+        if (self.metrics_path is not None or self.metrics_server is not None) and self.loop_lag_interval is not None:
+            self.loop_tasks.append(asyncio.ensure_future(self._measure_loop_lag_forever()))
+        for node_process in self.node_processes.values():
+            self.loop_tasks.append(asyncio.ensure_future(self._wait_for_process(node_process)))
+        for node in self.local_nodes:
             if node.enable_loop_fn:
                 self.logger.debug("Appending %s's loop task" % node)
-                self.loop_tasks.append(asyncio.ensure_future(node.loop()))
+                loop_step_time = node.metrics.histogram("loop_step_time")
+                self.loop_tasks.append(asyncio.ensure_future(
+                    MeteredCoroutine(node.loop(), loop_step_time, self.profiler, "%s.loop" % node)))
             else:
                 self.logger.debug("%s has a disabled loop function" % node)
 
@@ -172,49 +371,6 @@ class Orchestrator:
 
     # ----- subscription methods -----
 
-    def _check_services(self, subscription, producer, consumer, tag):
-        if subscription.requested_service not in producer.services:
-            raise ValueError("Consumer '%s' is requesting a service '%s' with tag '%s' "
-                             "which producer '%s' does not provide" % (
-                consumer, subscription.requested_service, tag, producer
-            ))
-
-    def _check_attributes(self, subscription, producer, consumer):
-        if subscription.required_attributes is not None:
-            missing_attributes = []
-            for attribute_name in subscription.required_attributes:
-                if not hasattr(producer, attribute_name):
-                    missing_attributes.append(attribute_name)
-
-            if len(missing_attributes) > 0:
-                raise ValueError("Producer '%s' is missing attributes requested by consumer '%s': %s" % (
-                    producer, consumer, str(missing_attributes)[1:-1]
-                ))
-
-    def _check_methods(self, subscription, producer, consumer):
-        if subscription.required_methods is not None:
-            missing_methods = []
-            for method_name in subscription.required_methods:
-                if not hasattr(producer, method_name) or not callable(getattr(producer, method_name)):
-                    missing_methods.append(method_name)
-
-            if len(missing_methods) > 0:
-                raise ValueError("Producer '%s' is missing methods requested by consumer '%s': %s" % (
-                    producer, consumer, str(missing_methods)[1:-1]
-                ))
-
-    def _check_producer_type(self, subscription, producer, consumer):
-        if subscription.expected_producer_classes is not None:
-            satisfied = False
-            for expected_producer_class in subscription.expected_producer_classes:
-                if isinstance(producer, expected_producer_class):
-                    satisfied = True
-
-            if not satisfied:
-                raise ValueError("Producer '%s' is not of the expected type(s) %s that consumer '%s' requested" % (
-                    producer, subscription.expected_producer_classes, consumer
-                ))
-
     def subscribe(self, producer, consumer, tag, service=None, message_converter=None):
         """Define a producer-consumer relationship between two nodes. """
 
@@ -242,10 +398,7 @@ class Orchestrator:
             if subscription.tag == tag:
                 if service is not None:
                     subscription.requested_service = service
-                self._check_services(subscription, producer, consumer, tag)
-                self._check_attributes(subscription, producer, consumer)
-                self._check_methods(subscription, producer, consumer)
-                self._check_producer_type(subscription, producer, consumer)
+                producer.accept_subscription(subscription, consumer)
 
                 matched_subscription = subscription
 
@@ -267,8 +420,16 @@ class Orchestrator:
         return self.name
 
 
-def run(OrchestratorClass):
-    asyncio.set_event_loop(asyncio.new_event_loop())
+def run(OrchestratorClass, virtual_time=False):
+    """
+    Run the orchestrator until its nodes finish or the user interrupts.
+    If virtual_time is True, time jumps forward whenever every node is waiting on a timer (see VirtualTimeEventLoop).
+    Useful for replaying logs and simulations faster than real time
+    """
+    if virtual_time:
+        asyncio.set_event_loop(VirtualTimeEventLoop())
+    else:
+        asyncio.set_event_loop(asyncio.new_event_loop())
     loop = asyncio.get_event_loop()
     orchestrator = OrchestratorClass(loop)
 
@@ -0,0 +1,194 @@
+import sys
+import time
+import asyncio
+import threading
+import traceback
+
+from .tracing import LatencySamples
+
+
+class StepStats:
+    """Wall time one coroutine or callback spent holding the event loop"""
+
+    __slots__ = ("total", "count", "max")
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+
+class LoopProfiler:
+    """
+    Finds out who is blocking the event loop.
+
+    While enabled, every step of each node's setup, loop, and teardown coroutines (the code between two awaits) and
+    every subscription callback is timed and attributed to a label like "OpenCVCamera.loop". Times are inclusive: a
+    callback run by a broadcast also counts toward the step that broadcast. The event loop's lag (how late a
+    sleep of lag_interval seconds wakes up) is measured alongside.
+
+    A watchdog thread samples the event loop thread's stack when a step runs longer than threshold seconds, so the
+    worst offenders are reported with the line that was blocking. Enable and disable at any time. Nothing is
+    measured while disabled beyond a flag check per step.
+    """
+
+    def __init__(self, logger, threshold=0.05, lag_interval=0.1, report_interval=10.0, num_offenders=5):
+        self.logger = logger
+        self.threshold = threshold
+        self.lag_interval = lag_interval
+        self.report_interval = report_interval
+        self.num_offenders = num_offenders
+
+        self.enabled = False
+        self.running = None  # (label, start time, step id) of the step holding the event loop
+        self._step_id = 0
+
+        self.stats = {}  # label -> StepStats
+        self.lag = LatencySamples()
+        self.max_lag = 0.0
+        self.offenders = []  # (duration, label, stack) of the slowest steps over threshold
+        self.samples = {}  # step id -> stack sampled by the watchdog
+        self.start_time = None
+
+        self._loop_thread_id = None
+        self._watchdog = None
+        self._stop_watching = threading.Event()
+        self._tasks = []
+
+    def enter(self, label):
+        previous = self.running
+        self._step_id += 1
+        self.running = (label, time.perf_counter(), self._step_id)
+        return previous
+
+    def exit(self, previous):
+        label, start_time, step_id = self.running
+        duration = time.perf_counter() - start_time
+        self.running = previous
+
+        stats = self.stats.get(label)
+        if stats is None:
+            stats = StepStats()
+            self.stats[label] = stats
+        stats.total += duration
+        stats.count += 1
+        if duration > stats.max:
+            stats.max = duration
+
+        if duration > self.threshold:
+            self._add_offender(duration, label, self.samples.pop(step_id, None))
+
+    def _add_offender(self, duration, label, stack):
+        if len(self.offenders) < self.num_offenders:
+            self.offenders.append((duration, label, stack))
+        elif duration > self.offenders[-1][0]:
+            self.offenders[-1] = (duration, label, stack)
+        else:
+            return
+        self.offenders.sort(key=lambda offender: offender[0], reverse=True)
+
+    def _watch(self):
+        while not self._stop_watching.wait(self.threshold / 2):
+            running = self.running
+            if running is None:
+                continue
+            label, start_time, step_id = running
+            if time.perf_counter() - start_time > self.threshold and step_id not in self.samples:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self.samples[step_id] = self._format_stack(frame)
+
+    @staticmethod
+    def _format_stack(frame):
+        stack = traceback.extract_stack(frame)
+        # leave out the event loop's frames and MeteredCoroutine's. Start at the node's coroutine
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index].name == "_step" and stack[index].filename.endswith("metrics.py"):
+                stack = stack[index + 1:]
+                break
+        return "".join(traceback.format_list(stack))
+
+    @asyncio.coroutine
+    def _measure_lag(self):
+        while True:
+            start_time = time.perf_counter()
+            yield from asyncio.sleep(self.lag_interval)
+            lag = max(0.0, time.perf_counter() - start_time - self.lag_interval)
+            self.lag.add(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    @asyncio.coroutine
+    def _report_forever(self):
+        while True:
+            yield from asyncio.sleep(self.report_interval)
+            self.log_report()
+
+    def start(self):
+        """Call from the event loop's thread"""
+        if self.enabled:
+            return
+        self.reset()
+        self.enabled = True
+        self._loop_thread_id = threading.get_ident()
+
+        self._stop_watching.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-profiler", daemon=True)
+        self._watchdog.start()
+
+        self._tasks = [asyncio.ensure_future(self._measure_lag())]
+        if self.report_interval is not None:
+            self._tasks.append(asyncio.ensure_future(self._report_forever()))
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop_watching.set()
+        self._watchdog.join()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def reset(self):
+        self.stats = {}
+        self.lag = LatencySamples()
+        self.max_lag = 0.0
+        self.offenders = []
+        self.samples = {}
+        self.start_time = time.perf_counter()
+
+    def report(self):
+        """Event loop lag percentiles, time per label (sorted, most first), and the worst offenders with stacks"""
+        p50, p99 = self.lag.percentiles(50, 99)
+        elapsed = time.perf_counter() - self.start_time
+        return dict(
+            elapsed=elapsed,
+            lag=dict(p50=p50, p99=p99, max=self.max_lag),
+            steps=[
+                dict(label=label, total=stats.total, fraction=stats.total / elapsed, count=stats.count,
+                     max=stats.max)
+                for label, stats in sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+            ],
+            offenders=[dict(duration=duration, label=label, stack=stack)
+                       for duration, label, stack in self.offenders],
+        )
+
+    def log_report(self):
+        report = self.report()
+        lag = report["lag"]
+        if lag["p50"] is not None:
+            self.logger.info("event loop lag p50=%0.2fms p99=%0.2fms max=%0.2fms over %0.1fs" % (
+                lag["p50"] * 1E3, lag["p99"] * 1E3, lag["max"] * 1E3, report["elapsed"]))
+
+        for step in report["steps"]:
+            self.logger.info("%s held the event loop %0.1f%% of the time (%0.3fs in %s steps, longest %0.2fms)" % (
+                step["label"], step["fraction"] * 100, step["total"], step["count"], step["max"] * 1E3))
+
+        for offender in report["offenders"]:
+            if offender["stack"] is None:
+                stack = "(not sampled)\n"
+            else:
+                stack = offender["stack"]
+            self.logger.warning("%s blocked the event loop for %0.2fms in:\n%s" % (
+                offender["label"], offender["duration"] * 1E3, stack))
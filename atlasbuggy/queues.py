@@ -0,0 +1,183 @@
+import asyncio
+import collections
+
+
+class RingBufferQueue:
+    """
+    A deque backed queue that decides what happens to new messages when it's full based on its policy:
+        drop_oldest - discard the oldest message to make room
+        drop_newest - discard the message being put
+        block - put waits for room. put_nowait raises asyncio.QueueFull
+        raise - put and put_nowait raise asyncio.QueueFull
+    Discarded messages are counted in num_dropped. Mirrors the parts of asyncio.Queue's interface that nodes use.
+    """
+
+    policies = ("drop_oldest", "drop_newest", "block", "raise")
+
+    def __init__(self, maxsize=0, policy="drop_oldest", loop=None):
+        if policy not in self.policies:
+            raise ValueError("Queue policy '%s' isn't one of %s" % (policy, self.policies))
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        self._loop = loop
+
+        self._maxsize = maxsize
+        self.policy = policy
+
+        self._queue = collections.deque()
+        self._getters = collections.deque()
+        self._putters = collections.deque()
+
+        self.num_dropped = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    def qsize(self):
+        return len(self._queue)
+
+    def empty(self):
+        return not self._queue
+
+    def full(self):
+        if self._maxsize <= 0:
+            return False
+        else:
+            return len(self._queue) >= self._maxsize
+
+    @staticmethod
+    def _wakeup_next(waiters):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    def put_nowait(self, message):
+        if self.full():
+            if self.policy == "drop_oldest":
+                self._queue.popleft()
+                self.num_dropped += 1
+            elif self.policy == "drop_newest":
+                self.num_dropped += 1
+                return
+            else:
+                raise asyncio.QueueFull
+
+        self._queue.append(message)
+        self._wakeup_next(self._getters)
+
+    @asyncio.coroutine
+    def put(self, message):
+        while self.policy == "block" and self.full():
+            putter = self._loop.create_future()
+            self._putters.append(putter)
+            try:
+                yield from putter
+            except:
+                putter.cancel()
+                if not self.full() and not putter.cancelled():
+                    self._wakeup_next(self._putters)
+                raise
+        self.put_nowait(message)
+
+    def put_many_nowait(self, messages):
+        """
+        Put a sequence of messages following the queue's policy, waking waiting getters once at the end.
+        Returns how many messages were queued. With the block and raise policies, that stops at the first message
+        that doesn't fit instead of raising
+        """
+        queue = self._queue
+        num_messages = len(messages)
+        if self._maxsize <= 0:
+            queue.extend(messages)
+            num_put = num_messages
+        elif self.policy == "drop_oldest":
+            if num_messages >= self._maxsize:
+                self.num_dropped += len(queue) + num_messages - self._maxsize
+                queue.clear()
+                queue.extend(messages[num_messages - self._maxsize:])
+            else:
+                queue.extend(messages)
+                while len(queue) > self._maxsize:
+                    queue.popleft()
+                    self.num_dropped += 1
+            num_put = num_messages
+        else:
+            num_put = min(num_messages, max(self._maxsize - len(queue), 0))
+            queue.extend(messages[:num_put])
+            if self.policy == "drop_newest":
+                self.num_dropped += num_messages - num_put
+                num_put = num_messages
+
+        for _ in range(min(len(queue), len(self._getters))):
+            self._wakeup_next(self._getters)
+        return num_put
+
+    @asyncio.coroutine
+    def put_many(self, messages):
+        """put_many_nowait that waits for room instead of stopping early if the policy is block"""
+        num_put = self.put_many_nowait(messages)
+        while self.policy == "block" and num_put < len(messages):
+            putter = self._loop.create_future()
+            self._putters.append(putter)
+            try:
+                yield from putter
+            except:
+                putter.cancel()
+                if not self.full() and not putter.cancelled():
+                    self._wakeup_next(self._putters)
+                raise
+            num_put += self.put_many_nowait(messages[num_put:])
+        return num_put
+
+    def get_nowait(self):
+        if not self._queue:
+            raise asyncio.QueueEmpty
+        message = self._queue.popleft()
+        self._wakeup_next(self._putters)
+        return message
+
+    @asyncio.coroutine
+    def get(self):
+        while not self._queue:
+            getter = self._loop.create_future()
+            self._getters.append(getter)
+            try:
+                yield from getter
+            except:
+                getter.cancel()
+                if self._queue and not getter.cancelled():
+                    self._wakeup_next(self._getters)
+                raise
+        return self.get_nowait()
+
+    @asyncio.coroutine
+    def get_batch(self, max_n=None):
+        """Wait for at least one message then return a list of up to max_n messages (every message if None)"""
+        if not self._queue:
+            message = yield from self.get()
+            batch = [message]
+        else:
+            batch = []
+
+        while self._queue and (max_n is None or len(batch) < max_n):
+            batch.append(self._queue.popleft())
+            self._wakeup_next(self._putters)
+        return batch
+
+    def __str__(self):
+        return "%s<size=%s, maxsize=%s, policy=%s, dropped=%s>" % (
+            self.__class__.__name__, len(self._queue), self._maxsize, self.policy, self.num_dropped
+        )
+
+
+class LatestMessageQueue(RingBufferQueue):
+    """
+    A queue that only holds the newest message. Putting a message overwrites the one waiting (if any)
+    so producers never block and consumers always get the freshest message.
+    """
+
+    def __init__(self, loop=None):
+        super(LatestMessageQueue, self).__init__(1, "drop_oldest", loop)
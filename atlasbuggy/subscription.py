@@ -1,5 +1,8 @@
 import asyncio
 
+from .metrics import MetricsRegistry
+from .queues import RingBufferQueue, LatestMessageQueue
+
 
 def wrap_iter(iterable):
     if iterable is not None:
@@ -12,10 +15,17 @@ def wrap_iter(iterable):
 
 
 class Subscription:
+    # queue: every message is put on an asyncio.Queue of size queue_size
+    # latest: only the newest message is held. Producers overwrite it and never block
+    modes = ("queue", "latest")
+
     def __init__(self, tag, requested_service, is_required, expected_message_types, expected_producer_classes, queue_size,
-                 error_on_full_queue, required_attributes, required_methods, callback, callback_args):
+                 error_on_full_queue, required_attributes, required_methods, callback, callback_args, mode="queue",
+                 queue_policy=None):
         self.tag = tag
-        self.enabled = True
+        self.producer_node = None
+        self.consumer_node = None
+        self._enabled = True
         self.requested_service = requested_service
         self.expected_message_types = expected_message_types
         self.expected_producer_classes = expected_producer_classes
@@ -25,14 +35,18 @@ class Subscription:
         self.required_methods = required_methods
         self.callback = callback
         self.callback_args = callback_args
+        self.mode = mode
+        self.queue_policy = queue_policy
 
+        if self.mode not in self.modes:
+            raise ValueError("Subscription mode '%s' isn't one of %s" % (self.mode, self.modes))
+        if self.queue_policy is not None and self.queue_policy not in RingBufferQueue.policies:
+            raise ValueError("Queue policy '%s' isn't one of %s" % (self.queue_policy, RingBufferQueue.policies))
         if self.callback is not None and not callable(self.callback):
             raise ValueError("Object '%s' is not a function." % self.callback)
         if self.callback_args is not None and type(self.callback_args) != tuple:
             raise ValueError("Callback args is not a tuple: '%s'" % self.callback_args)
 
-        self.producer_node = None
-        self.consumer_node = None
         self.queue = None
         self.message_converter = None
         self.is_required = is_required
@@ -40,6 +54,57 @@ class Subscription:
         self.expected_message_types = wrap_iter(self.expected_message_types)
         self.expected_producer_classes = wrap_iter(self.expected_producer_classes)
 
+        # messages producers couldn't put on the queue because it was full
+        self.num_rejected = 0
+
+        self.trace = None  # EdgeTrace assigned by the orchestrator if latency tracing is on
+
+        self.metrics = MetricsRegistry()
+        self.messages_delivered = self.metrics.counter("messages_delivered")  # put on the queue or given to callback
+        self.messages_received = self.metrics.counter("messages_received")  # taken by the consumer
+        self.metrics.gauge("messages_dropped", lambda: self.num_dropped)
+        self.metrics.gauge("queue_depth", lambda: 0 if self.queue is None else self.queue.qsize())
+
+        # message class -> whether it satisfies expected_message_types. Filled in as new classes are broadcast
+        self._message_type_cache = {}
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value):
+        self._enabled = value
+        if self.producer_node is not None:
+            self.producer_node.update_routing_table()
+
+    @property
+    def num_dropped(self):
+        """Number of messages that never reached the consumer because its queue was full"""
+        num_dropped = self.num_rejected
+        if isinstance(self.queue, RingBufferQueue):
+            num_dropped += self.queue.num_dropped
+        return num_dropped
+
+    def is_expected_message(self, message):
+        """Check the message against expected_message_types. The result is cached per message class"""
+        message_class = message.__class__
+        try:
+            return self._message_type_cache[message_class]
+        except KeyError:
+            pass
+
+        if self.expected_message_types is None:
+            satisfied = True
+        else:
+            satisfied = False
+            for expected_message_type in self.expected_message_types:
+                if isinstance(message, expected_message_type):
+                    satisfied = True
+                    break
+        self._message_type_cache[message_class] = satisfied
+        return satisfied
+
     def set_nodes(self, producer, consumer):
         self.producer_node = producer
         self.consumer_node = consumer
@@ -50,9 +115,55 @@ class Subscription:
                 raise ValueError("Subscription '%s' not applied!! "
                                  "Please call subscribe() in your orchestrator class" % self)
 
+    def check_producer(self, producer, consumer):
+        """Raise ValueError if producer can't satisfy this subscription's requirements"""
+        if self.requested_service not in producer.services:
+            raise ValueError("Consumer '%s' is requesting a service '%s' with tag '%s' "
+                             "which producer '%s' does not provide" % (
+                consumer, self.requested_service, self.tag, producer
+            ))
+
+        if self.required_attributes is not None:
+            missing_attributes = []
+            for attribute_name in self.required_attributes:
+                if not hasattr(producer, attribute_name):
+                    missing_attributes.append(attribute_name)
+
+            if len(missing_attributes) > 0:
+                raise ValueError("Producer '%s' is missing attributes requested by consumer '%s': %s" % (
+                    producer, consumer, str(missing_attributes)[1:-1]
+                ))
+
+        if self.required_methods is not None:
+            missing_methods = []
+            for method_name in self.required_methods:
+                if not hasattr(producer, method_name) or not callable(getattr(producer, method_name)):
+                    missing_methods.append(method_name)
+
+            if len(missing_methods) > 0:
+                raise ValueError("Producer '%s' is missing methods requested by consumer '%s': %s" % (
+                    producer, consumer, str(missing_methods)[1:-1]
+                ))
+
+        if self.expected_producer_classes is not None:
+            satisfied = False
+            for expected_producer_class in self.expected_producer_classes:
+                if isinstance(producer, expected_producer_class):
+                    satisfied = True
+
+            if not satisfied:
+                raise ValueError("Producer '%s' is not of the expected type(s) %s that consumer '%s' requested" % (
+                    producer, self.expected_producer_classes, consumer
+                ))
+
     def set_event_loop(self, event_loop):
         if self.queue_size is not None:
-            self.queue = asyncio.Queue(self.queue_size, loop=event_loop)
+            if self.mode == "latest":
+                self.queue = LatestMessageQueue(loop=event_loop)
+            elif self.queue_policy is not None:
+                self.queue = RingBufferQueue(self.queue_size, self.queue_policy, loop=event_loop)
+            else:
+                self.queue = asyncio.Queue(self.queue_size, loop=event_loop)
 
     @asyncio.coroutine
     def broadcast(self, message):
@@ -64,10 +175,77 @@ class Subscription:
             raise ValueError("The subscription '%s' was defined to not have a queue!" % self)
         return self.queue
 
+    @asyncio.coroutine
+    def get_latest(self):
+        """Wait for a message then return the newest one available. Older queued messages are discarded"""
+        queue = self.get_queue()
+        message = yield from queue.get()
+        while not queue.empty():
+            message = queue.get_nowait()
+        self.messages_received.inc()
+        if self.trace is not None:
+            self.trace.dequeued(message)
+        return message
+
+    @asyncio.coroutine
+    def get_batch(self, max_n=None):
+        """Wait for at least one message then return a list of up to max_n queued messages (every message if None)"""
+        queue = self.get_queue()
+        if isinstance(queue, RingBufferQueue):
+            batch = yield from queue.get_batch(max_n)
+        else:
+            message = yield from queue.get()
+            batch = [message]
+            while not queue.empty() and (max_n is None or len(batch) < max_n):
+                batch.append(queue.get_nowait())
+
+        self.messages_received.inc(len(batch))
+        if self.trace is not None:
+            for message in batch:
+                self.trace.dequeued(message)
+        return batch
+
+    @asyncio.coroutine
+    def _get(self):
+        message = yield from self.get_queue().get()
+        self.messages_received.inc()
+        if self.trace is not None:
+            self.trace.dequeued(message)
+        return message
+
+    @asyncio.coroutine
+    def wait(self, timeout=None):
+        """
+        Block until the producer broadcasts and return the message. Subscriptions in "latest" mode return the newest
+        message. Raises asyncio.TimeoutError if timeout (seconds) is given and expires first.
+        """
+        if self.mode == "latest":
+            next_message = self.get_latest()
+        else:
+            next_message = self._get()
+
+        if timeout is None:
+            message = yield from next_message
+        else:
+            message = yield from asyncio.wait_for(next_message, timeout)
+        return message
+
+    def __aiter__(self):
+        return self
+
+    @asyncio.coroutine
+    def __anext__(self):
+        message = yield from self.wait()
+        return message
+
     def get_producer(self):
         self.check_subscription()
         return self.producer_node
 
+    @property
+    def name(self):
+        return "%s -> %s (%s)" % (self.producer_node, self.consumer_node, self.tag)
+
     def __str__(self):
         return "%s<tag=%s, service=%s, enabled=%s, consumer=%s, producer=%s>" % (
             self.__class__.__name__, self.tag, self.requested_service, self.enabled, self.consumer_node, self.producer_node
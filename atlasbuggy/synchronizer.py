@@ -0,0 +1,124 @@
+import asyncio
+import collections
+
+from .node import Node
+
+
+class ApproximateTimeMatcher:
+    """
+    Matches messages from num_inputs inputs whose timestamps are all within tolerance seconds of each other.
+
+    Each input is buffered in timestamp order in a deque of at most buffer_size messages. Matching only looks at the
+    front of each buffer: the latest front message is the pivot and every other input contributes the message closest
+    to it. If those are within tolerance they're matched and removed with everything older. If not, the oldest one
+    can't match anything that's still to come and is discarded. Every message is removed at most once so matching
+    costs amortized O(num_inputs) per message no matter how different the input rates are.
+    """
+
+    def __init__(self, num_inputs, tolerance, buffer_size=256):
+        if num_inputs < 2:
+            raise ValueError("At least two inputs are needed to synchronize messages, got %s" % num_inputs)
+        if tolerance < 0:
+            raise ValueError("Tolerance can't be negative: %s" % tolerance)
+
+        self.num_inputs = num_inputs
+        self.tolerance = tolerance
+        self.buffer_size = buffer_size
+        self.buffers = [collections.deque() for _ in range(num_inputs)]
+
+        self.num_matched = 0
+        self.num_dropped = 0  # messages that were too old to match or pushed out of a full buffer
+
+    def add(self, index, message):
+        """Buffer a message from input index. Returns a list of the tuples of messages it completed"""
+        buffer = self.buffers[index]
+        if self.buffer_size is not None and len(buffer) >= self.buffer_size:
+            buffer.popleft()
+            self.num_dropped += 1
+
+        if len(buffer) == 0 or buffer[-1].timestamp <= message.timestamp:
+            buffer.append(message)
+        else:
+            # out of order. Search from the back since it's likely only a little late
+            position = len(buffer)
+            while position > 0 and buffer[position - 1].timestamp > message.timestamp:
+                position -= 1
+            buffer.insert(position, message)
+
+        return self.match()
+
+    def match(self):
+        matches = []
+        buffers = self.buffers
+        while all(buffers):
+            pivot_time = max(buffer[0].timestamp for buffer in buffers)
+
+            chosen = []
+            for buffer in buffers:
+                # the front can't be the closest if the message after it isn't newer than the pivot
+                while len(buffer) >= 2 and buffer[1].timestamp <= pivot_time:
+                    buffer.popleft()
+                    self.num_dropped += 1
+
+                if buffer[0].timestamp == pivot_time:
+                    chosen.append(0)
+                elif len(buffer) >= 2:
+                    if pivot_time - buffer[0].timestamp <= buffer[1].timestamp - pivot_time:
+                        chosen.append(0)
+                    else:
+                        chosen.append(1)
+                else:
+                    return matches  # the next message on this input might be closer. Wait for it
+
+            messages = [buffer[position] for buffer, position in zip(buffers, chosen)]
+            times = [message.timestamp for message in messages]
+            if max(times) - min(times) <= self.tolerance:
+                for buffer, position in zip(buffers, chosen):
+                    for _ in range(position + 1):
+                        buffer.popleft()
+                    self.num_dropped += position
+                matches.append(tuple(messages))
+                self.num_matched += 1
+            else:
+                oldest = times.index(min(times))
+                for _ in range(chosen[oldest] + 1):
+                    buffers[oldest].popleft()
+                self.num_dropped += chosen[oldest] + 1
+
+        return matches
+
+    def clear(self):
+        for buffer in self.buffers:
+            buffer.clear()
+
+
+class Synchronizer(Node):
+    """
+    Subscribes to a producer for every tag and broadcasts a tuple of messages (in the order of tags) whenever every
+    producer has sent a message within tolerance seconds of the others. Messages need a timestamp attribute.
+
+    Subscribe consumers to this node for the tuples and this node to each producer with its tag:
+        synchronizer = Synchronizer(("imu", "gps"), tolerance=0.005)
+        self.subscribe(imu, synchronizer, "imu")
+        self.subscribe(gps, synchronizer, "gps")
+        self.subscribe(synchronizer, consumer, consumer.synchronizer_tag)
+    """
+
+    def __init__(self, tags, tolerance, buffer_size=256, enabled=True, name=None, logger=None):
+        super(Synchronizer, self).__init__(enabled, name, logger)
+
+        self.tags = tuple(tags)
+        self.matcher = ApproximateTimeMatcher(len(self.tags), tolerance, buffer_size)
+
+        self.subscriptions = []
+        for index, tag in enumerate(self.tags):
+            self.subscriptions.append(self.define_subscription(tag, callback=self.receive, callback_args=(index,)))
+
+    def receive(self, message, index):
+        for messages in self.matcher.add(index, message):
+            self.broadcast_nowait(messages)
+
+    @asyncio.coroutine
+    def teardown(self):
+        self.logger.info("matched %s sets of messages, dropped %s messages" % (
+            self.matcher.num_matched, self.matcher.num_dropped))
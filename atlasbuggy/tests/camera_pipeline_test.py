@@ -0,0 +1,119 @@
+"""
+Runs OpenCVCamera -> OpenCVPipeline -> OpenCVViewer on a fake capture that's faster than the pipeline. Both consumers
+subscribe in latest mode, so they should skip stale frames and always get the newest one.
+Needs OpenCV (the headless package is enough). Run with: python camera_pipeline_test.py
+"""
+
+import time
+import asyncio
+import numpy as np
+
+from atlasbuggy import Orchestrator, run
+from atlasbuggy.opencv import OpenCVCamera, OpenCVPipeline, OpenCVViewer
+
+
+class FakeCapture:
+    """Stands in for cv2.VideoCapture. Frames are numbered by their first pixel"""
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.num_read = 0
+
+    def read(self):
+        time.sleep(1 / self.fps)  # a real capture blocks until the next frame too
+        frame = np.full((24, 32, 3), self.num_read % 256, dtype=np.uint8)
+        self.num_read += 1
+        return True, frame
+
+    def get(self, prop):
+        return self.fps
+
+    def set(self, prop, value):
+        pass
+
+    def release(self):
+        pass
+
+
+class SlowPipeline(OpenCVPipeline):
+    def __init__(self, capture):
+        super(SlowPipeline, self).__init__()
+        self.fake_capture = capture
+        self.received = []
+
+    @asyncio.coroutine
+    def pipeline(self, message):
+        # the camera broadcasts as soon as it reads. The newest frame is the last one read minus the setup read
+        self.received.append((message.n, self.fake_capture.num_read - 2))
+        assert message.image[0, 0, 0] == (message.n + 1) % 256
+        yield from asyncio.sleep(0.02)
+        return None
+
+
+class HeadlessViewer(OpenCVViewer):
+    """Records what it would show. There's no display to open windows on"""
+
+    def __init__(self, pipeline, num_frames):
+        super(HeadlessViewer, self).__init__(enabled=False)  # skips opening a window
+        self.enabled = True
+        self.pipeline = pipeline
+        self.num_frames = num_frames
+        self.received = []
+
+    @asyncio.coroutine
+    def setup(self):
+        pass
+
+    def key_pressed(self, delay=1):
+        if len(self.received) >= self.num_frames:
+            return False
+
+    def draw(self, frame):
+        self.received.append((self.capture_sub.get_producer()._num_frames, self.pipeline._num_frames))
+        return None
+
+
+class PipelineOrchestrator(Orchestrator):
+    def __init__(self, event_loop):
+        self.set_default(write=False)
+        super(PipelineOrchestrator, self).__init__(event_loop)
+
+        self.capture = FakeCapture(fps=500.0)
+        OpenCVCamera.captures["fake"] = self.capture
+
+        self.camera = OpenCVCamera(capture_number="fake")
+        self.pipeline = SlowPipeline(self.capture)
+        self.viewer = HeadlessViewer(self.pipeline, num_frames=20)
+
+        self.add_nodes(self.camera, self.pipeline, self.viewer)
+        self.subscribe(self.camera, self.pipeline, self.pipeline.capture_tag)
+        self.subscribe(self.pipeline, self.viewer, self.viewer.capture_tag)
+
+
+def test_latest_mode_skips_stale_frames():
+    orchestrator = None
+
+    class CheckedOrchestrator(PipelineOrchestrator):
+        def __init__(self, event_loop):
+            nonlocal orchestrator
+            super(CheckedOrchestrator, self).__init__(event_loop)
+            orchestrator = self
+
+    run(CheckedOrchestrator)
+
+    pipeline_frames = [n for n, newest in orchestrator.pipeline.received]
+    num_captured = orchestrator.capture.num_read - 1
+    print("captured %s frames, the pipeline processed %s: %s" % (num_captured, len(pipeline_frames), pipeline_frames))
+
+    assert len(orchestrator.viewer.received) >= 20
+    assert pipeline_frames == sorted(set(pipeline_frames)), "frames arrive in order and only once"
+    assert len(pipeline_frames) < num_captured / 2, "stale frames were skipped"
+    for n, newest in orchestrator.pipeline.received:
+        assert n == newest, "the pipeline got frame %s while frame %s was available" % (n, newest)
+    for shown, newest in orchestrator.viewer.received:
+        assert shown == newest, "the viewer showed frame %s while frame %s was available" % (shown, newest)
+
+
+if __name__ == "__main__":
+    test_latest_mode_skips_stale_frames()
+    print("camera pipeline tests passed")
@@ -0,0 +1,138 @@
+"""
+Checks that messages survive codec.dumps and codec.loads: schema messages, auto serialized messages, versions and
+messages that aren't registered.
+Run with: python codec_test.py
+"""
+
+import numpy as np
+
+from atlasbuggy import Message, SchemaMessage, codec
+
+
+class PoseMessage(SchemaMessage):
+    schema = dict(x=float, y=float, count=int, valid=bool, label=str, raw=bytes, points=(np.ndarray, np.zeros(0)),
+                  extra=(dict, {}))
+
+
+class AutoMessage(Message, auto_serialize=True):
+    def __init__(self, n, timestamp=None):
+        super(AutoMessage, self).__init__(n, timestamp)
+        self.speed = 0.0
+        self.gear = 0
+
+
+class OldPoseMessage(SchemaMessage):
+    schema = dict(x=float, y=float, heading=(float, 0.0))
+
+
+class UnregisteredMessage(SchemaMessage):
+    schema = dict(value=float)
+
+
+codec.register(PoseMessage, 100)
+codec.register(AutoMessage, 101)
+codec.register(OldPoseMessage, 102, version=1, fields=[("x", float), ("y", float)])
+codec.register(OldPoseMessage, 102, version=2)
+
+
+def make_pose(n):
+    return PoseMessage(n, 1500000000.0 + n, x=n * 0.5, y=-n * 0.25, count=n, valid=n % 2 == 0, label="pose %s" % n,
+                       raw=bytes([n % 256]) * 3, points=np.arange(6, dtype=np.float32).reshape(2, 3) * n,
+                       extra={"n": n})
+
+
+def test_schema_round_trip():
+    message = make_pose(3)
+    decoded = codec.loads(codec.dumps(message))
+    assert type(decoded) is PoseMessage
+    assert (decoded.n, decoded.timestamp) == (3, 1500000003.0)
+    assert decoded == message, "%s != %s" % (decoded, message)
+    assert decoded.points.dtype == np.float32 and decoded.points.shape == (2, 3)
+    assert decoded.points.flags.writeable, "decoded arrays are copies, not views of the data"
+
+    empty = PoseMessage(0, 1.0)
+    assert codec.loads(codec.dumps(empty)) == empty
+
+
+def test_auto_serialized_round_trip():
+    message = AutoMessage(5, 2.0)
+    message.speed = 3.5
+    message.gear = 2
+    decoded = codec.loads(codec.dumps(message))
+    assert (decoded.n, decoded.timestamp, decoded.speed, decoded.gear) == (5, 2.0, 3.5, 2)
+
+
+def test_consecutive_messages():
+    data = b"".join(codec.encode(make_pose(n)) for n in range(5))
+    offset = 0
+    for n in range(5):
+        message, offset = codec.decode(data, offset)
+        assert message == make_pose(n)
+    assert offset == len(data)
+
+
+def test_versions():
+    message = OldPoseMessage(1, 1.0, x=1.0, y=2.0, heading=3.0)
+    data = codec.dumps(message)
+    assert codec.header.unpack_from(data) == (102, 2), "the highest version encodes"
+    assert codec.loads(data).heading == 3.0
+
+    old_data = codec._codecs[(102, 1)].encode(message)
+    old_message = codec.loads(old_data)
+    assert (old_message.x, old_message.y, old_message.heading) == (1.0, 2.0, 0.0), "missing fields get defaults"
+
+
+def test_unregistered_messages_are_pickled():
+    message = UnregisteredMessage(1, 1.0, value=2.0)
+    data = codec.dumps(message)
+    assert codec.header.unpack_from(data)[0] == codec.PICKLE_TYPE_ID
+    assert codec.loads(data) == message
+    try:
+        codec.encode(message)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("encode only takes registered messages")
+
+
+def test_frozen_messages():
+    message = make_pose(7)
+    message.freeze()
+    decoded = codec.loads(codec.dumps(message))
+    assert codec.header.unpack_from(codec.dumps(message))[0] == 100
+    assert decoded == message
+
+
+def test_bad_registrations_and_data():
+    for arguments in ((PoseMessage, 0), (PoseMessage, 2 ** 16), (PoseMessage, 1, 256), (dict, 1)):
+        try:
+            codec.register(*arguments)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("register%s should raise ValueError" % (arguments,))
+
+    try:
+        codec.register(AutoMessage, 100)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("type IDs can't be registered to two classes")
+
+    try:
+        codec.loads(codec.header.pack(60000, 1) + b"\x00" * 16)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown type IDs should raise ValueError")
+
+
+if __name__ == "__main__":
+    test_schema_round_trip()
+    test_auto_serialized_round_trip()
+    test_consecutive_messages()
+    test_versions()
+    test_unregistered_messages_are_pickled()
+    test_frozen_messages()
+    test_bad_registrations_and_data()
+    print("codec tests passed")
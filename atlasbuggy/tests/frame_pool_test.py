@@ -0,0 +1,124 @@
+"""
+Sends ImageMessages with frames in a SharedFramePool to another process and checks the frames are mapped there (not
+copied) and their slots are released once the other process is done with them.
+Run with: python frame_pool_test.py
+"""
+
+import gc
+import time
+import pickle
+import multiprocessing
+import numpy as np
+
+from atlasbuggy.opencv import ImageMessage, SharedFramePool
+
+
+def consume(pipe):
+    while True:
+        data = pipe.recv_bytes()
+        if data == b"stop":
+            break
+        message = pickle.loads(data)
+        # write through the mapping. The sender sees it if the frame wasn't copied
+        message.image[0, 0, 0] = 255 - message.n
+        pipe.send((message.n, int(message.image.sum()), message.width, message.height))
+        del message
+        gc.collect()
+        pipe.send("released")
+
+
+def wait_for_refcount(pool, slot, expected, timeout=2.0):
+    start_time = time.time()
+    while pool.refcounts[slot] != expected:
+        if time.time() - start_time > timeout:
+            raise AssertionError("slot %s has %s references, expected %s" % (slot, pool.refcounts[slot], expected))
+        time.sleep(0.01)
+
+
+def test_constructible():
+    image = np.zeros((4, 6, 3), dtype=np.uint8)
+    message = ImageMessage(image, 1)
+    assert (message.width, message.height, message.depth) == (6, 4, 3)
+    assert ImageMessage.parse(str(message)).n == 1
+
+
+def test_frames_across_processes():
+    context = multiprocessing.get_context("fork")
+    pool = SharedFramePool.for_frames(2, 6, 4, context=context)
+    parent_pipe, child_pipe = context.Pipe()
+    process = context.Process(target=consume, args=(child_pipe,))
+    process.start()
+
+    try:
+        for n in range(5):
+            image = np.full((4, 6, 3), n, dtype=np.uint8)
+            message = ImageMessage(image, n)
+            assert message.share(pool)
+            slot = message.frame_handles["image"].slot
+            assert pool.refcounts[slot] == 1
+
+            data = pickle.dumps(message)
+            assert pool.refcounts[slot] == 2, "the copy sent to the other process holds a reference"
+            parent_pipe.send_bytes(data)
+
+            received_n, image_sum, width, height = parent_pipe.recv()
+            assert (received_n, width, height) == (n, 6, 4)
+            assert image_sum == n * (image.size - 1) + (255 - n)
+            assert message.image[0, 0, 0] == 255 - n, "the other process mapped the frame instead of copying it"
+
+            assert parent_pipe.recv() == "released"
+            wait_for_refcount(pool, slot, 1)
+
+            del message
+            gc.collect()
+            wait_for_refcount(pool, slot, 0)
+            print("frame %s: slot %s acquired and released" % (n, slot))
+
+        assert pool.num_exhausted == 0
+    finally:
+        parent_pipe.send_bytes(b"stop")
+        process.join()
+        pool.close()
+        pool.unlink()
+
+
+def test_pool_exhaustion():
+    pool = SharedFramePool.for_frames(1, 6, 4)
+    try:
+        first = ImageMessage(np.zeros((4, 6, 3), dtype=np.uint8), 0)
+        second = ImageMessage(np.zeros((4, 6, 3), dtype=np.uint8), 1)
+        assert first.share(pool)
+        assert not second.share(pool), "every slot is in use"
+        assert pool.num_exhausted == 1
+        del first
+        gc.collect()
+        assert second.share(pool)
+        del second
+        gc.collect()
+    finally:
+        pool.close()
+        pool.unlink()
+
+
+def test_release_while_locked():
+    pool = SharedFramePool.for_frames(2, 6, 4)
+    try:
+        shared_image, handle = pool.store(np.zeros((4, 6, 3), dtype=np.uint8))
+        with pool.lock:
+            # garbage collection can run finalizers while this thread holds the lock. They can't wait for it
+            del shared_image
+            assert pool.refcounts[handle.slot] == 1
+        assert pool.store(np.zeros((4, 6, 3), dtype=np.uint8)) is not None
+        assert pool.refcounts[handle.slot] == 0, "the next operation gives the reference back"
+        gc.collect()
+    finally:
+        pool.close()
+        pool.unlink()
+
+
+if __name__ == "__main__":
+    test_constructible()
+    test_frames_across_processes()
+    test_pool_exhaustion()
+    test_release_while_locked()
+    print("frame pool tests passed")
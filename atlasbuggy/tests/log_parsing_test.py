@@ -0,0 +1,153 @@
+"""
+Checks that MappedLog parses log files the same way as the streaming parser (iter_lines) and that seeking with its
+index finds the same lines as filtering every line.
+Run with: python log_parsing_test.py
+"""
+
+import os
+import time
+import datetime
+import tempfile
+
+from atlasbuggy.log import default
+from atlasbuggy.log.index import LogIndex, index_suffix
+from atlasbuggy.log.parser import MappedLog, iter_lines
+
+start_date = datetime.datetime(2026, 1, 2, 3, 4, 5)
+
+
+def log_text(first_line, num_lines):
+    """Lines of two nodes 37ms apart. Some messages span several lines and some are dumped log buffers"""
+    text = ""
+    for line_number in range(first_line, first_line + num_lines):
+        date = start_date + datetime.timedelta(milliseconds=37 * line_number)
+        name = "NodeB" if line_number % 3 == 0 else "NodeA"
+        text += "[%s @ test.py:%s][INFO] %s,%03d: " % (
+            name, line_number, date.strftime("%Y-%m-%d %H:%M:%S"), date.microsecond // 1000)
+
+        timestamp = time.mktime(date.timetuple()) + date.microsecond / 1e6
+        if line_number % 50 == 25:
+            text += "%s[DEBUG, %r]: buffered %s\n[DEBUG, %r]: buffered again\n%s\n" % (
+                default.log_buffer_start, timestamp, line_number, timestamp, default.log_buffer_end)
+        elif line_number % 10 == 5:
+            text += "line %s\nspans two lines\n" % line_number
+        else:
+            text += "line %s\n" % line_number
+    return text
+
+
+def write_log(path, first_line=0, num_lines=500, mode="w"):
+    with open(path, mode) as file:
+        file.write(log_text(first_line, num_lines))
+
+
+def describe(line):
+    return line.name, round(line.timestamp, 3), line.log_level_str, line.message, line.is_part_of_buffer
+
+
+def test_mapped_matches_streaming():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.log")
+        write_log(path)
+
+        with open(path) as file:
+            streamed = [describe(line) for line in iter_lines(file)]
+        with open(path) as file:
+            streamed_in_small_chunks = [describe(line) for line in iter_lines(file, chunk_size=100)]
+
+        log = MappedLog(path)
+        mapped = [describe(record) for record in log]
+        log.close()
+
+        assert len(streamed) == 500 + 10, "each of the 10 log buffers becomes two lines"
+        assert streamed_in_small_chunks == streamed
+        assert mapped == streamed
+        assert mapped[5][3] == "line 5\nspans two lines"
+        assert mapped[25][3] == "buffered 25" and mapped[25][4]
+
+
+def test_empty_log():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "empty.log")
+        open(path, "w").close()
+        log = MappedLog(path)
+        assert list(log) == []
+        log.close()
+
+
+def filtered(records, start_time=None, end_time=None, name=None):
+    lines = []
+    for record in records:
+        if start_time is not None and record.timestamp < start_time:
+            continue
+        if end_time is not None and record.timestamp > end_time:
+            continue
+        if name is not None and record.name != name:
+            continue
+        lines.append(describe(record))
+    return lines
+
+
+def test_seeking():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.log")
+        write_log(path, num_lines=2000)
+        log = MappedLog(path)
+        records = list(log)
+        first_time = records[0].timestamp
+
+        for start, end, name in ((None, None, "NodeB"), (10.0, None, None), (10.0, 20.0, None), (30.0, 31.0, "NodeA"),
+                                 (0.925, 0.925, None), (1000.0, None, None), (None, None, "NoSuchNode")):
+            start_time = None if start is None else first_time + start
+            end_time = None if end is None else first_time + end
+            expected = filtered(records, start_time, end_time, name)
+            found = [describe(record) for record in log.lines(start_time, end_time, name)]
+            assert found == expected, "lines(%s, %s, %s) found %s lines, expected %s" % (
+                start, end, name, len(found), len(expected))
+        log.close()
+
+
+def test_index_is_saved_and_extended():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.log")
+        index_path = path + index_suffix
+        write_log(path, num_lines=1000)
+
+        log = MappedLog(path)
+        assert log.index.num_lines == 1000
+        log.close()
+        assert os.path.isfile(index_path)
+        saved = LogIndex.read(index_path)
+        assert saved.num_lines == 1000 and set(saved.names) == {"NodeA", "NodeB"}
+
+        # lines written after the index was saved are added to it
+        write_log(path, first_line=1000, num_lines=200, mode="a")
+        log = MappedLog(path)
+        assert log.index.num_lines == 1200
+        last_time = list(log)[-1].timestamp
+        assert [describe(record) for record in log.lines(last_time)] == filtered(log, last_time)
+        log.close()
+        assert LogIndex.read(index_path).num_lines == 1200
+
+        # a different log at the same path gets a new index
+        write_log(path, first_line=5, num_lines=300)
+        log = MappedLog(path)
+        assert log.index.num_lines == 300
+        log.close()
+
+        # corrupted indexes are rebuilt
+        with open(index_path, "wb") as file:
+            file.write(b"not an index")
+        log = MappedLog(path)
+        assert log.index.num_lines == 300
+        first_time = list(log)[0].timestamp
+        assert [describe(record) for record in log.lines(first_time + 5.0)] == filtered(log, first_time + 5.0)
+        log.close()
+
+
+if __name__ == "__main__":
+    test_mapped_matches_streaming()
+    test_empty_log()
+    test_seeking()
+    test_index_is_saved_and_extended()
+    print("log parsing tests passed")
@@ -0,0 +1,143 @@
+"""
+Checks that loggers made with make_logger write through the background log writer, and the writer's overflow
+policies and handler errors.
+Run with: python logging_test.py
+"""
+
+import os
+import logging
+import tempfile
+import threading
+
+from atlasbuggy.log.default import default_settings
+from atlasbuggy.log.factory import make_logger, get_log_writer, BackgroundLogWriter, QueueingHandler
+
+logging.getLogger("atlasbuggy.log").addHandler(logging.NullHandler())  # hide the writer's dropped record warnings
+
+
+class HeldHandler(logging.Handler):
+    """Keeps the writer's thread in emit until let_go is called"""
+
+    def __init__(self):
+        super(HeldHandler, self).__init__()
+        self.messages = []
+        self.holding = threading.Event()
+        self.released = threading.Event()
+
+    def emit(self, record):
+        self.holding.set()
+        self.released.wait()
+        self.messages.append(record.msg)
+
+    def let_go(self):
+        self.released.set()
+
+
+def make_record(message):
+    return logging.makeLogRecord(dict(msg=message, levelno=logging.INFO, levelname="INFO"))
+
+
+def hold_writer(policy, max_size):
+    """A writer whose thread is busy writing record 0"""
+    writer = BackgroundLogWriter(max_size, policy)
+    handler = HeldHandler()
+    writer.put([handler], make_record(0))
+    assert handler.holding.wait(5.0)
+    return writer, handler
+
+
+def test_make_logger_writes_file():
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)  # make_logger's directories are relative
+        settings = dict(default_settings.settings, write=True, level=logging.CRITICAL, async_logging=True)
+        logger, file_name, log_directory = make_logger("logging_test", settings, file_name="test.log",
+                                                       directory="logs")
+        assert any(isinstance(handler, QueueingHandler) for handler in logger.handlers)
+
+        values = [0]
+        for n in range(100):
+            values[0] = n
+            logger.info("line %s of %s", n, values)
+        values[0] = "changed"  # arguments are formatted when the record is put
+        try:
+            raise RuntimeError("oops")
+        except RuntimeError:
+            logger.exception("failed")
+        get_log_writer().flush()
+
+        with open(os.path.join(log_directory, file_name)) as file:
+            lines = file.read().splitlines()
+        messages = [line.split(": ", 1)[1] for line in lines if line.startswith("[logging_test")]
+        messages = [message for message in messages if message.startswith(("line", "failed"))]
+        assert messages[:100] == ["line %s of [%s]" % (n, n) for n in range(100)], messages[:3]
+        assert messages[100] == "failed" and lines[-1] == "RuntimeError: oops"
+
+        for handler in logger.handlers:
+            for inner_handler in getattr(handler, "handlers", [handler]):
+                inner_handler.close()
+            logger.removeHandler(handler)
+        os.chdir(working_directory)
+
+
+def test_overflow_policies():
+    expected = {
+        "drop_oldest": list(range(3, 8)),
+        "drop_newest": list(range(1, 6)),
+    }
+    for policy, written in expected.items():
+        writer, handler = hold_writer(policy, 5)
+        for n in range(1, 8):
+            writer.put([handler], make_record(n))
+        assert writer.num_dropped == 2
+        handler.let_go()
+        writer.flush(5.0)
+        assert handler.messages == [0] + written, (policy, handler.messages)
+
+    writer, handler = hold_writer("block", 5)
+    putter = threading.Thread(target=lambda: [writer.put([handler], make_record(n)) for n in range(1, 8)])
+    putter.start()
+    putter.join(0.2)
+    assert putter.is_alive(), "puts to a full queue wait with the block policy"
+    handler.let_go()
+    putter.join(5.0)
+    writer.flush(5.0)
+    assert handler.messages == list(range(8)) and writer.num_dropped == 0
+
+    try:
+        BackgroundLogWriter(5, "drop_everything")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown policies should be rejected")
+
+
+def test_handler_errors_dont_stop_the_writer():
+    class BrokenFilterHandler(logging.StreamHandler):
+        def filter(self, record):
+            raise ValueError("broken filter")
+
+    class BrokenHandler(logging.Handler):
+        def emit(self, record):
+            raise ValueError("broken emit")
+
+    writer = BackgroundLogWriter(5, "block")
+    handler = HeldHandler()
+    handler.let_go()
+    raise_exceptions = logging.raiseExceptions
+    logging.raiseExceptions = False  # handleError stays quiet
+    try:
+        for n in range(20):
+            writer.put([BrokenFilterHandler(), BrokenHandler(), handler], make_record(n))
+        writer.flush(5.0)
+    finally:
+        logging.raiseExceptions = raise_exceptions
+    assert writer._thread.is_alive() and writer._num_pending == 0
+    assert handler.messages == list(range(20))
+
+
+if __name__ == "__main__":
+    test_make_logger_writes_file()
+    test_overflow_policies()
+    test_handler_errors_dont_stop_the_writer()
+    print("logging tests passed")
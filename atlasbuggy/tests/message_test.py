@@ -0,0 +1,91 @@
+"""
+Checks how message classes are defined: auto_serialize as a class keyword on Message and SchemaMessage subclasses,
+and that every way of making a message starts without a latency trace.
+Run with: python message_test.py
+"""
+
+from atlasbuggy import Message, SchemaMessage, codec
+from atlasbuggy.batch import MessageBatch
+from atlasbuggy.message import trace_attributes
+
+
+class AutoMessage(Message, auto_serialize=True):
+    def __init__(self, n, timestamp=None):
+        super(AutoMessage, self).__init__(n, timestamp)
+        self.speed = 0.0
+        self.gear = 0
+
+
+class AutoSchemaMessage(SchemaMessage, auto_serialize=True):
+    schema = dict(speed=float, gear=int, status=(str, "ok"))
+
+
+class ChildSchemaMessage(AutoSchemaMessage, auto_serialize=True):
+    schema = dict(heading=float)
+
+
+codec.register(AutoSchemaMessage, 300)
+
+
+def test_auto_serialized_message():
+    message = AutoMessage(3, 1.5)
+    message.speed = 2.5
+    message.gear = 4
+    parsed = AutoMessage.parse(str(message))
+    assert (parsed.n, parsed.timestamp, parsed.speed, parsed.gear) == (3, 1.5, 2.5, 4)
+
+
+def test_auto_serialized_schema_message():
+    assert AutoSchemaMessage.is_auto_serialized and ChildSchemaMessage.is_auto_serialized
+    message = AutoSchemaMessage(3, 1.5, speed=2.5, gear=4)
+    assert AutoSchemaMessage.parse(str(message)) == message
+
+    child = ChildSchemaMessage(4, 2.0, speed=1.0, heading=0.5)
+    assert set(ChildSchemaMessage.schema_fields) == {"speed", "gear", "status", "heading"}
+    assert ChildSchemaMessage.parse(str(child)) == child
+
+    try:
+        class NotSerializedMessage(SchemaMessage, auto_serialize=False):
+            schema = dict(speed=float)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("schema messages always serialize their schema")
+
+
+def stamp(message):
+    for name in trace_attributes:
+        setattr(message, name, 1.0)
+    return message
+
+
+def assert_untraced(message):
+    for name in trace_attributes:
+        assert getattr(message, name) is None, "%s of %s is set" % (name, message)
+
+
+def test_trace_attributes():
+    message = AutoMessage(1, 1.0)
+    assert_untraced(message)
+    assert not any(name in message.__dict__ for name in trace_attributes), "only stamped messages hold a trace"
+    stamp(message)
+    assert message == AutoMessage(1, 1.0) and "trace" not in str(message)
+    assert_untraced(message.copy())
+
+    schema_message = stamp(AutoSchemaMessage(1, 1.0, speed=2.0))
+    assert schema_message == AutoSchemaMessage(1, 1.0, speed=2.0)
+    assert_untraced(schema_message.copy())
+    assert_untraced(codec.loads(codec.dumps(schema_message)))
+    assert_untraced(MessageBatch.from_messages([schema_message]).message(0))
+
+    frozen = AutoSchemaMessage(1, 1.0).freeze()
+    stamp(frozen)  # tracing stamps frozen messages too
+    assert frozen.trace_broadcast == 1.0
+    assert_untraced(frozen.thaw())
+
+
+if __name__ == "__main__":
+    test_auto_serialized_message()
+    test_auto_serialized_schema_message()
+    test_trace_attributes()
+    print("message tests passed")
@@ -0,0 +1,123 @@
+"""
+Checks RingBufferQueue's overflow policies, batches and waiters.
+Run with: python queues_test.py
+"""
+
+import asyncio
+
+from atlasbuggy.queues import RingBufferQueue, LatestMessageQueue
+
+
+def make_loop():
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    return event_loop
+
+
+def test_policies():
+    make_loop()
+    expected = {
+        "drop_oldest": ([2, 3, 4], 2),
+        "drop_newest": ([0, 1, 2], 2),
+    }
+    for policy, (contents, num_dropped) in expected.items():
+        queue = RingBufferQueue(3, policy)
+        for message in range(5):
+            queue.put_nowait(message)
+        assert list(queue._queue) == contents, (policy, list(queue._queue))
+        assert queue.num_dropped == num_dropped
+
+    for policy in ("block", "raise"):
+        queue = RingBufferQueue(3, policy)
+        for message in range(3):
+            queue.put_nowait(message)
+        try:
+            queue.put_nowait(3)
+        except asyncio.QueueFull:
+            pass
+        else:
+            raise AssertionError("put_nowait on a full '%s' queue should raise QueueFull" % policy)
+        assert queue.num_dropped == 0
+
+    try:
+        RingBufferQueue(3, "drop_everything")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown policies should be rejected")
+
+
+def test_put_many():
+    make_loop()
+    expected = {
+        "drop_oldest": (5, [2, 3, 4], 3),
+        "drop_newest": (5, [-1, 0, 1], 3),
+        "block": (2, [-1, 0, 1], 0),
+        "raise": (2, [-1, 0, 1], 0),
+    }
+    for policy, (num_put, contents, num_dropped) in expected.items():
+        queue = RingBufferQueue(3, policy)
+        queue.put_nowait(-1)
+        assert queue.put_many_nowait(list(range(5))) == num_put, policy
+        assert list(queue._queue) == contents, (policy, list(queue._queue))
+        assert queue.num_dropped == num_dropped
+
+    queue = RingBufferQueue(3, "drop_oldest")
+    queue.put_many_nowait([0])
+    queue.put_many_nowait([1, 2, 3])
+    assert list(queue._queue) == [1, 2, 3] and queue.num_dropped == 1
+
+    unbounded = RingBufferQueue()
+    assert unbounded.put_many_nowait(list(range(100))) == 100 and unbounded.qsize() == 100
+
+    latest = LatestMessageQueue()
+    latest.put_many_nowait([1, 2, 3])
+    assert list(latest._queue) == [3] and latest.num_dropped == 2
+
+
+def test_blocking_put_many():
+    event_loop = make_loop()
+    queue = RingBufferQueue(2, "block")
+    received = []
+
+    @asyncio.coroutine
+    def consume():
+        while len(received) < 6:
+            message = yield from queue.get()
+            received.append(message)
+
+    @asyncio.coroutine
+    def produce():
+        consumer = asyncio.ensure_future(consume())
+        num_put = yield from queue.put_many(list(range(6)))
+        yield from consumer
+        return num_put
+
+    assert event_loop.run_until_complete(produce()) == 6
+    assert received == list(range(6))
+    event_loop.close()
+
+
+def test_get_batch():
+    event_loop = make_loop()
+    queue = RingBufferQueue(10, "drop_oldest")
+
+    @asyncio.coroutine
+    def wait_for_batch():
+        batch = yield from queue.get_batch(4)
+        return batch
+
+    waiter = asyncio.ensure_future(wait_for_batch())
+    event_loop.call_soon(queue.put_many_nowait, list(range(6)))
+    assert event_loop.run_until_complete(waiter) == [0, 1, 2, 3]
+    assert event_loop.run_until_complete(queue.get_batch()) == [4, 5]
+    assert queue.empty()
+    event_loop.close()
+
+
+if __name__ == "__main__":
+    test_policies()
+    test_put_many()
+    test_blocking_put_many()
+    test_get_batch()
+    print("queue tests passed")
@@ -0,0 +1,194 @@
+"""
+Checks that session files read back what was recorded, and that reading recovers from corrupted and torn records.
+Run with: python session_test.py
+"""
+
+import os
+import tempfile
+
+from atlasbuggy import SchemaMessage, codec
+from atlasbuggy.log.recorder import BackgroundSessionWriter, RecorderNode
+from atlasbuggy.log.session import SessionWriter, SessionReader, file_header, record_header, sync_marker
+
+
+class PoseMessage(SchemaMessage):
+    schema = dict(x=float, y=float)
+
+
+class StatusMessage(SchemaMessage):
+    schema = dict(status=str)
+
+
+codec.register(PoseMessage, 200)  # StatusMessage isn't registered. It's pickled
+
+
+def make_messages(num_messages):
+    messages = []
+    for n in range(num_messages):
+        if n % 4 == 3:
+            messages.append(("status", StatusMessage(n, 100.0 + n, status="ok %s" % n)))
+        else:
+            messages.append(("pose", PoseMessage(n, 100.0 + n, x=n * 1.5, y=-n * 0.5)))
+    return messages
+
+
+def read(path, sources=None):
+    reader = SessionReader(path, sources)
+    records = [(record.source, record.message) for record in reader]
+    num_corrupted = reader.num_corrupted
+    reader.close()
+    return records, num_corrupted
+
+
+def test_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.session")
+        messages = make_messages(100)
+        writer = SessionWriter(path)
+        for source, message in messages:
+            writer.write(message, source)
+        writer.close()
+
+        records, num_corrupted = read(path)
+        assert records == messages and num_corrupted == 0
+        poses, num_corrupted = read(path, sources=["pose"])
+        assert poses == [(source, message) for source, message in messages if source == "pose"]
+
+
+def test_corrupted_records_are_skipped():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.session")
+        messages = make_messages(200)
+        writer = SessionWriter(path, sync_interval=512)
+        for source, message in messages:
+            writer.write(message, source)
+        writer.close()
+
+        with open(path, "rb") as file:
+            data = bytearray(file.read())
+        # flip a payload byte of a record in the middle of the file
+        position = data.find(sync_marker, len(data) // 2) - 1
+        data[position] ^= 0xFF
+        with open(path, "wb") as file:
+            file.write(data)
+
+        records, num_corrupted = read(path)
+        assert num_corrupted == 1
+        assert 0 < len(messages) - len(records) < 20, "only the records up to the next sync marker are lost"
+        assert records[-1] == messages[-1], "sources are repeated after sync markers"
+        for record in records:
+            assert record in messages
+
+
+def test_appending_after_a_torn_record():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.session")
+        messages = make_messages(20)
+        writer = SessionWriter(path)
+        for source, message in messages[:10]:
+            writer.write(message, source)
+        writer.close()
+
+        # a crash while writing the last record
+        with open(path, "rb+") as file:
+            file.truncate(os.path.getsize(path) - 3)
+
+        writer = SessionWriter(path)
+        for source, message in messages[10:]:
+            writer.write(message, source)
+        writer.close()
+
+        records, num_corrupted = read(path)
+        assert num_corrupted == 1
+        assert records == messages[:9] + messages[10:]
+
+
+def test_background_writer():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.session")
+        messages = make_messages(1000)
+        writer = BackgroundSessionWriter(path, max_size=100, policy="block")
+        for source, message in messages:
+            writer.put(message, source)
+
+        writer.flush()
+        records, num_corrupted = read(path)
+        assert records == messages, "blocking puts don't lose messages"
+
+        message = PoseMessage(1000, 1100.0, x=1.0)
+        writer.put(message, "pose")
+        message.x = 2.0  # messages are encoded when they're put
+        writer.close()
+        assert writer.num_records == 1001 and writer.error is None
+        records, num_corrupted = read(path)
+        assert records[-1][1].x == 1.0
+
+        try:
+            BackgroundSessionWriter(path, policy="drop_everything")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("unknown policies should be rejected")
+
+
+def test_background_writer_drops_instead_of_blocking():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.session")
+        messages = make_messages(1000)
+        writer = BackgroundSessionWriter(path, max_size=10)
+        for source, message in messages:
+            writer.put(message, source)
+        writer.close()
+
+        records, num_corrupted = read(path)
+        assert writer.num_records == len(records) and writer.num_records + writer.num_dropped == len(messages)
+        assert records[-1] == messages[-1], "drop_oldest keeps the newest messages"
+
+
+def test_recorder_stops_after_a_write_error():
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = RecorderNode(os.path.join(directory, "test.session"))
+        messages = make_messages(10)
+        recorder.write(messages[0][1], messages[0][0])
+        recorder.writer.flush()
+
+        def fail(timestamp, payload, source):
+            raise OSError("disk full")
+
+        recorder.writer.writer.write_payload = fail
+        for source, message in messages[1:]:
+            recorder.write(message, source)  # the producer's callback doesn't raise
+            recorder.writer.flush()
+        assert recorder.stopped and isinstance(recorder.writer.error, OSError)
+        recorder.writer.close()
+
+        records, num_corrupted = read(recorder.path)
+        assert records == messages[:1]
+
+
+def test_other_files_are_rejected():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.log")
+        with open(path, "w") as file:
+            file.write("[Node @ node.py:1][INFO] 2026-01-02 03:04:05,000: not a session\n")
+        # long enough to hold a header, so it's rejected for what it contains
+        assert file_header.size + record_header.size < os.path.getsize(path)
+
+        for make in (SessionWriter, SessionReader):
+            try:
+                make(path)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("%s should reject files that aren't sessions" % make.__name__)
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_corrupted_records_are_skipped()
+    test_appending_after_a_torn_record()
+    test_background_writer()
+    test_background_writer_drops_instead_of_blocking()
+    test_recorder_stops_after_a_write_error()
+    test_other_files_are_rejected()
+    print("session tests passed")
@@ -0,0 +1,164 @@
+import time
+import array
+import asyncio
+
+
+class LatencySamples:
+    """The most recent latencies (in seconds) of one hop kept in a fixed size ring. Adding a sample never allocates"""
+
+    __slots__ = ("samples", "index", "count")
+
+    def __init__(self, window=1024):
+        self.samples = array.array("d", bytes(8 * window))
+        self.index = 0
+        self.count = 0  # total number of samples ever added
+
+    def add(self, latency):
+        self.samples[self.index] = latency
+        self.index += 1
+        if self.index == len(self.samples):
+            self.index = 0
+        self.count += 1
+
+    def percentiles(self, *percents):
+        """Percentiles (0..100) of the samples in the window. None if there aren't any samples yet"""
+        num_samples = min(self.count, len(self.samples))
+        if num_samples == 0:
+            return [None for _ in percents]
+        window = sorted(self.samples[:num_samples])
+        return [window[min(int(num_samples * percent / 100), num_samples - 1)] for percent in percents]
+
+
+class EdgeTrace:
+    """
+    Latencies of one subscription:
+        enqueue - broadcast until the message is on the consumer's queue (only nonzero if put had to wait)
+        dequeue - broadcast until the consumer takes the message (the hop latency)
+        origin - broadcast of the first message in the chain until the consumer takes this one
+    """
+
+    __slots__ = ("subscription", "enqueue", "dequeue", "origin")
+
+    def __init__(self, subscription, window=1024):
+        self.subscription = subscription
+        self.enqueue = LatencySamples(window)
+        self.dequeue = LatencySamples(window)
+        self.origin = LatencySamples(window)
+
+    def enqueued(self, message):
+        broadcast_time = getattr(message, "trace_broadcast", None)
+        if broadcast_time is not None:
+            self.enqueue.add(time.perf_counter() - broadcast_time)
+
+    def dequeued(self, message):
+        broadcast_time = getattr(message, "trace_broadcast", None)
+        if broadcast_time is None:
+            return
+        now = time.perf_counter()
+        self.dequeue.add(now - broadcast_time)
+        self.origin.add(now - message.trace_origin)
+
+        consumer_trace = self.subscription.consumer_node.trace
+        if consumer_trace is not None:
+            consumer_trace.last_origin = message.trace_origin
+            consumer_trace.last_dequeue = now
+
+    @property
+    def name(self):
+        return self.subscription.name
+
+
+class NodeTrace:
+    """Stamps a node's broadcasts and records how long it took to rebroadcast after taking a message"""
+
+    __slots__ = ("node", "processing", "last_origin", "last_dequeue")
+
+    def __init__(self, node, window=1024):
+        self.node = node
+        self.processing = LatencySamples(window)
+        self.last_origin = None
+        self.last_dequeue = None
+
+    def broadcasting(self, message):
+        now = time.perf_counter()
+        try:
+            message.trace_broadcast = now
+        except AttributeError:
+            return  # tuples and other builtins can't be stamped
+
+        if self.last_origin is None:
+            message.trace_origin = now  # this node hasn't taken any messages. The chain starts here
+        elif getattr(message, "trace_origin", None) is None:
+            message.trace_origin = self.last_origin
+
+        if self.last_dequeue is not None:
+            self.processing.add(now - self.last_dequeue)
+            self.last_dequeue = None
+
+
+class LatencyTracer:
+    """
+    Attaches traces to every node and subscription on the orchestrator's event loop and reports p50, p95 and p99
+    latencies for each subscription edge and node. Messages are stamped with time.perf_counter, so tracing costs a
+    couple of attribute assignments and a ring buffer write per hop. Nothing is formatted until report is called.
+    Only Message objects are traced and only through Subscription.wait, get_latest, get_batch, async for, and
+    callbacks. Subscriptions crossing a process boundary aren't traced.
+    """
+
+    percents = (50, 95, 99)
+
+    def __init__(self, logger, report_interval=10.0, window=1024):
+        self.logger = logger
+        self.report_interval = report_interval
+        self.window = window
+
+        self.node_traces = []
+        self.edge_traces = []
+
+    def attach(self, nodes):
+        for node in nodes:
+            node.trace = NodeTrace(node, self.window)
+            self.node_traces.append(node.trace)
+
+        for node in nodes:
+            for subscription in node._consumer_subs:
+                if subscription.consumer_node in nodes:
+                    subscription.trace = EdgeTrace(subscription, self.window)
+                    self.edge_traces.append(subscription.trace)
+
+    def detach(self):
+        for trace in self.node_traces:
+            trace.node.trace = None
+        for trace in self.edge_traces:
+            trace.subscription.trace = None
+        self.node_traces = []
+        self.edge_traces = []
+
+    def report(self):
+        """Returns {edge or node name: {hop name: [p50, p95, p99] in seconds}}"""
+        report = {}
+        for trace in self.edge_traces:
+            hops = {}
+            for hop_name in ("enqueue", "dequeue", "origin"):
+                samples = getattr(trace, hop_name)
+                if samples.count > 0:
+                    hops[hop_name] = samples.percentiles(*self.percents)
+            if len(hops) > 0:
+                report[trace.name] = hops
+        for trace in self.node_traces:
+            if trace.processing.count > 0:
+                report[trace.node.name] = dict(processing=trace.processing.percentiles(*self.percents))
+        return report
+
+    def log_report(self):
+        for name, hops in sorted(self.report().items()):
+            self.logger.info("latency %s: %s" % (name, ", ".join(
+                "%s p50=%0.3fms p95=%0.3fms p99=%0.3fms" % (hop, p50 * 1E3, p95 * 1E3, p99 * 1E3)
+                for hop, (p50, p95, p99) in sorted(hops.items())
+            )))
+
+    @asyncio.coroutine
+    def report_forever(self):
+        while True:
+            yield from asyncio.sleep(self.report_interval)
+            self.log_report()
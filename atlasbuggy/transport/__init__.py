@@ -0,0 +1,3 @@
+from .shared_memory import SharedMemoryRingBuffer, shared_memory_available
+from .process import SubscriptionChannel, NodeProcess
+from .remote import SubscriptionServer, RemoteProducer
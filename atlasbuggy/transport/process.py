@@ -0,0 +1,158 @@
+import sys
+import signal
+import asyncio
+import logging
+import traceback
+import threading
+import concurrent.futures
+
+from .. import codec
+from .shared_memory import SharedMemoryRingBuffer
+
+
+class SubscriptionChannel:
+    """
+    Carries one subscription's messages between the processes hosting its producer and consumer.
+    The producer's process writes messages (see codec.dumps) to a shared memory ring buffer. A thread in the consumer's
+    process reads them and delivers them to the subscription's queue or callback like a normal broadcast would.
+    """
+
+    def __init__(self, subscription, context, capacity=2 ** 22):
+        self.subscription = subscription
+        self.ring_buffer = SharedMemoryRingBuffer(capacity, context)
+
+        self.event_loop = None
+        self._reader = None
+        self._stop_event = threading.Event()
+
+    def attach_producer(self):
+        """Call in the producer's process. Broadcasts to this subscription are written to shared memory"""
+        self.subscription.callback = self.put
+        self.subscription.callback_args = None
+
+    def put(self, message):
+        if not self.ring_buffer.write(codec.dumps(message)):
+            # messages holding frames in shared memory (see ImageMessage.share) took references for the receiver
+            if hasattr(message, "release_frames"):
+                message.release_frames()
+
+    def attach_consumer(self, event_loop):
+        """Call in the consumer's process. Starts delivering messages from shared memory"""
+        self.event_loop = event_loop
+        self._reader = threading.Thread(target=self._read_forever, daemon=True,
+                                        name="%s-reader" % self.subscription.tag)
+        self._reader.start()
+
+    def _read_forever(self):
+        producer = self.subscription.producer_node
+        while not self._stop_event.is_set():
+            data = self.ring_buffer.read(timeout=0.1)
+            if data is None:
+                continue
+            message = codec.loads(data)
+
+            # wait for each delivery so messages stay in order and a full consumer queue backs up into shared memory
+            delivery = asyncio.run_coroutine_threadsafe(producer._deliver(self.subscription, message), self.event_loop)
+            while not self._stop_event.is_set():
+                try:
+                    delivery.result(timeout=0.1)
+                    break
+                except concurrent.futures.TimeoutError:
+                    continue
+            else:
+                delivery.cancel()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._reader is not None:
+            self._reader.join()
+            self._reader = None
+
+    def close(self):
+        self.stop()
+        self.ring_buffer.close()
+
+    def unlink(self):
+        self.ring_buffer.unlink()
+
+
+class NodeProcess:
+    """Runs a node's setup, loop, and teardown on its own event loop in a worker process"""
+
+    def __init__(self, node, context):
+        self.node = node
+        self.channels = []
+        self.exit_event = context.Event()
+        self.process = context.Process(target=self._run, name=node.name, daemon=True)
+
+    def start(self, channels):
+        self.channels = channels
+        self.process.start()
+
+    def stop(self):
+        self.exit_event.set()
+
+    def join(self):
+        if self.process.pid is not None:  # if the process was started
+            self.process.join()
+
+    @property
+    def exitcode(self):
+        return self.process.exitcode
+
+    def _run(self):
+        # the orchestrator's process handles ctrl-C and sets exit_event
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        event_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(event_loop)
+        node = self.node
+        node.event_loop = event_loop
+
+        # queues were made for the orchestrator's event loop. Make them again for this one
+        for subscription in node._producer_subs:
+            if subscription.consumer_node is not None:
+                subscription.set_event_loop(event_loop)
+
+        for channel in self.channels:
+            if channel.subscription.producer_node is node:
+                channel.attach_producer()
+            if channel.subscription.consumer_node is node:
+                channel.attach_consumer(event_loop)
+
+        exit_code = 0
+        loop_task = None
+        try:
+            node.take()
+            event_loop.run_until_complete(node.setup())
+
+            tasks = [event_loop.run_in_executor(None, self.exit_event.wait)]
+            if node.enable_loop_fn:
+                loop_task = asyncio.ensure_future(node.loop())
+                tasks.append(loop_task)
+            done, pending = event_loop.run_until_complete(
+                asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED))
+            for task in done:
+                task.result()  # raise any exception the loop threw
+        except BaseException:
+            node.logger.error("".join(traceback.format_exception(*sys.exc_info())))
+            exit_code = 1
+        finally:
+            self.exit_event.set()  # releases the executor thread waiting on the event
+            if loop_task is not None and not loop_task.done():
+                loop_task.cancel()
+                event_loop.run_until_complete(asyncio.wait([loop_task]))
+
+            try:
+                event_loop.run_until_complete(node.teardown())
+            except BaseException:
+                node.logger.error("".join(traceback.format_exception(*sys.exc_info())))
+                exit_code = 1
+            node._internal_teardown()
+
+            for channel in self.channels:
+                channel.close()
+            event_loop.close()
+            logging.shutdown()
+
+        sys.exit(exit_code)
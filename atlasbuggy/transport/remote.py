@@ -0,0 +1,389 @@
+import time
+import json
+import struct
+import asyncio
+
+from .. import codec
+from ..node import Node
+from ..queues import RingBufferQueue
+from ..subscription import Subscription
+
+# every frame is a 4 byte payload length and a 1 byte frame type followed by the payload
+frame_header = struct.Struct("!IB")
+record_length = struct.Struct("!I")
+
+HANDSHAKE_FRAME = 1  # client -> server: JSON requirements of every subscription to the RemoteProducer
+HANDSHAKE_REPLY_FRAME = 2  # server -> client: JSON error or description of the producer
+BATCH_FRAME = 3  # server -> client: messages encoded with codec.dumps, each prefixed with its length
+frame_types = (HANDSHAKE_FRAME, HANDSHAKE_REPLY_FRAME, BATCH_FRAME)
+
+max_handshake_size = 2 ** 16
+default_max_frame_size = 2 ** 26
+
+
+def write_frame(writer, frame_type, data):
+    writer.writelines((frame_header.pack(len(data), frame_type), data))
+
+
+def write_json_frame(writer, frame_type, payload):
+    write_frame(writer, frame_type, json.dumps(payload).encode())
+
+
+@asyncio.coroutine
+def read_frame(reader, max_size=default_max_frame_size):
+    """
+    Returns the next frame's type and payload bytes. Raises asyncio.IncompleteReadError if the connection closed and
+    ValueError if the frame's type is unknown or it's longer than max_size
+    """
+    header = yield from reader.readexactly(frame_header.size)
+    length, frame_type = frame_header.unpack(header)
+    if frame_type not in frame_types:
+        raise ValueError("Unknown frame type %s" % frame_type)
+    if length > max_size:
+        raise ValueError("Frame of %s bytes is over the %s byte limit" % (length, max_size))
+    data = yield from reader.readexactly(length)
+    return frame_type, data
+
+
+def read_json(data):
+    payload = json.loads(data.decode())
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object")
+    return payload
+
+
+def encode_batch(messages):
+    chunks = []
+    for message in messages:
+        data = codec.dumps(message)
+        chunks.append(record_length.pack(len(data)))
+        chunks.append(data)
+    return b"".join(chunks)
+
+
+def decode_batch(data, allow_pickle=False):
+    messages = []
+    offset = 0
+    while offset < len(data):
+        length, = record_length.unpack_from(data, offset)
+        offset += record_length.size
+        if offset + length > len(data):
+            raise ValueError("Batch record runs past the end of its frame")
+        record = data[offset:offset + length]
+        offset += length
+        if not allow_pickle and codec.header.unpack_from(record)[0] == codec.PICKLE_TYPE_ID:
+            raise ValueError("Received a pickled message but pickled messages aren't allowed")
+        messages.append(codec.loads(record))
+    return messages
+
+
+def class_names(classes):
+    if classes is None:
+        return None
+    return [cls.__name__ for cls in classes]
+
+
+class RemoteClient:
+    def __init__(self, name, writer, queue):
+        self.name = name
+        self.writer = writer
+        self.queue = queue
+        self.num_sent = 0
+
+    def __str__(self):
+        return "%s<name=%s, sent=%s, queue=%s>" % (self.__class__.__name__, self.name, self.num_sent, self.queue)
+
+
+class SubscriptionServer(Node):
+    """
+    Serves one producer's messages to RemoteProducer nodes in other orchestrators over TCP (host and port) or a unix
+    socket (path). Subscribe this node to the producer like any other consumer.
+
+    Every connected client has its own queue. Queued messages are sent in batches of up to batch_size messages, one
+    write per batch. If a client can't keep up, writes wait for the socket to drain and its queue fills up and
+    follows queue_policy, drop_oldest or drop_newest (see RingBufferQueue). The producer is never blocked by a slow
+    client.
+
+    Messages registered with atlasbuggy.codec are sent in its binary format (register them on both ends). Other
+    messages are pickled and clients only accept them with allow_pickle=True. Nothing a client sends is unpickled:
+    the handshake is JSON and malformed frames close the connection.
+    """
+
+    queue_policies = ("drop_oldest", "drop_newest")  # the others would block or raise in the producer's callback
+
+    def __init__(self, host="localhost", port=None, path=None, queue_size=1024, queue_policy="drop_oldest",
+                 batch_size=256, enabled=True, name=None, logger=None):
+        super(SubscriptionServer, self).__init__(enabled, name, logger)
+
+        if port is None and path is None:
+            raise ValueError("A port (TCP) or path (unix socket) is required")
+        if queue_policy not in self.queue_policies:
+            raise ValueError("Queue policy '%s' isn't one of %s" % (queue_policy, self.queue_policies))
+
+        self.host = host
+        self.port = port
+        self.path = path
+        self.queue_size = queue_size
+        self.queue_policy = queue_policy
+        self.batch_size = batch_size
+
+        self.server = None
+        self.clients = []
+
+        self.producer = None
+        self.producer_tag = "producer"
+        self.producer_sub = self.define_subscription(self.producer_tag, callback=self.send_to_clients)
+
+    def take(self):
+        self.producer = self.producer_sub.get_producer()
+
+    @asyncio.coroutine
+    def setup(self):
+        if self.path is not None:
+            self.server = yield from asyncio.start_unix_server(self.handle_client, self.path)
+            self.logger.info("serving '%s' on %s" % (self.producer, self.path))
+        else:
+            self.server = yield from asyncio.start_server(self.handle_client, self.host, self.port)
+            self.logger.info("serving '%s' on %s:%s" % (self.producer, self.host, self.port))
+
+    def send_to_clients(self, message):
+        for client in self.clients:
+            client.queue.put_nowait(message)
+
+    def check_request(self, client_name, requirements):
+        """Run the same checks subscribe does against the producer. Returns an error message or None"""
+        served_service = self.producer_sub.requested_service
+        for requirement in requirements:
+            subscription = Subscription(
+                requirement["tag"], requirement["service"], True, None, None, None, False,
+                requirement["required_attributes"], requirement["required_methods"], None, None
+            )
+            try:
+                subscription.check_producer(self.producer, client_name)
+            except ValueError as error:
+                return str(error)
+
+            if subscription.requested_service != served_service:
+                return "Consumer '%s' is requesting service '%s' but this server only serves '%s'" % (
+                    client_name, subscription.requested_service, served_service)
+
+            producer_classes = requirement["producer_types"]
+            if producer_classes is not None:
+                producer_mro = class_names(type(self.producer).__mro__)
+                if not any(name in producer_mro for name in producer_classes):
+                    return "Producer '%s' is not of the expected type(s) %s that consumer '%s' requested" % (
+                        self.producer, producer_classes, client_name)
+
+            # messages are checked as they're broadcast on the client's side. Catch declared mismatches early
+            message_types = requirement["message_types"]
+            declared_type = self.producer.services[served_service]
+            if message_types is not None and declared_type is not None:
+                message_mro = class_names(declared_type.__mro__)
+                if not any(name in message_mro for name in message_types):
+                    return "Producer '%s' broadcasts %s on '%s', not the type(s) %s that consumer '%s' requested" % (
+                        self.producer, declared_type.__name__, served_service, message_types, client_name)
+        return None
+
+    def describe_producer(self, requirements):
+        attributes = {}
+        for requirement in requirements:
+            if requirement["required_attributes"] is None:
+                continue
+            for attribute_name in requirement["required_attributes"]:
+                value = getattr(self.producer, attribute_name)
+                try:
+                    json.dumps(value)
+                except (TypeError, ValueError):
+                    self.logger.warning("Attribute '%s' of '%s' can't be sent to clients" % (
+                        attribute_name, self.producer))
+                    continue
+                attributes[attribute_name] = value
+
+        return dict(
+            producer=self.producer.name,
+            service=self.producer_sub.requested_service,
+            attributes=attributes,
+        )
+
+    @asyncio.coroutine
+    def handle_client(self, reader, writer):
+        try:
+            frame_type, data = yield from read_frame(reader, max_handshake_size)
+            if frame_type != HANDSHAKE_FRAME:
+                raise ValueError("Expected a handshake, got frame type %s" % frame_type)
+            request = read_json(data)
+            client_name = str(request["name"])
+            requirements = request["subscriptions"]
+            error = self.check_request(client_name, requirements)
+            reply = dict(error=error) if error is not None else self.describe_producer(requirements)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            self.logger.warning("Bad handshake from a client (%s: %s). Closing connection" % (
+                error.__class__.__name__, error))
+            writer.close()
+            return
+
+        if error is not None:
+            self.logger.error("Rejected client '%s': %s" % (client_name, error))
+            write_json_frame(writer, HANDSHAKE_REPLY_FRAME, reply)
+            yield from writer.drain()
+            writer.close()
+            return
+
+        write_json_frame(writer, HANDSHAKE_REPLY_FRAME, reply)
+        client = RemoteClient(client_name, writer, RingBufferQueue(self.queue_size, self.queue_policy))
+        self.clients.append(client)
+        self.logger.info("client '%s' connected" % client_name)
+
+        try:
+            while True:
+                batch = yield from client.queue.get_batch(self.batch_size)
+                write_frame(writer, BATCH_FRAME, encode_batch(batch))
+                client.num_sent += len(batch)
+
+                # waits while the socket's buffer is over its high water mark
+                yield from writer.drain()
+        except ConnectionError:
+            self.logger.info("client '%s' disconnected" % client_name)
+        finally:
+            self.clients.remove(client)
+            writer.close()
+            if client.queue.num_dropped > 0:
+                self.logger.warning("%s messages to '%s' were dropped" % (client.queue.num_dropped, client_name))
+
+    @asyncio.coroutine
+    def teardown(self):
+        if self.server is not None:
+            self.server.close()
+            yield from self.server.wait_closed()
+        for client in self.clients:
+            client.writer.close()
+
+
+class RemoteProducer(Node):
+    """
+    Stands in for a producer served by a SubscriptionServer in another orchestrator. Subscribe consumers to it as if
+    it were the producer: its messages are broadcast on the service the server serves.
+
+    Subscriptions aren't checked when subscribe is called. The requirements of every subscription (service, message
+    and producer types, required attributes and methods) are sent to the server in setup and checked against the real
+    producer there. Required attributes are copied from the producer once when connecting and need to be JSON types.
+    Methods can't be called across orchestrators.
+
+    Messages the server doesn't encode with a registered codec are pickled. They close the connection unless
+    allow_pickle is True. Only allow them from servers you trust: unpickling runs whatever code the data asks for.
+    Frames longer than max_frame_size bytes and frames that can't be decoded also close the connection.
+    """
+
+    def __init__(self, host="localhost", port=None, path=None, connect_timeout=10.0, enabled=True, name=None,
+                 logger=None, allow_pickle=False, max_frame_size=default_max_frame_size):
+        super(RemoteProducer, self).__init__(enabled, name, logger)
+
+        if port is None and path is None:
+            raise ValueError("A port (TCP) or path (unix socket) is required")
+
+        self.host = host
+        self.port = port
+        self.path = path
+        self.connect_timeout = connect_timeout
+        self.allow_pickle = allow_pickle
+        self.max_frame_size = max_frame_size
+
+        self.reader = None
+        self.writer = None
+        self.remote_name = None
+        self.remote_service = None
+        self.num_received = 0
+
+    @property
+    def address(self):
+        return self.path if self.path is not None else "%s:%s" % (self.host, self.port)
+
+    def accept_subscription(self, subscription, consumer):
+        pass  # checked by the server during the handshake
+
+    @asyncio.coroutine
+    def connect(self):
+        start_time = time.time()
+        while True:
+            try:
+                if self.path is not None:
+                    connection = yield from asyncio.open_unix_connection(self.path)
+                else:
+                    connection = yield from asyncio.open_connection(self.host, self.port)
+                return connection
+            except (ConnectionError, FileNotFoundError):
+                if time.time() - start_time > self.connect_timeout:
+                    raise
+                yield from asyncio.sleep(0.1)
+
+    @asyncio.coroutine
+    def setup(self):
+        if self.allow_pickle:
+            self.logger.warning("unpickling messages from %s. Only connect to servers you trust" % self.address)
+        self.reader, self.writer = yield from self.connect()
+
+        requirements = []
+        for subscription in self._consumer_subs:
+            requirements.append(dict(
+                tag=subscription.tag,
+                service=subscription.requested_service,
+                message_types=class_names(subscription.expected_message_types),
+                producer_types=class_names(subscription.expected_producer_classes),
+                required_attributes=subscription.required_attributes,
+                required_methods=subscription.required_methods,
+            ))
+        write_json_frame(self.writer, HANDSHAKE_FRAME, dict(name=self.name, subscriptions=requirements))
+        yield from self.writer.drain()
+
+        frame_type, data = yield from read_frame(self.reader, max_handshake_size)
+        if frame_type != HANDSHAKE_REPLY_FRAME:
+            raise ValueError("Expected a handshake reply from the server, got frame type %s" % frame_type)
+        reply = read_json(data)
+        if "error" in reply:
+            raise ValueError("Server rejected '%s': %s" % (self, reply["error"]))
+
+        self.remote_name = reply["producer"]
+        self.remote_service = reply["service"]
+        self.services[self.remote_service] = None
+        for attribute_name, value in reply["attributes"].items():
+            setattr(self, attribute_name, value)
+
+        self.logger.info("connected to '%s'" % self.remote_name)
+
+    @asyncio.coroutine
+    def loop(self):
+        while True:
+            try:
+                frame_type, data = yield from read_frame(self.reader, self.max_frame_size)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.logger.info("'%s' disconnected" % self.remote_name)
+                return
+            except ValueError as error:
+                self.disconnect(error)
+                return
+
+            try:
+                if frame_type != BATCH_FRAME:
+                    raise ValueError("Expected a batch, got frame type %s" % frame_type)
+                batch = decode_batch(data, self.allow_pickle)
+            except Exception as error:  # anything decoding can raise, including unpickling errors
+                self.disconnect(error)
+                return
+
+            if len(batch) > 0:
+                self.num_received += len(batch)
+                yield from self.broadcast_many(batch, self.remote_service)
+
+    def disconnect(self, error):
+        self.logger.error("Bad frame from '%s' (%s: %s). Disconnecting" % (
+            self.remote_name, error.__class__.__name__, error))
+        self.writer.close()
+
+    @asyncio.coroutine
+    def teardown(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.logger.info("received %s messages from '%s'" % (self.num_received, self.remote_name))
@@ -0,0 +1,92 @@
+import struct
+import multiprocessing
+
+try:
+    from multiprocessing import shared_memory
+
+    shared_memory_available = True
+except ImportError:
+    shared_memory_available = False
+
+
+class SharedMemoryRingBuffer:
+    """
+    A single producer, single consumer ring buffer of length prefixed byte records stored in shared memory.
+    The writer never blocks: if a record doesn't fit, it's dropped and counted in num_dropped.
+    A semaphore counts the records waiting so the reader can block until one arrives.
+    """
+
+    positions = struct.Struct("QQ")  # total bytes written, total bytes read
+    position = struct.Struct("Q")
+    record_header = struct.Struct("I")  # record length
+
+    def __init__(self, capacity=2 ** 22, context=None):
+        if not shared_memory_available:
+            raise ImportError("multiprocessing.shared_memory isn't available. Python 3.8 or higher is required")
+        if context is None:
+            context = multiprocessing
+
+        self.capacity = capacity
+        self.memory = shared_memory.SharedMemory(create=True, size=self.positions.size + capacity)
+        self.positions.pack_into(self.memory.buf, 0, 0, 0)
+        self.num_records = context.Semaphore(0)
+
+        self.num_dropped = 0  # counted by the writer's process
+
+    def _copy_in(self, position, data):
+        buffer = self.memory.buf
+        offset = position % self.capacity
+        start = self.positions.size + offset
+        first_part = min(len(data), self.capacity - offset)
+
+        buffer[start: start + first_part] = data[:first_part]
+        if first_part < len(data):  # wrap around to the start of the ring
+            buffer[self.positions.size: self.positions.size + len(data) - first_part] = data[first_part:]
+
+    def _copy_out(self, position, length):
+        buffer = self.memory.buf
+        offset = position % self.capacity
+        start = self.positions.size + offset
+        first_part = min(length, self.capacity - offset)
+
+        data = bytes(buffer[start: start + first_part])
+        if first_part < length:
+            data += bytes(buffer[self.positions.size: self.positions.size + length - first_part])
+        return data
+
+    def write(self, data):
+        """Copy a record into the ring. Returns False if there wasn't room for it"""
+        data = memoryview(data).cast("B")
+        record_size = self.record_header.size + len(data)
+        if record_size > self.capacity:
+            raise ValueError("Record of %s bytes is larger than the ring buffer (%s bytes)" % (
+                record_size, self.capacity))
+
+        written, read = self.positions.unpack_from(self.memory.buf, 0)
+        if self.capacity - (written - read) < record_size:
+            self.num_dropped += 1
+            return False
+
+        self._copy_in(written, self.record_header.pack(len(data)))
+        self._copy_in(written + self.record_header.size, data)
+        self.position.pack_into(self.memory.buf, 0, written + record_size)
+        self.num_records.release()
+        return True
+
+    def read(self, timeout=None):
+        """Wait for a record and return a copy of it. Returns None if timeout (seconds) expires first"""
+        if not self.num_records.acquire(timeout=timeout):
+            return None
+
+        read = self.position.unpack_from(self.memory.buf, self.position.size)[0]
+        length = self.record_header.unpack(self._copy_out(read, self.record_header.size))[0]
+        data = self._copy_out(read + self.record_header.size, length)
+        self.position.pack_into(self.memory.buf, self.position.size, read + self.record_header.size + length)
+        return data
+
+    def close(self):
+        self.memory.close()
+
+    def unlink(self):
+        """Free the shared memory. Only call this from the process that made the ring buffer"""
+        self.memory.unlink()